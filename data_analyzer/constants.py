@@ -6,4 +6,16 @@ class GameEventSystemStatus:
     NEW: Final[int] = 1
     '''Event has been added: apply it to statistics.'''
     DEPRECATED: Final[int] = 2
-    '''Event has been deprecated: remove it from statistics and then delete it from the database.'''
\ No newline at end of file
+    '''Event has been deprecated: remove it from statistics and then delete it from the database.'''
+
+QUEUE_NOTIFY_CHANNEL: Final[str] = "game_events_analysis_queue"
+'''Postgres channel notified when entries are added to the analysis queue.'''
+
+TEAMS_RESOURCE_NAME: Final[str] = "teams"
+'''Resource version bumped when team season statistics change, see `hockey.utils.resource_versions` in the backend.'''
+
+GAME_OVER_STATUS: Final[int] = 3
+'''Status of the finished games, whose data is in the statistics, see `GameStatus` in the backend.'''
+
+STATS_LOCK_KEY: Final[int] = 7_104_215_001
+'''Postgres advisory lock held shared by the analyzer transactions and exclusively by the statistics rebuild.'''
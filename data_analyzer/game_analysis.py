@@ -0,0 +1,548 @@
+import datetime
+import json
+import traceback
+from collections import Counter
+from typing import Any
+
+from constants import GameEventSystemStatus
+from stats_batch import StatsBatch
+
+def form_missing_person_message(person: str, event: dict[str, Any]) -> str:
+    """Forms a message for a missing person.
+    
+    :param person: The person type (goalie or player).
+    :param event: The game event.
+    :returns: A message for a missing person.
+    """
+    
+    return f"ERROR: No {person} specified for \"{event['event_name']}\" event {event['id']}."
+
+def analyze_game_event(event: dict[str, Any], is_add: bool, stats: StatsBatch) -> str | None:
+    """Analyzes a game event and updates the player and goalie season statistics.
+    
+    :param event: The game event to analyze.
+    :param stats: The batch the statistics deltas are accumulated in.
+    :returns: An error message if an error occurs, otherwise None.
+    """
+
+    # region Get goalie_season, goalie_game, player_season, player_game, player_2_season, player_2_game.
+
+    season_id = event['game_season_id']
+
+    if event['goalie_id'] is not None:
+        if event['event_name'] == "shot on goal":
+            goalie_team_id = event['team_2_id']
+        else:
+            goalie_team_id = event['team_id']
+        goalie_season = stats.goalie_season(season_id, event['goalie_id'])
+        goalie_team_season = stats.goalie_team_season(season_id, event['goalie_id'], goalie_team_id)
+        goalie_game = stats.game_goalie(event['game_id'], event['goalie_id'], goalie_team_id)
+    else:
+        goalie_season = None
+        goalie_team_season = None
+        goalie_game = None
+
+    if event['player_id'] is not None:
+        player_season = stats.player_season(season_id, event['player_id'])
+        player_team_season = stats.player_team_season(season_id, event['player_id'], event['team_id'])
+        player_game = stats.game_player(event['game_id'], event['player_id'], event['team_id'])
+    else:
+        player_season = None
+        player_team_season = None
+        player_game = None
+
+    if event['player_2_id'] is not None:
+        if event['event_name'] == "shot on goal" and event['shot_type'] in ["goal", "missed the net", "save"]:
+            player_2_team_id = event['team_id'] # Assist: same team as the goal.
+        elif event['event_name'] == "shot on goal" and event['shot_type'] == "blocked":
+            player_2_team_id = event['team_2_id'] # Blocked shot: opposite team.
+        elif event['event_name'] in ["penalty", "turnover", "faceoff"]:
+            player_2_team_id = event['team_2_id'] # Penalty, turnover or faceoff: opposite team.
+        else:
+            return f"Cannot determine team for player 2 in event {event['id']}."
+        player_2_season = stats.player_season(season_id, event['player_2_id'])
+        player_2_team_season = stats.player_team_season(season_id, event['player_2_id'], player_2_team_id)
+        player_2_game = stats.game_player(event['game_id'], event['player_2_id'], player_2_team_id)
+    else:
+        player_2_season = None
+        player_2_team_season = None
+        player_2_game = None
+
+    # endregion
+
+    # region Analyze event
+
+    diff = (1 if is_add else -1)
+
+    if event['event_name'] == "shot on goal":
+
+        if player_season is None:
+            return form_missing_person_message("player", event)
+        if goalie_season is None:
+            return form_missing_person_message("goalie", event)
+
+        goalie_season.shots_on_goal += diff
+        goalie_team_season.shots_on_goal += diff
+        goalie_game.shots_on_goal += diff
+        player_season.shots_on_goal += diff
+        player_team_season.shots_on_goal += diff
+        player_game.shots_on_goal += diff
+
+        if event['is_scoring_chance']:
+            player_season.scoring_chances += diff
+            player_team_season.scoring_chances += diff
+            player_game.scoring_chances += diff
+
+        if event['shot_type'] == "goal":
+
+            player_season.goals += diff
+            player_team_season.goals += diff
+            player_game.goals += diff
+
+            if player_2_season is not None:
+                player_2_season.assists += diff
+                player_2_team_season.assists += diff
+                player_2_game.assists += diff
+
+            goalie_season.goals_against += diff
+            goalie_team_season.goals_against += diff
+            goalie_game.goals_against += diff
+
+            if event['goal_type'] == "Short Handed":
+                player_season.short_handed_goals += diff
+                player_team_season.short_handed_goals += diff
+                player_game.short_handed_goals += diff
+                goalie_season.short_handed_goals_against += diff
+                goalie_team_season.short_handed_goals_against += diff
+                goalie_game.short_handed_goals_against += diff
+            elif event['goal_type'] == "Power Play":
+                player_season.power_play_goals += diff
+                player_team_season.power_play_goals += diff
+                player_game.power_play_goals += diff
+                goalie_season.power_play_goals_against += diff
+                goalie_team_season.power_play_goals_against += diff
+                goalie_game.power_play_goals_against += diff
+
+        elif event['shot_type'] == "blocked":
+
+            if player_2_season is None:
+                return form_missing_person_message("second player", event)
+
+            player_2_season.blocked_shots += diff
+            player_2_team_season.blocked_shots += diff
+            player_2_game.blocked_shots += diff
+
+        elif event['shot_type'] == "save":
+
+            goalie_season.saves += diff
+            goalie_team_season.saves += diff
+            goalie_game.saves += diff
+
+    elif event['event_name'] == "turnover":
+
+        if player_season is None:
+            return form_missing_person_message("player", event)
+
+        player_season.turnovers += diff
+        player_team_season.turnovers += diff
+        player_game.turnovers += diff
+
+    elif event['event_name'] == 'faceoff':
+
+        if player_season is None:
+            return form_missing_person_message("player", event)
+        if player_2_season is None:
+            return form_missing_person_message("second player", event)
+
+        player_season.faceoffs += diff
+        player_team_season.faceoffs += diff
+        player_game.faceoffs += diff
+        player_2_season.faceoffs += diff
+        player_2_team_season.faceoffs += diff
+        player_2_game.faceoffs += diff
+
+        player_season.faceoffs_won += diff
+        player_team_season.faceoffs_won += diff
+        player_game.faceoffs_won += diff
+
+    elif event['event_name'] == "penalty":
+
+        if goalie_season is None and player_season is None:
+            return form_missing_person_message("goalie or player", event)
+
+        time_length = datetime.timedelta(seconds=event['time_length'])
+
+        penalty_minutes = (-time_length if not is_add else time_length)
+
+        if goalie_season is not None:
+            goalie_season.penalty_minutes += penalty_minutes
+            goalie_team_season.penalty_minutes += penalty_minutes
+            goalie_game.penalty_minutes += penalty_minutes
+
+        if player_season is not None:
+            player_season.penalty_minutes += penalty_minutes
+            player_team_season.penalty_minutes += penalty_minutes
+            player_game.penalty_minutes += penalty_minutes
+
+        if player_2_season is not None:
+            player_2_season.penalties_drawn += penalty_minutes
+            player_2_team_season.penalties_drawn += penalty_minutes
+            player_2_game.penalties_drawn += penalty_minutes
+
+    # endregion
+
+def analyze_game(game: dict[str, Any], is_add: bool, stats: StatsBatch) -> str | None:
+    """Analyzes the game scoped events: win/loss/tie.
+    
+    :param game: The game to analyze.
+    :param stats: The batch the statistics deltas are accumulated in.
+    :returns: An error message if an error occurs, otherwise None.
+    """
+
+    diff = (1 if is_add else -1)
+    
+    season_id = game['season_id']
+
+    home_team_id = game['home_team_id']
+    away_team_id = game['away_team_id']
+
+    # region Get home_team_season, away_team_season.
+
+    home_team_season = stats.team_season(season_id, home_team_id)
+    away_team_season = stats.team_season(season_id, away_team_id)
+
+    # endregion
+
+    home_goalies_on_ice = ([game['home_start_goalie_id']] +
+        [evt['goalie_id'] for evt in game['events'] if (evt['event_name'] == "goalie change" and evt['team_id'] == game['home_team_id'])])
+    away_goalies_on_ice = ([game['away_start_goalie_id']] +
+        [evt['goalie_id'] for evt in game['events'] if (evt['event_name'] == "goalie change" and evt['team_id'] == game['away_team_id'])])
+
+    last_home_goalie_id = home_goalies_on_ice[-1]
+    last_away_goalie_id = away_goalies_on_ice[-1]
+
+    for game_home_goalie_id in game['home_goalies']:
+
+        # region Get home_goalie_season, home_goalie_game.
+
+        home_goalie_season = stats.goalie_season(season_id, game_home_goalie_id)
+        home_goalie_team_season = stats.goalie_team_season(season_id, game_home_goalie_id, home_team_id)
+        # Creates the game row of the goalie in the batch, even if it has no statistics in the game.
+        stats.game_goalie(game['id'], game_home_goalie_id, home_team_id)
+
+        # endregion
+
+        if home_goalie_season.goalie_id in home_goalies_on_ice:
+            home_goalie_season.games_played += diff
+            home_goalie_team_season.games_played += diff
+
+        if game['away_goals'] > game['home_goals'] and home_goalie_season.goalie_id == game['home_start_goalie_id']:
+            # The goalie that started the game in net gets the loss if the team loses the game.
+            home_goalie_season.losses += diff
+            home_goalie_team_season.losses += diff
+
+        elif game['away_goals'] < game['home_goals'] and home_goalie_season.goalie_id == last_home_goalie_id:
+            # The goalie that finishes the game in net gets the win if the team wins the game.
+            home_goalie_season.wins += diff
+            home_goalie_team_season.wins += diff
+
+        elif game['away_goals'] == game['home_goals'] and home_goalie_season.goalie_id == last_home_goalie_id:
+            # The goalie that finishes the game in net gets the tie if the team ties the game.
+            home_goalie_season.ties += diff
+            home_goalie_team_season.ties += diff
+
+    for game_away_goalie_id in game['away_goalies']:
+
+        # region Get away_goalie_season, away_goalie_game.
+
+        away_goalie_season = stats.goalie_season(season_id, game_away_goalie_id)
+        away_goalie_team_season = stats.goalie_team_season(season_id, game_away_goalie_id, away_team_id)
+        # Creates the game row of the goalie in the batch, even if it has no statistics in the game.
+        stats.game_goalie(game['id'], game_away_goalie_id, away_team_id)
+
+        # endregion
+
+        if away_goalie_season.goalie_id in away_goalies_on_ice:
+            away_goalie_season.games_played += diff
+            away_goalie_team_season.games_played += diff
+
+        if game['home_goals'] > game['away_goals'] and away_goalie_season.goalie_id == game['away_start_goalie_id']:
+            # The goalie that started the game in net gets the loss if the team loses the game.
+            away_goalie_season.losses += diff
+            away_goalie_team_season.losses += diff
+
+        elif game['home_goals'] < game['away_goals'] and away_goalie_season.goalie_id == last_away_goalie_id:
+            # The goalie that finishes the game in net gets the win if the team wins the game.
+            away_goalie_season.wins += diff
+            away_goalie_team_season.wins += diff
+
+        elif game['home_goals'] == game['away_goals'] and away_goalie_season.goalie_id == last_away_goalie_id:
+            # The goalie that finishes the game in net gets the tie if the team ties the game.
+            away_goalie_season.ties += diff
+            away_goalie_team_season.ties += diff
+
+    for game_home_player_id in game['home_players']:
+
+        # region Get home_player_season, home_player_game.
+
+        home_player_season = stats.player_season(season_id, game_home_player_id)
+        home_player_team_season = stats.player_team_season(season_id, game_home_player_id, home_team_id)
+        # Creates the game row of the player in the batch, even if it has no statistics in the game.
+        stats.game_player(game['id'], game_home_player_id, home_team_id)
+
+        # endregion
+
+        home_player_season.games_played += diff
+        home_player_team_season.games_played += diff
+
+    for game_away_player_id in game['away_players']:
+
+        # region Get away_player_season, away_player_game.
+
+        away_player_season = stats.player_season(season_id, game_away_player_id)
+        away_player_team_season = stats.player_team_season(season_id, game_away_player_id, away_team_id)
+        # Creates the game row of the player in the batch, even if it has no statistics in the game.
+        stats.game_player(game['id'], game_away_player_id, away_team_id)
+
+        # endregion
+
+        away_player_season.games_played += diff
+        away_player_team_season.games_played += diff
+
+    home_team_season.games_played += diff
+    away_team_season.games_played += diff
+
+    if game['home_goals'] > game['away_goals']:
+        home_team_season.wins += diff
+        away_team_season.losses += diff
+    elif game['home_goals'] < game['away_goals']:
+        home_team_season.losses += diff
+        away_team_season.wins += diff
+    else:
+        home_team_season.ties += diff
+        away_team_season.ties += diff
+
+    home_goals = (game['home_goals'] if is_add else -game['home_goals'])
+    away_goals = (game['away_goals'] if is_add else -game['away_goals'])
+    
+    home_team_season.goals_for += home_goals
+    away_team_season.goals_for += away_goals
+    home_team_season.goals_against += away_goals
+    away_team_season.goals_against += home_goals
+
+def analyze_entry(entry: Any, stats: StatsBatch) -> str | None:
+    """Analyzes a queue entry.
+    
+    :param entry: The queue entry to analyze.
+    :param stats: The batch the statistics deltas are accumulated in.
+    :returns: An error message if an error occurs, otherwise None.
+    """
+
+    error_messages = []
+    payload = json.loads(entry.payload)
+
+    if payload['type'] == 'game':
+
+        if entry.status not in [GameEventSystemStatus.NEW, GameEventSystemStatus.DEPRECATED]:
+            return f"Game {entry.id} has an unknown status: {entry.status}."
+
+        is_add = (entry.status == GameEventSystemStatus.NEW)
+
+        for payload_event in payload['events']:
+            error_message = analyze_game_event(payload_event, is_add, stats)
+            if error_message is not None:
+                error_messages.append(error_message)
+                break
+        if len(error_messages) == 0:
+            error_message = analyze_game(payload, is_add, stats)
+            if error_message is not None:
+                error_messages.append(error_message)
+
+        if len(error_messages) > 0:
+            return '\n'.join(error_messages)
+
+    elif payload['type'] == 'game_event':
+
+        if entry.status not in [GameEventSystemStatus.NEW, GameEventSystemStatus.DEPRECATED]:
+            return f"Game event {entry.id} has an unknown status: {entry.status}."
+
+        is_add = (entry.status == GameEventSystemStatus.NEW)
+        return analyze_game_event(payload, is_add, stats)
+
+    elif payload['type'] == 'game_delta':
+
+        if entry.status not in [GameEventSystemStatus.NEW, GameEventSystemStatus.DEPRECATED]:
+            return f"Game delta {entry.id} has an unknown status: {entry.status}."
+
+        # Reverting a delta swaps the removed and the added data.
+        is_add = (entry.status == GameEventSystemStatus.NEW)
+
+        for payload_event in payload['removed_events']:
+            error_message = analyze_game_event(payload_event, not is_add, stats)
+            if error_message is not None:
+                return error_message
+        for payload_event in payload['added_events']:
+            error_message = analyze_game_event(payload_event, is_add, stats)
+            if error_message is not None:
+                return error_message
+        if payload['old_game'] is not None:
+            error_message = analyze_game(payload['old_game'], not is_add, stats)
+            if error_message is not None:
+                return error_message
+            error_message = analyze_game(payload['new_game'], is_add, stats)
+            if error_message is not None:
+                return error_message
+
+    else:
+        return f"ERROR: Event {entry.id} has no game event or game."
+
+    return None
+
+def get_game_header(game: dict[str, Any]) -> dict[str, Any]:
+    """Returns the game-level part of a game payload: everything except the events that do not affect
+    the game-level statistics (only goalie changes do), the same as `game_header_to_dict()` in the backend."""
+
+    return game | {"events": [event for event in game["events"] if event["event_name"] == "goalie change"]}
+
+def get_entry_items(entry: Any) -> list[tuple[str, dict[str, Any], int]] | None:
+    """Splits a queue entry into the game events and the game-level data it adds to or removes from the statistics.
+
+    :param entry: The queue entry to split.
+    :returns: (kind, data, sign) tuples, where the kind is "event" or "game" and the sign is 1 for the added data
+        and -1 for the removed data, or None if the entry has an unknown status or type.
+    """
+
+    if entry.status not in [GameEventSystemStatus.NEW, GameEventSystemStatus.DEPRECATED]:
+        return None
+
+    payload = json.loads(entry.payload)
+    sign = (1 if entry.status == GameEventSystemStatus.NEW else -1)
+
+    if payload['type'] == 'game':
+        return [("event", event, sign) for event in payload['events']] + [("game", get_game_header(payload), sign)]
+    elif payload['type'] == 'game_event':
+        return [("event", payload, sign)]
+    elif payload['type'] == 'game_delta':
+        items = ([("event", event, -sign) for event in payload['removed_events']] +
+                 [("event", event, sign) for event in payload['added_events']])
+        if payload['old_game'] is not None:
+            items += [("game", payload['old_game'], -sign), ("game", payload['new_game'], sign)]
+        return items
+    return None
+
+def group_entries(entries: list[Any]) -> list[list[Any]]:
+    """Groups the claimed entries by game, keeping the queue order within the groups.
+
+    Entries without a game form groups of their own.
+    """
+
+    groups: dict[Any, list[Any]] = {}
+    for entry in entries:
+        groups.setdefault(entry.game_id if entry.game_id is not None else entry.id, []).append(entry)
+    return list(groups.values())
+
+def coalesce_entries(entries: list[Any]) -> tuple[Counter, int] | None:
+    """Collapses the queue entries of a game into the net change of the statistics data.
+
+    Each state of the game added by an entry is removed by the next one, so the intermediate states cancel out:
+    only the data of the oldest removed and the newest added state is left, and nothing if the two are the same.
+    Statistics deltas do not depend on the order they are applied in, so the net change gives the same statistics.
+
+    :param entries: The queue entries of a game in the queue order.
+    :returns: The net count of each (kind, JSON data) item, positive for the added and negative for the removed data,
+        and the number of items in the entries, or None if an entry cannot be split.
+    """
+
+    net_items = Counter()
+    item_count = 0
+    for entry in entries:
+        items = get_entry_items(entry)
+        if items is None:
+            return None
+        for kind, data, sign in items:
+            net_items[(kind, json.dumps(data, sort_keys=True))] += sign
+        item_count += len(items)
+    return net_items, item_count
+
+def analyze_net_items(net_items: Counter, stats: StatsBatch) -> str | None:
+    """Analyzes the net change returned by `coalesce_entries()`.
+
+    :param net_items: The net count of each (kind, JSON data) item.
+    :param stats: The batch the statistics deltas are accumulated in.
+    :returns: An error message if an error occurs, otherwise None.
+    """
+
+    for (kind, data_json), count in net_items.items():
+        if count == 0:
+            continue
+        data = json.loads(data_json)
+        for _ in range(abs(count)):
+            if kind == "event":
+                error_message = analyze_game_event(data, count > 0, stats)
+            else:
+                error_message = analyze_game(data, count > 0, stats)
+            if error_message is not None:
+                return error_message
+    return None
+
+class GameAnalysis:
+    """Result of `analyze_game_entries()`."""
+
+    def __init__(self, stats: StatsBatch):
+        """
+        :param stats: The batch the statistics deltas of the applied entries are accumulated in.
+        """
+
+        self.stats = stats
+        self.applied_entries: list[Any] = []
+        # The entry that failed the analysis and its error message: the later entries of the game wait for it.
+        self.failed_entry: Any = None
+        self.error_message: str | None = None
+        # Whether the entries were applied as their net change, the number of their payload items and of the cancelled ones.
+        self.is_coalesced = False
+        self.item_count = 0
+        self.skipped_item_count = 0
+
+def analyze_game_entries(entries: list[Any], stat_tables: dict[str, Any]) -> GameAnalysis:
+    """Analyzes the claimed queue entries of a game.
+
+    Several entries are applied as their net change if it is analyzed without errors. Otherwise the entries are applied
+    one by one, so the errors are reported for the entries causing them, up to the first failed one.
+    An exception raised by the analysis of an entry, e.g. on a malformed payload, fails the entry with its traceback.
+
+    :param entries: The queue entries of a game in the queue order.
+    :param stat_tables: Statistics tables returned by `get_stat_tables()`.
+    """
+
+    if len(entries) > 1:
+        stats = StatsBatch(stat_tables)
+        try:
+            coalesced = coalesce_entries(entries)
+            is_analyzed = (coalesced is not None and analyze_net_items(coalesced[0], stats) is None)
+        except Exception:
+            # The entry raising the exception is found by the analysis one by one.
+            is_analyzed = False
+        if is_analyzed:
+            net_items, item_count = coalesced
+            analysis = GameAnalysis(stats)
+            analysis.applied_entries = list(entries)
+            analysis.is_coalesced = True
+            analysis.item_count = item_count
+            analysis.skipped_item_count = item_count - sum(abs(count) for count in net_items.values())
+            return analysis
+
+    analysis = GameAnalysis(StatsBatch(stat_tables))
+    for entry in entries:
+        # Deltas of a single entry are merged only if the whole entry was analyzed without errors.
+        stats = StatsBatch(stat_tables)
+        try:
+            error_message = analyze_entry(entry, stats)
+        except Exception:
+            error_message = f"ERROR: Analysis of entry {entry.id} raised an exception.\n{traceback.format_exc()}"
+        if error_message is not None:
+            analysis.failed_entry = entry
+            analysis.error_message = error_message
+            break
+        analysis.stats.merge(stats)
+        analysis.applied_entries.append(entry)
+    return analysis
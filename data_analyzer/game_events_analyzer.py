@@ -2,20 +2,46 @@ import datetime
 import json
 import os
 import configparser
+import select as fd_select
+import signal
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Final
-from sqlalchemy import select, update
-from sqlalchemy.orm import scoped_session
+import psycopg2
+from sqlalchemy import and_, delete, exists, extract, func, insert, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.session import Session
 import traceback
 
-from constants import GameEventSystemStatus
-from models import Models
+import metrics
+from constants import QUEUE_NOTIFY_CHANNEL, STATS_LOCK_KEY, TEAMS_RESOURCE_NAME, GameEventSystemStatus
+from game_analysis import GameAnalysis, analyze_game_entries, group_entries
+from models import Models, get_db_conn_str
+from stats_batch import StatTable, StatsBatch, get_stat_tables
 
 app_path = os.path.dirname(os.path.realpath(__file__))
 config = configparser.ConfigParser()
-session = None
 m = None
 log = None
+process_id = None
+
+# Number of queue entries applied in one transaction.
+BATCH_SIZE: Final = int(os.getenv("ANALYZER_BATCH_SIZE", "500"))
+# Number of worker threads consuming the queue.
+WORKERS: Final = int(os.getenv("ANALYZER_WORKERS", "4"))
+# Number of the most recent log entries to keep.
+LOG_MAX_ENTRIES: Final = int(os.getenv("ANALYZER_LOG_MAX_ENTRIES", "10000"))
+# Maximum number of log entries deleted after a pass over the queue.
+LOG_TRIM_BATCH_SIZE: Final = 5000
+# Seconds between passes over the queue when no notifications arrive.
+POLL_INTERVAL: Final = float(os.getenv("ANALYZER_POLL_INTERVAL", "60"))
+# Number of failed analysis attempts after which a queue entry is moved to the dead letters.
+MAX_ATTEMPTS: Final = int(os.getenv("ANALYZER_MAX_ATTEMPTS", "5"))
+# Seconds before the first retry of a failed queue entry, doubled after each further failure.
+RETRY_DELAY: Final = float(os.getenv("ANALYZER_RETRY_DELAY", "60"))
+
+stop_requested = False
 
 class EventAction:
     ADDED = 1
@@ -24,24 +50,26 @@ class EventAction:
 
 # region Logging functions.
 
-def write_log(message: str) -> None:
+def write_log(session: Session, message: str) -> None:
     """Writes a log message to the database."""
 
     log_msg = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S") + " - " + message
     
-    print(log_msg)
+    # A single write, so the messages of the workers are not interleaved.
+    print(log_msg + "\n", end="")
 
-    log_arr = []
-    process_status = session.scalar(select(m.ProcessStatus).where(m.ProcessStatus.name == "game_events_analyzer"))
-    
-    log_arr = process_status.log.split("\n")
-    
-    while len(log_arr) > 10000:
-        log_arr.pop()
-        
-    log_arr.insert(0, log_msg)
-    
-    process_status.log = "\n".join(log_arr)
+    session.execute(insert(m.ProcessLog).values(process_id=process_id, message=message))
+
+def trim_log(session: Session) -> None:
+    """Deletes the oldest log entries above `LOG_MAX_ENTRIES`, at most `LOG_TRIM_BATCH_SIZE` at a time."""
+
+    log = m.ProcessLog
+    newest_trimmed_id = select(log.id).where(log.process_id == process_id).\
+        order_by(log.id.desc()).offset(LOG_MAX_ENTRIES).limit(1).scalar_subquery()
+    trimmed_ids = select(log.id).where(log.process_id == process_id, log.id <= newest_trimmed_id).\
+        order_by(log.id).limit(LOG_TRIM_BATCH_SIZE)
+    session.execute(delete(log).where(log.id.in_(trimmed_ids)))
+    session.commit()
 
 def print_console(message: str) -> None:
     """Prints a message to the console."""
@@ -50,615 +78,342 @@ def print_console(message: str) -> None:
 
 # endregion
 
-def form_missing_person_message(person: str, event: dict[str, Any]) -> str:
-    """Forms a message for a missing person.
-    
-    :param person: The person type (goalie or player).
-    :param event: The game event.
-    :returns: A message for a missing person.
-    """
-    
-    return f"ERROR: No {person} specified for \"{event['event_name']}\" event {event['id']}."
+def claim_entries(session: Session) -> list[Any]:
+    """Claims the pending queue entries of up to `BATCH_SIZE` games for the current transaction.
 
-def analyze_game_event(event: dict[str, Any], is_add: bool) -> str | None:
-    """Analyzes a game event and updates the player and goalie season statistics.
-    
-    :param event: The game event to analyze.
-    :returns: An error message if an error occurs, otherwise None.
+    The oldest entry of each game is locked with SKIP LOCKED, so a game is claimed by a single worker
+    and its entries are applied in order. The rest of the entries of the claimed games are locked afterwards:
+    other workers never claim them because they are not the oldest entries of their games.
+    Games whose oldest entry waits for a retry or that have dead letters are not claimed.
+
+    :returns: The claimed entries in the queue order.
     """
 
-    # region Get goalie_season, goalie_game, player_season, player_game, player_2_season, player_2_game.
-
-    season_id = event['game_season_id']
-
-    is_add_goalie_season = False
-    is_add_goalie_team_season = False
-    is_add_goalie_game = False
-    if event['goalie_id'] is not None:
-
-        goalie_season = session.scalar(select(m.GoalieSeason).where(
-            m.GoalieSeason.season_id == season_id, m.GoalieSeason.goalie_id == event['goalie_id']))
-        if goalie_season is None:
-            goalie_season = m.init_goalie_season(season_id, event['goalie_id'])
-            is_add_goalie_season = True
-
-        if event['event_name'] == "shot on goal":
-            goalie_team_id = event['team_2_id']
-        else:
-            goalie_team_id = event['team_id']
-        goalie_team_season = session.scalar(select(m.GoalieTeamSeason).where(
-            m.GoalieTeamSeason.season_id == season_id, m.GoalieTeamSeason.goalie_id == event['goalie_id'],
-            m.GoalieTeamSeason.team_id == goalie_team_id))
-        if goalie_team_season is None:
-            goalie_team_season = m.init_goalie_team_season(season_id, event['goalie_id'], goalie_team_id)
-            is_add_goalie_team_season = True
-
-        goalie_game = session.scalar(select(m.GameGoalie).where(
-            m.GameGoalie.game_id == event['game_id'], m.GameGoalie.goalie_id == event['goalie_id']))
-        if goalie_game is None:
-            goalie_game = m.init_game_goalie(event['game_id'], event['goalie_id'])
-            is_add_goalie_game = True
-    else:
-        goalie_season = None
-        goalie_team_season = None
-        goalie_game = None
-
-    is_add_player_season = False
-    is_add_player_team_season = False
-    is_add_player_game = False
-    if event['player_id'] is not None:
-
-        player_season = session.scalar(select(m.PlayerSeason).where(
-            m.PlayerSeason.season_id == season_id, m.PlayerSeason.player_id == event['player_id']))
-        if player_season is None:
-            player_season = m.init_player_season(season_id, event['player_id'])
-            is_add_player_season = True
-
-        player_team_season = session.scalar(select(m.PlayerTeamSeason).where(
-            m.PlayerTeamSeason.season_id == season_id, m.PlayerTeamSeason.player_id == event['player_id'],
-            m.PlayerTeamSeason.team_id == event['team_id']))
-        if player_team_season is None:
-            player_team_season = m.init_player_team_season(season_id, event['player_id'], event['team_id'])
-            is_add_player_team_season = True
-
-        player_game = session.scalar(select(m.GamePlayer).where(
-            m.GamePlayer.game_id == event['game_id'], m.GamePlayer.player_id == event['player_id']))
-        if player_game is None:
-            player_game = m.init_game_player(event['game_id'], event['player_id'])
-            is_add_player_game = True
+    queue = m.GameEventsAnalysisQueue
+    earlier = aliased(queue)
+    dead_letter = m.GameEventsAnalysisDeadLetter
 
-    else:
-        player_season = None
-        player_team_season = None
-        player_game = None
-
-    is_add_player_2_season = False
-    is_add_player_2_team_season = False
-    is_add_player_2_game = False
-    if event['player_2_id'] is not None:
-
-        player_2_season = session.scalar(select(m.PlayerSeason).where(
-            m.PlayerSeason.season_id == season_id, m.PlayerSeason.player_id == event['player_2_id']))
-        if player_2_season is None:
-            player_2_season = m.init_player_season(season_id, event['player_2_id'])
-            is_add_player_2_season = True
-
-        if event['event_name'] == "shot on goal" and event['shot_type'] in ["goal", "missed the net", "save"]:
-            player_2_team_id = event['team_id'] # Assist: same team as the goal.
-        elif event['event_name'] == "shot on goal" and event['shot_type'] == "blocked":
-            player_2_team_id = event['team_2_id'] # Blocked shot: opposite team.
-        elif event['event_name'] in ["penalty", "turnover", "faceoff"]:
-            player_2_team_id = event['team_2_id'] # Penalty, turnover or faceoff: opposite team.
-        else:
-            return f"Cannot determine team for player 2 in event {event['id']}."
-        player_2_team_season = session.scalar(select(m.PlayerTeamSeason).where(
-            m.PlayerTeamSeason.season_id == season_id, m.PlayerTeamSeason.player_id == event['player_2_id'],
-            m.PlayerTeamSeason.team_id == player_2_team_id))
-        if player_2_team_season is None:
-            player_2_team_season = m.init_player_team_season(season_id, event['player_2_id'], player_2_team_id)
-            is_add_player_2_team_season = True
-
-        player_2_game = session.scalar(select(m.GamePlayer).where(
-            m.GamePlayer.game_id == event['game_id'], m.GamePlayer.player_id == event['player_2_id']))
-        if player_2_game is None:
-            player_2_game = m.init_game_player(event['game_id'], event['player_2_id'])
-            is_add_player_2_game = True
+    is_head = and_(
+        ~exists().where(earlier.game_id == queue.game_id, tuple_(earlier.date_time, earlier.id) < tuple_(queue.date_time, queue.id)),
+        ~exists().where(dead_letter.game_id == queue.game_id))
 
-    else:
-        player_2_season = None
-        player_2_team_season = None
-        player_2_game = None
+    # The entries due for a retry, then the pending ones, which are scanned with the partial index.
+    heads = session.scalars(select(queue).where(queue.retry_at <= func.now(), is_head).
+        order_by(queue.date_time, queue.id).limit(BATCH_SIZE).with_for_update(skip_locked=True)).all()
+    if len(heads) < BATCH_SIZE:
+        heads += session.scalars(select(queue).where(queue.retry_at == None, is_head).
+            order_by(queue.date_time, queue.id).limit(BATCH_SIZE - len(heads)).with_for_update(skip_locked=True)).all()
+    if len(heads) == 0:
+        return []
 
-    # endregion
+    game_ids = {head.game_id for head in heads if head.game_id is not None}
+    rest = session.scalars(select(queue).where(queue.game_id.in_(list(game_ids)),
+        queue.id.not_in([head.id for head in heads])).order_by(queue.date_time, queue.id).with_for_update()).all()
 
-    # region Analyze event
+    return sorted([*heads, *rest], key=lambda entry: (entry.date_time, str(entry.id)))
 
-    diff = (1 if is_add else -1)
+def delete_applied_entry(session: Session, entry: Any) -> None:
+    """Deletes a queue entry whose statistics deltas have been applied and logs it."""
 
-    if event['event_name'] == "shot on goal":
+    payload = json.loads(entry.payload)
+    status_str = "Applied" if entry.status == GameEventSystemStatus.NEW else "Deleted"
+    session.delete(entry)
+    write_log(session, f'INFO: {status_str} {payload["type"]} {payload["id"]}.')
 
-        if player_season is None:
-            return form_missing_person_message("player", event)
-        if goalie_season is None:
-            return form_missing_person_message("goalie", event)
+def fail_entry(session: Session, entry: Any, error_message: str) -> bool:
+    """Records a failed analysis of a queue entry.
 
-        goalie_season.shots_on_goal += diff
-        goalie_team_season.shots_on_goal += diff
-        goalie_game.shots_on_goal += diff
-        player_season.shots_on_goal += diff
-        player_team_season.shots_on_goal += diff
-        player_game.shots_on_goal += diff
+    The entry is retried after `RETRY_DELAY` seconds, doubled after each further failure, and is moved
+    to the dead letters after `MAX_ATTEMPTS` failures. Either way the later entries of its game wait.
 
-        if event['is_scoring_chance']:
-            player_season.scoring_chances += diff
-            player_team_season.scoring_chances += diff
-            player_game.scoring_chances += diff
+    :returns: Whether the entry was moved to the dead letters.
+    """
 
-        if event['shot_type'] == "goal":
+    entry.error_message = error_message
+    entry.retry_count += 1
 
-            player_season.goals += diff
-            player_team_season.goals += diff
-            player_game.goals += diff
+    if entry.retry_count >= MAX_ATTEMPTS:
+        dead_letter = m.GameEventsAnalysisDeadLetter
+        session.execute(insert(dead_letter).values(id=entry.id, payload=entry.payload, status=entry.status, date_time=entry.date_time,
+            error_message=error_message, game_id=entry.game_id, retry_count=entry.retry_count))
+        session.delete(entry)
+        write_log(session, f'ERROR: {error_message} Moved to the dead letters after {entry.retry_count} attempts.')
+        return True
 
-            if player_2_season is not None:
-                player_2_season.assists += diff
-                player_2_team_season.assists += diff
-                player_2_game.assists += diff
+    delay = RETRY_DELAY * 2 ** (entry.retry_count - 1)
+    entry.retry_at = func.now() + datetime.timedelta(seconds=delay)
+    write_log(session, f'ERROR: {error_message} Attempt {entry.retry_count} of {MAX_ATTEMPTS}, retrying in {delay:.0f} s.')
+    return False
 
-            goalie_season.goals_against += diff
-            goalie_team_season.goals_against += diff
-            goalie_game.goals_against += diff
-
-            if event['goal_type'] == "Short Handed":
-                player_season.short_handed_goals += diff
-                player_team_season.short_handed_goals += diff
-                player_game.short_handed_goals += diff
-                goalie_season.short_handed_goals_against += diff
-                goalie_team_season.short_handed_goals_against += diff
-                goalie_game.short_handed_goals_against += diff
-            elif event['goal_type'] == "Power Play":
-                player_season.power_play_goals += diff
-                player_team_season.power_play_goals += diff
-                player_game.power_play_goals += diff
-                goalie_season.power_play_goals_against += diff
-                goalie_team_season.power_play_goals_against += diff
-                goalie_game.power_play_goals_against += diff
-
-        elif event['shot_type'] == "blocked":
-
-            if player_2_season is None:
-                return form_missing_person_message("second player", event)
-
-            player_2_season.blocked_shots += diff
-            player_2_team_season.blocked_shots += diff
-            player_2_game.blocked_shots += diff
-
-        elif event['shot_type'] == "save":
-
-            goalie_season.saves += diff
-            goalie_team_season.saves += diff
-            goalie_game.saves += diff
-
-    elif event['event_name'] == "turnover":
-
-        if player_season is None:
-            return form_missing_person_message("player", event)
-
-        player_season.turnovers += diff
-        player_team_season.turnovers += diff
-        player_game.turnovers += diff
-
-    elif event['event_name'] == 'faceoff':
-
-        if player_season is None:
-            return form_missing_person_message("player", event)
-        if player_2_season is None:
-            return form_missing_person_message("second player", event)
-
-        player_season.faceoffs += diff
-        player_team_season.faceoffs += diff
-        player_game.faceoffs += diff
-        player_2_season.faceoffs += diff
-        player_2_team_season.faceoffs += diff
-        player_2_game.faceoffs += diff
-
-        player_season.faceoffs_won += diff
-        player_team_season.faceoffs_won += diff
-        player_game.faceoffs_won += diff
-
-    elif event['event_name'] == "penalty":
-
-        if goalie_season is None and player_season is None:
-            return form_missing_person_message("goalie or player", event)
-
-        time_length = datetime.timedelta(seconds=event['time_length'])
-
-        penalty_minutes = (-time_length if not is_add else time_length)
-
-        if goalie_season is not None:
-            goalie_season.penalty_minutes += penalty_minutes
-            goalie_team_season.penalty_minutes += penalty_minutes
-            goalie_game.penalty_minutes += penalty_minutes
-
-        if player_season is not None:
-            player_season.penalty_minutes += penalty_minutes
-            player_team_season.penalty_minutes += penalty_minutes
-            player_game.penalty_minutes += penalty_minutes
-
-        if player_2_season is not None:
-            player_2_season.penalties_drawn += penalty_minutes
-            player_2_team_season.penalties_drawn += penalty_minutes
-            player_2_game.penalties_drawn += penalty_minutes
-
-    # endregion
-
-    # region Add new entries to the database.
-
-    if is_add_goalie_season:
-        session.add(goalie_season)
-        session.flush()
-    if is_add_goalie_team_season:
-        session.add(goalie_team_season)
-        session.flush()
-    if is_add_goalie_game:
-        session.add(goalie_game)
-        session.flush()
-
-    if is_add_player_season:
-        session.add(player_season)
-        session.flush()
-    if is_add_player_team_season:
-        session.add(player_team_season)
-        session.flush()
-    if is_add_player_game:
-        session.add(player_game)
-        session.flush()
-
-    if is_add_player_2_season:
-        session.add(player_2_season)
-        session.flush()
-    if is_add_player_2_team_season:
-        session.add(player_2_team_season)
-        session.flush()
-    if is_add_player_2_game:
-        session.add(player_2_game)
-        session.flush()
+def bump_resource_version(session: Session, name: str) -> None:
+    """Increments the version of an API resource, so clients reload it instead of using their cached copy."""
 
-    # endregion
+    rv = m.ResourceVersion
+    statement = pg_insert(rv).values(name=name, version=1, last_modified=func.now())
+    session.execute(statement.on_conflict_do_update(index_elements=[rv.name],
+        set_={'version': rv.version + 1, 'last_modified': func.now()}))
 
-def analyze_game(game: dict[str, Any], is_add: bool) -> str | None:
-    """Analyzes the game scoped events: win/loss/tie.
-    
-    :param game: The game to analyze.
-    :returns: An error message if an error occurs, otherwise None.
+def fail_game_write(session: Session, analysis: GameAnalysis) -> bool:
+    """Fails the oldest applied entry of a game whose statistics could not be written with the current exception.
+
+    :returns: Whether the entry was moved to the dead letters.
+    """
+
+    entry = analysis.applied_entries[0]
+    return fail_entry(session, entry, f"ERROR: Writing the statistics of entry {entry.id} raised an exception.\n{traceback.format_exc()}")
+
+def write_game_analyses(session: Session, analyses: list[GameAnalysis], stat_tables: dict[str, StatTable]) -> tuple[list[GameAnalysis], list[bool]]:
+    """Writes the statistics deltas of the analyzed games of a claim and deletes their applied entries.
+
+    The games are written together in a savepoint. If that fails, e.g. on a foreign key violation for a deleted game,
+    each game is written in a savepoint of its own and the oldest applied entry of a game that still fails is failed
+    with the traceback, so a single game cannot roll back the rest of the claim.
+
+    :param analyses: Results of `analyze_game_entries()` with applied entries.
+    :returns: The written analyses, and for each failed game whether its entry was moved to the dead letters.
+    """
+
+    batch = StatsBatch(stat_tables)
+    for analysis in analyses:
+        batch.merge(analysis.stats)
+    try:
+        with session.begin_nested():
+            for analysis in analyses:
+                for entry in analysis.applied_entries:
+                    delete_applied_entry(session, entry)
+            batch.write(session)
+        return analyses, []
+    except Exception:
+        if len(analyses) == 1:
+            return [], [fail_game_write(session, analyses[0])]
+
+    written_analyses = []
+    failed_games = []
+    for analysis in analyses:
+        try:
+            with session.begin_nested():
+                for entry in analysis.applied_entries:
+                    delete_applied_entry(session, entry)
+                analysis.stats.write(session)
+            written_analyses.append(analysis)
+        except Exception:
+            failed_games.append(fail_game_write(session, analysis))
+    return written_analyses, failed_games
+
+def drain_queue(stat_tables: dict[str, StatTable]) -> tuple[int, float]:
+    """Worker: applies claimed queue entries to the statistics until there is nothing left to claim.
+
+    The statistics deltas of a claim are accumulated in memory and written with a few set-based statements,
+    in the same transaction as the removal of the applied entries, see `write_game_analyses()`.
+    The entries of a game are applied as their net change, see `analyze_game_entries()`.
+
+    :param stat_tables: Statistics tables returned by `get_stat_tables()`.
+    :returns: The number of processed queue entries and the seconds spent.
     """
 
-    diff = (1 if is_add else -1)
+    session, dbsession = m.new_session()
+    processed_count = 0
+    start_time = time.monotonic()
+
+    try:
+        while not stop_requested:
+            round_trips_start = metrics.get_round_trips()
+            # Waits while the statistics are rebuilt, see `stats_rebuild.py`.
+            session.execute(select(func.pg_advisory_xact_lock_shared(STATS_LOCK_KEY)))
+            entries = claim_entries(session)
+            if len(entries) == 0:
+                session.commit()
+                break
+            # Foreign keys are checked by each statement instead of the commit, so a violation fails the savepoint of its game.
+            session.execute(text("SET CONSTRAINTS ALL IMMEDIATE"))
+
+            analyses = []
+            coalesced_entry_count = coalesced_game_count = item_count = skipped_item_count = 0
+            retried_count = dead_lettered_count = 0
+
+            for game_entries in group_entries(entries):
+                game_start_time = time.monotonic()
+                analysis = analyze_game_entries(game_entries, stat_tables)
+                if len(analysis.applied_entries) > 0:
+                    analyses.append(analysis)
+                if analysis.is_coalesced:
+                    coalesced_entry_count += len(game_entries)
+                    coalesced_game_count += 1
+                    item_count += analysis.item_count
+                    skipped_item_count += analysis.skipped_item_count
+                if analysis.failed_entry is not None:
+                    if fail_entry(session, analysis.failed_entry, analysis.error_message):
+                        dead_lettered_count += 1
+                    else:
+                        retried_count += 1
+                metrics.GAME_SECONDS.observe(time.monotonic() - game_start_time)
+
+            if coalesced_game_count > 0:
+                write_log(session, f"INFO: Coalesced {coalesced_entry_count} entries of {coalesced_game_count} games, "
+                    f"skipped {skipped_item_count} of {item_count} payload items.")
+
+            commit_start_time = time.monotonic()
+            written_analyses, failed_games = write_game_analyses(session, analyses, stat_tables)
+            dead_lettered_count += sum(failed_games)
+            retried_count += len(failed_games) - sum(failed_games)
+            if any(len(analysis.stats.rows['team_seasons']) > 0 for analysis in written_analyses):
+                bump_resource_version(session, TEAMS_RESOURCE_NAME)
+            # Queue times of the applied entries, reported to the metrics after the commit.
+            applied_date_times = [entry.date_time for analysis in written_analyses for entry in analysis.applied_entries]
+            session.commit()
+            metrics.COMMIT_SECONDS.observe(time.monotonic() - commit_start_time)
+
+            now = datetime.datetime.now(datetime.timezone.utc)
+            for date_time in applied_date_times:
+                metrics.ENTRY_LATENCY_SECONDS.observe((now - date_time).total_seconds())
+            metrics.ENTRIES.labels("applied").inc(len(applied_date_times))
+            metrics.ENTRIES.labels("retried").inc(retried_count)
+            metrics.ENTRIES.labels("dead_lettered").inc(dead_lettered_count)
+            metrics.PAYLOAD_ITEMS.labels("analyzed").inc(item_count - skipped_item_count)
+            metrics.PAYLOAD_ITEMS.labels("skipped").inc(skipped_item_count)
+            round_trips = metrics.get_round_trips() - round_trips_start
+            metrics.ROUND_TRIPS.inc(round_trips)
+            metrics.ROUND_TRIPS_PER_ENTRY.observe(round_trips / len(entries))
+
+            processed_count += len(entries)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        m.remove_session(session, dbsession)
+
+    return processed_count, time.monotonic() - start_time
+
+def analyze_queue(session: Session, executor: ThreadPoolExecutor, stat_tables: dict[str, StatTable]) -> None:
+    """Applies all pending analysis queue entries to the statistics with `WORKERS` workers.
     
-    season_id = game['season_id']
-
-    home_team_id = game['home_team_id']
-    away_team_id = game['away_team_id']
-
-    # region Get home_team_season, away_team_season.
-
-    home_team_season = session.scalar(select(m.TeamSeason).where(
-        m.TeamSeason.season_id == season_id, m.TeamSeason.team_id == home_team_id))
-    away_team_season = session.scalar(select(m.TeamSeason).where(
-        m.TeamSeason.season_id == season_id, m.TeamSeason.team_id == away_team_id))
-
-    is_add_home_team_season = False
-    is_add_away_team_season = False
-    if home_team_season is None:
-        home_team_season = m.init_team_season(season_id, home_team_id)
-        is_add_home_team_season = True
-    if away_team_season is None:
-        away_team_season = m.init_team_season(season_id, away_team_id)
-        is_add_away_team_season = True
-
-    # endregion
-
-    home_goalies_on_ice = ([game['home_start_goalie_id']] +
-        [evt['goalie_id'] for evt in game['events'] if (evt['event_name'] == "goalie change" and evt['team_id'] == game['home_team_id'])])
-    away_goalies_on_ice = ([game['away_start_goalie_id']] +
-        [evt['goalie_id'] for evt in game['events'] if (evt['event_name'] == "goalie change" and evt['team_id'] == game['away_team_id'])])
-
-    last_home_goalie_id = home_goalies_on_ice[-1]
-    last_away_goalie_id = away_goalies_on_ice[-1]
-
-    for game_home_goalie_id in game['home_goalies']:
-
-        # region Get home_goalie_season, home_goalie_game.
-
-        is_add_home_goalie_season = False
-        is_add_home_goalie_team_season = False
-        is_add_home_goalie_game = False
-        home_goalie_season = session.scalar(select(m.GoalieSeason).where(
-            m.GoalieSeason.season_id == season_id, m.GoalieSeason.goalie_id == game_home_goalie_id))
-        if home_goalie_season is None:
-            home_goalie_season = m.init_goalie_season(season_id, game_home_goalie_id)
-            is_add_home_goalie_season = True
-        home_goalie_team_season = session.scalar(select(m.GoalieTeamSeason).where(
-            m.GoalieTeamSeason.season_id == season_id, m.GoalieTeamSeason.goalie_id == game_home_goalie_id,
-            m.GoalieTeamSeason.team_id == home_team_id))
-        if home_goalie_team_season is None:
-            home_goalie_team_season = m.init_goalie_team_season(season_id, game_home_goalie_id, home_team_id)
-            is_add_home_goalie_team_season = True
-        home_goalie_game = session.scalar(select(m.GameGoalie).where(
-            m.GameGoalie.game_id == game['id'], m.GameGoalie.goalie_id == game_home_goalie_id))
-        if home_goalie_game is None:
-            home_goalie_game = m.init_game_goalie(game['id'], game_home_goalie_id)
-            is_add_home_goalie_game = True
-
-        # endregion
-
-        if home_goalie_season.goalie_id in home_goalies_on_ice:
-            home_goalie_season.games_played += diff
-            home_goalie_team_season.games_played += diff
-
-        if game['away_goals'] > game['home_goals'] and home_goalie_season.goalie_id == game['home_start_goalie_id']:
-            # The goalie that started the game in net gets the loss if the team loses the game.
-            home_goalie_season.losses += diff
-            home_goalie_team_season.losses += diff
-
-        elif game['away_goals'] < game['home_goals'] and home_goalie_season.goalie_id == last_home_goalie_id:
-            # The goalie that finishes the game in net gets the win if the team wins the game.
-            home_goalie_season.wins += diff
-            home_goalie_team_season.wins += diff
-
-        elif game['away_goals'] == game['home_goals'] and home_goalie_season.goalie_id == last_home_goalie_id:
-            # The goalie that finishes the game in net gets the tie if the team ties the game.
-            home_goalie_season.ties += diff
-            home_goalie_team_season.ties += diff
-
-        if is_add_home_goalie_season:
-            session.add(home_goalie_season)
-            session.flush()
-        if is_add_home_goalie_team_season:
-            session.add(home_goalie_team_season)
-            session.flush()
-        if is_add_home_goalie_game:
-            session.add(home_goalie_game)
-            session.flush()
-
-    for game_away_goalie_id in game['away_goalies']:
-
-        # region Get away_goalie_season, away_goalie_game.
-
-        is_add_away_goalie_season = False
-        is_add_away_goalie_team_season = False
-        is_add_away_goalie_game = False
-        away_goalie_season = session.scalar(select(m.GoalieSeason).where(
-            m.GoalieSeason.season_id == season_id, m.GoalieSeason.goalie_id == game_away_goalie_id))
-        if away_goalie_season is None:
-            away_goalie_season = m.init_goalie_season(season_id, game_away_goalie_id)
-            is_add_away_goalie_season = True
-        away_goalie_team_season = session.scalar(select(m.GoalieTeamSeason).where(
-            m.GoalieTeamSeason.season_id == season_id, m.GoalieTeamSeason.goalie_id == game_away_goalie_id,
-            m.GoalieTeamSeason.team_id == away_team_id))
-        if away_goalie_team_season is None:
-            away_goalie_team_season = m.init_goalie_team_season(season_id, game_away_goalie_id, away_team_id)
-            is_add_away_goalie_team_season = True
-        away_goalie_game = session.scalar(select(m.GameGoalie).where(
-            m.GameGoalie.game_id == game['id'], m.GameGoalie.goalie_id == game_away_goalie_id))
-        if away_goalie_game is None:
-            away_goalie_game = m.init_game_goalie(game['id'], game_away_goalie_id)
-            is_add_away_goalie_game = True
-
-        # endregion
-
-        if away_goalie_season.goalie_id in away_goalies_on_ice:
-            away_goalie_season.games_played += diff
-            away_goalie_team_season.games_played += diff
-
-        if game['home_goals'] > game['away_goals'] and away_goalie_season.goalie_id == game['away_start_goalie_id']:
-            # The goalie that started the game in net gets the loss if the team loses the game.
-            away_goalie_season.losses += diff
-            away_goalie_team_season.losses += diff
-
-        elif game['home_goals'] < game['away_goals'] and away_goalie_season.goalie_id == last_away_goalie_id:
-            # The goalie that finishes the game in net gets the win if the team wins the game.
-            away_goalie_season.wins += diff
-            away_goalie_team_season.wins += diff
-
-        elif game['home_goals'] == game['away_goals'] and away_goalie_season.goalie_id == last_away_goalie_id:
-            # The goalie that finishes the game in net gets the tie if the team ties the game.
-            away_goalie_season.ties += diff
-            away_goalie_team_season.ties += diff
-
-        if is_add_away_goalie_season:
-            session.add(away_goalie_season)
-            session.flush()
-        if is_add_away_goalie_team_season:
-            session.add(away_goalie_team_season)
-            session.flush()
-        if is_add_away_goalie_game:
-            session.add(away_goalie_game)
-            session.flush()
-
-    for game_home_player_id in game['home_players']:
-
-        # region Get home_player_season, home_player_game.
-
-        is_add_home_player_season = False
-        is_add_home_player_team_season = False
-        is_add_home_player_game = False
-        home_player_season = session.scalar(select(m.PlayerSeason).where(
-            m.PlayerSeason.season_id == season_id, m.PlayerSeason.player_id == game_home_player_id))
-        if home_player_season is None:
-            home_player_season = m.init_player_season(season_id, game_home_player_id)
-            is_add_home_player_season = True
-        home_player_team_season = session.scalar(select(m.PlayerTeamSeason).where(
-            m.PlayerTeamSeason.season_id == season_id, m.PlayerTeamSeason.player_id == game_home_player_id,
-            m.PlayerTeamSeason.team_id == home_team_id))
-        if home_player_team_season is None:
-            home_player_team_season = m.init_player_team_season(season_id, game_home_player_id, home_team_id)
-            is_add_home_player_team_season = True
-        home_player_game = session.scalar(select(m.GamePlayer).where(
-            m.GamePlayer.game_id == game['id'], m.GamePlayer.player_id == game_home_player_id))
-        if home_player_game is None:
-            home_player_game = m.init_game_player(game['id'], game_home_player_id)
-            is_add_home_player_game = True
-
-        # endregion
-
-        home_player_season.games_played += diff
-        home_player_team_season.games_played += diff
-
-        if is_add_home_player_season:
-            session.add(home_player_season)
-            session.flush()
-        if is_add_home_player_team_season:
-            session.add(home_player_team_season)
-            session.flush()
-        if is_add_home_player_game:
-            session.add(home_player_game)
-            session.flush()
-
-    for game_away_player_id in game['away_players']:
-
-        # region Get away_player_season, away_player_game.
-
-        is_add_away_player_season = False
-        is_add_away_player_team_season = False
-        is_add_away_player_game = False
-        away_player_season = session.scalar(select(m.PlayerSeason).where(
-            m.PlayerSeason.season_id == season_id, m.PlayerSeason.player_id == game_away_player_id))
-        if away_player_season is None:
-            away_player_season = m.init_player_season(season_id, game_away_player_id)
-            is_add_away_player_season = True
-        away_player_team_season = session.scalar(select(m.PlayerTeamSeason).where(
-            m.PlayerTeamSeason.season_id == season_id, m.PlayerTeamSeason.player_id == game_away_player_id,
-            m.PlayerTeamSeason.team_id == away_team_id))
-        if away_player_team_season is None:
-            away_player_team_season = m.init_player_team_season(season_id, game_away_player_id, away_team_id)
-            is_add_away_player_team_season = True
-        away_player_game = session.scalar(select(m.GamePlayer).where(
-            m.GamePlayer.game_id == game['id'], m.GamePlayer.player_id == game_away_player_id))
-        if away_player_game is None:
-            away_player_game = m.init_game_player(game['id'], game_away_player_id)
-            is_add_away_player_game = True
-
-        # endregion
-
-        away_player_season.games_played += diff
-        away_player_team_season.games_played += diff
-
-        if is_add_away_player_season:
-            session.add(away_player_season)
-            session.flush()
-        if is_add_away_player_team_season:
-            session.add(away_player_team_season)
-            session.flush()
-        if is_add_away_player_game:
-            session.add(away_player_game)
-            session.flush()
-
-    home_team_season.games_played += diff
-    away_team_season.games_played += diff
-
-    if game['home_goals'] > game['away_goals']:
-        home_team_season.wins += diff
-        away_team_season.losses += diff
-    elif game['home_goals'] < game['away_goals']:
-        home_team_season.losses += diff
-        away_team_season.wins += diff
+    :param session: Session to write the log to.
+    :param executor: Executor running the workers.
+    :param stat_tables: Statistics tables returned by `get_stat_tables()`.
+    """
+
+    futures = [executor.submit(drain_queue, stat_tables) for _ in range(WORKERS)]
+
+    errors = []
+    for worker_number, future in enumerate(futures, start=1):
+        try:
+            processed_count, seconds = future.result()
+        except Exception:
+            errors.append(f"Worker {worker_number}: {traceback.format_exc()}")
+            continue
+        if processed_count > 0:
+            write_log(session, f"INFO: Worker {worker_number} processed {processed_count} entries in {seconds:.2f} s "
+                f"({processed_count / seconds:.1f} entries/s).")
+    session.commit()
+
+    if len(errors) > 0:
+        raise Exception("\n".join(errors))
+
+def update_queue_metrics(session: Session) -> None:
+    """Sets the queue gauges from the current queue and dead letters."""
+
+    queue = m.GameEventsAnalysisQueue
+    entry_count, oldest_entry_age = session.execute(select(func.count(),
+        func.coalesce(extract('epoch', func.now() - func.min(queue.date_time)), 0))).one()
+    metrics.QUEUE_ENTRIES.set(entry_count)
+    metrics.OLDEST_ENTRY_AGE_SECONDS.set(oldest_entry_age)
+    metrics.DEAD_LETTERS.set(session.scalar(select(func.count()).select_from(m.GameEventsAnalysisDeadLetter)))
+    session.commit()
+    metrics.LAST_PASS_TIMESTAMP_SECONDS.set_to_current_time()
+
+def set_process_status(session: Session, status: str) -> None:
+    """Sets the status of the analyzer process and commits it."""
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if status == "RUNNING":
+        values = {"status": status, "last_updated": now}
     else:
-        home_team_season.ties += diff
-        away_team_season.ties += diff
+        values = {"status": status, "last_finished": now}
+    session.execute(update(m.ProcessStatus).where(m.ProcessStatus.name == "game_events_analyzer").values(**values))
+    session.commit()
 
-    home_goals = (game['home_goals'] if is_add else -game['home_goals'])
-    away_goals = (game['away_goals'] if is_add else -game['away_goals'])
-    
-    home_team_season.goals_for += home_goals
-    away_team_season.goals_for += away_goals
-    home_team_season.goals_against += away_goals
-    away_team_season.goals_against += home_goals
+def request_stop(signum: int, frame: Any) -> None:
+    """Signal handler: stops the analyzer after the current pass over the queue."""
+
+    global stop_requested
+    stop_requested = True
 
-    if is_add_home_team_season:
-        session.add(home_team_season)
-        session.flush()
-    if is_add_away_team_season:
-        session.add(away_team_season)
-        session.flush()
+def wait_for_queue(listen_conn: Any, wakeup_fd: int) -> Any:
+    """Waits for a notification about new queue entries, a stop signal or the poll interval to pass.
 
+    If the listening connection is lost, e.g. when the database restarts, it is closed and the wait ends:
+    the notifications sent meanwhile are lost, so the caller listens again and makes a full pass over the queue.
 
+    :param listen_conn: Connection returned by `Models.new_listen_connection()`, or None if it has to be re-created.
+    :returns: The listening connection, or None if it was lost.
+    """
+
+    try:
+        readable, _, _ = fd_select.select([wakeup_fd] + ([listen_conn] if listen_conn is not None else []), [], [], POLL_INTERVAL)
+        if listen_conn is not None and listen_conn in readable:
+            listen_conn.poll()
+            listen_conn.notifies.clear()
+        return listen_conn
+    except psycopg2.Error:
+        print_console(f"ERROR: Lost the connection listening to the queue notifications.\n{traceback.format_exc()}")
+        try:
+            listen_conn.close()
+        except psycopg2.Error:
+            pass
+        return None
+
+
+session = None
 try:
-    warning_msgs = []
     config.read(f"{app_path}/settings.ini")
-    m = Models(f'postgresql://{os.getenv("DB_USER")}:{os.getenv("DB_PASSWORD")}@{os.getenv("DB_HOST")}:{os.getenv("DB_PORT")}/{os.getenv("DB_NAME_HOCKEY")}?sslmode={os.getenv("SSLMODE")}')
+    m = Models(get_db_conn_str(), pool_size=WORKERS + 1)
+    m.listen("before_cursor_execute", metrics.count_round_trip)
+    metrics.start_metrics_server()
     session, dbsession = m.new_session()
 
     process_status = session.scalar(select(m.ProcessStatus).where(m.ProcessStatus.name == "game_events_analyzer"))
     if process_status is None:
-        process_status = m.ProcessStatus(name="game_events_analyzer", log="")
+        process_status = m.ProcessStatus(name="game_events_analyzer", last_updated=datetime.datetime.now(datetime.timezone.utc))
         session.add(process_status)
-    process_status.status = "RUNNING"
-    process_status.last_updated = datetime.datetime.now(datetime.timezone.utc)
-    session.commit()
-
-    res = None
-
-    events = session.scalars(select(m.GameEventsAnalysisQueue).where(m.GameEventsAnalysisQueue.error_message == None).\
-        order_by(m.GameEventsAnalysisQueue.date_time)).all()
-    
-    for event in events:
-        error_messages = []
-        payload = json.loads(event.payload)
-
-        if payload['type'] == 'game':
-
-            if event.status not in [GameEventSystemStatus.NEW, GameEventSystemStatus.DEPRECATED]:
-                write_log(f"ERROR: Game {event.id} has an unknown status: {event.status}.")
-                continue
-
-            is_add = (event.status == GameEventSystemStatus.NEW)
-
-            for payload_event in payload['events']:
-                error_message = analyze_game_event(payload_event, is_add)
-                if error_message is not None:
-                    error_messages.append(error_message)
-                    break
-            if len(error_messages) == 0:
-                error_message = analyze_game(payload, is_add)
-                if error_message is not None:
-                    error_messages.append(error_message)
-
-            if len(error_messages) > 0:
-                error_message = '\n'.join(error_messages)
-
-        elif payload['type'] == 'game_event':
-
-            if event.status not in [GameEventSystemStatus.NEW, GameEventSystemStatus.DEPRECATED]:
-                write_log(f"ERROR: Game event {event.id} has an unknown status: {event.status}.")
-                continue
-
-            is_add = (event.status == GameEventSystemStatus.NEW)
-            error_message = analyze_game_event(payload, is_add)
-                
-        else:
-            error_message = f"ERROR: Event {event.id} has no game event or game."
-        
-        if error_message is not None:
-            event.error_message = error_message
-            write_log(f'ERROR: {error_message}')
-        else:
-            status_str = "Applied" if event.status == GameEventSystemStatus.NEW else "Deleted"
-            session.delete(event)
-            write_log(f'INFO: {status_str} {payload["type"]} {payload["id"]}.')
-        
         session.commit()
-
-    session.execute(update(m.ProcessStatus).where(m.ProcessStatus.name == "game_events_analyzer").\
-        values(status="OK", last_finished=datetime.datetime.now(datetime.timezone.utc)))
-    session.commit()
-
-except Exception as e:
-    session.rollback()
-    write_log(f"ERROR: {traceback.format_exc()}")
-    session.execute(update(m.ProcessStatus).where(m.ProcessStatus.name == "game_events_analyzer").\
-        values(status="ERROR", last_finished=datetime.datetime.now(datetime.timezone.utc)))
-    session.commit()
+    process_id = process_status.id
+
+    stat_tables = get_stat_tables(m)
+    executor = ThreadPoolExecutor(max_workers=WORKERS)
+
+    # Signals interrupt the wait for notifications by writing to the wakeup pipe.
+    wakeup_read_fd, wakeup_write_fd = os.pipe()
+    os.set_blocking(wakeup_write_fd, False)
+    signal.set_wakeup_fd(wakeup_write_fd)
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    listen_conn = None
+
+    while not stop_requested:
+        try:
+            # Listen before the first pass and before the pass after a lost connection (see `wait_for_queue()`),
+            # so the entries added during a pass trigger the next one.
+            if listen_conn is None:
+                listen_conn = m.new_listen_connection(QUEUE_NOTIFY_CHANNEL)
+            set_process_status(session, "RUNNING")
+            analyze_queue(session, executor, stat_tables)
+            trim_log(session)
+            update_queue_metrics(session)
+            set_process_status(session, "OK")
+            metrics.PASSES.labels("ok").inc()
+        except Exception as e:
+            session.rollback()
+            write_log(session, f"ERROR: {traceback.format_exc()}")
+            set_process_status(session, "ERROR")
+            metrics.PASSES.labels("error").inc()
+        metrics.write_metrics_textfile()
+
+        if not stop_requested:
+            listen_conn = wait_for_queue(listen_conn, wakeup_read_fd)
+
+    executor.shutdown()
+    if listen_conn is not None:
+        listen_conn.close()
 finally:
     if session is not None: m.remove_session(session, dbsession)
-    time.sleep(3)
\ No newline at end of file
@@ -0,0 +1,59 @@
+import os
+import threading
+from typing import Any, Final
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, start_http_server, write_to_textfile
+
+# Port the metrics are served on, if set.
+METRICS_PORT: Final = os.getenv("ANALYZER_METRICS_PORT")
+# Address the metrics are served on: set it to 0.0.0.0 to let a scraper outside of the container reach them.
+METRICS_ADDR: Final = os.getenv("ANALYZER_METRICS_ADDR", "127.0.0.1")
+# File the metrics are written to after each pass over the queue, for the node exporter textfile collector, if set.
+METRICS_TEXTFILE: Final = os.getenv("ANALYZER_METRICS_TEXTFILE")
+
+# Buckets of the durations, in seconds.
+DURATION_BUCKETS: Final = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Buckets of the time from queueing an entry to committing its statistics, in seconds.
+LATENCY_BUCKETS: Final = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+# Buckets of the database round trips per entry.
+ROUND_TRIP_BUCKETS: Final = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50)
+
+ENTRIES = Counter("analyzer_entries", "Processed queue entries by result: applied, retried or dead_lettered.", ["result"])
+PAYLOAD_ITEMS = Counter("analyzer_payload_items", "Events and game-level data of the coalesced entries by outcome: analyzed or skipped.", ["outcome"])
+ROUND_TRIPS = Counter("analyzer_round_trips", "Database round trips of the workers applying the claims.")
+PASSES = Counter("analyzer_passes", "Passes over the queue by result: ok or error.", ["result"])
+
+GAME_SECONDS = Histogram("analyzer_game_seconds", "Time spent analyzing the claimed entries of a game.", buckets=DURATION_BUCKETS)
+COMMIT_SECONDS = Histogram("analyzer_commit_seconds", "Time spent writing the statistics of a claim and committing it.", buckets=DURATION_BUCKETS)
+ENTRY_LATENCY_SECONDS = Histogram("analyzer_entry_latency_seconds", "Time from queueing an entry to committing its statistics.",
+                                  buckets=LATENCY_BUCKETS)
+ROUND_TRIPS_PER_ENTRY = Histogram("analyzer_round_trips_per_entry", "Database round trips of a claim divided by its number of entries.",
+                                  buckets=ROUND_TRIP_BUCKETS)
+
+QUEUE_ENTRIES = Gauge("analyzer_queue_entries", "Entries in the queue after the last pass, including the ones waiting for a retry.")
+DEAD_LETTERS = Gauge("analyzer_dead_letters", "Entries moved to the dead letters.")
+OLDEST_ENTRY_AGE_SECONDS = Gauge("analyzer_oldest_entry_age_seconds", "Age of the oldest entry in the queue after the last pass, 0 if it is empty.")
+LAST_PASS_TIMESTAMP_SECONDS = Gauge("analyzer_last_pass_timestamp_seconds", "Time the last pass over the queue finished.")
+
+_round_trips = threading.local()
+
+def count_round_trip(*args: Any) -> None:
+    """Engine `before_cursor_execute` listener: counts the statements executed by the current thread."""
+
+    _round_trips.count = get_round_trips() + 1
+
+def get_round_trips() -> int:
+    """Returns the number of statements executed by the current thread."""
+
+    return getattr(_round_trips, "count", 0)
+
+def start_metrics_server() -> None:
+    """Serves the metrics on `METRICS_PORT` in a background thread, if it is set."""
+
+    if METRICS_PORT:
+        start_http_server(int(METRICS_PORT), addr=METRICS_ADDR)
+
+def write_metrics_textfile() -> None:
+    """Writes the metrics to `METRICS_TEXTFILE`, if it is set."""
+
+    if METRICS_TEXTFILE:
+        write_to_textfile(METRICS_TEXTFILE, REGISTRY)
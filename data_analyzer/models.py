@@ -1,13 +1,22 @@
 import datetime
-from sqlalchemy import create_engine, select
+import os
+from typing import Any, Callable
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
 
+def get_db_conn_str() -> str:
+    """Returns the connection string of the hockey database from the environment variables."""
+
+    return (f'postgresql://{os.getenv("DB_USER")}:{os.getenv("DB_PASSWORD")}@{os.getenv("DB_HOST")}:{os.getenv("DB_PORT")}/'
+        f'{os.getenv("DB_NAME_HOCKEY")}?sslmode={os.getenv("SSLMODE")}')
+
 class Models:
-    def __init__(self, db_conn_str: str):
+    def __init__(self, db_conn_str: str, pool_size: int = 5):
         self._dbbase = automap_base()
-        self._dbengine = create_engine(db_conn_str)
+        self._dbengine = create_engine(db_conn_str, pool_size=pool_size, pool_pre_ping=True)
         self._dbbase.prepare(self._dbengine)
         
         self.Goalie = self._dbbase.classes.goalies
@@ -33,8 +42,12 @@ class Models:
 
         self.GameEvents = self._dbbase.classes.game_events
         self.GameEventsAnalysisQueue = self._dbbase.classes.game_events_analysis_queue
+        self.GameEventsAnalysisDeadLetter = self._dbbase.classes.game_events_analysis_dead_letters
 
         self.ProcessStatus = self._dbbase.classes.processes_status
+        self.ProcessLog = self._dbbase.classes.process_logs
+
+        self.ResourceVersion = self._dbbase.classes.resource_versions
 
         self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self._dbengine)
 
@@ -48,6 +61,32 @@ class Models:
         session = dbsession()
         return session, dbsession
     
+    def connect(self) -> Connection:
+        """Opens a pooled connection for Core statements outside of the sessions."""
+
+        return self._dbengine.connect()
+
+    def listen(self, identifier: str, fn: Callable[..., Any]) -> None:
+        """Registers a listener of the engine events, such as `before_cursor_execute`."""
+
+        event.listen(self._dbengine, identifier, fn)
+
+    def new_listen_connection(self, channel: str) -> Any:
+        """Creates a DBAPI connection in autocommit mode listening to the Postgres notification channel.
+        
+        :param channel: Channel to listen to.
+        :returns: Connection whose `poll()` and `notifies` are used to receive the notifications.
+        """
+
+        # The connection is detached from the pool: it is never reused by the sessions.
+        pool_conn = self._dbengine.raw_connection()
+        conn = pool_conn.driver_connection
+        pool_conn.detach()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {channel};")
+        return conn
+
     def remove_session(self, session: Session, dbsession: scoped_session):
         """Closes and removes the scoped session.
         
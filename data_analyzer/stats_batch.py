@@ -0,0 +1,128 @@
+from typing import Any, Callable
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm.session import Session
+
+from models import Models
+
+class StatTable:
+    """Description of a statistics table updated by the analyzer."""
+
+    def __init__(self, model: Any, key_columns: tuple[str, ...], init_row: Callable[..., Any], attribute_columns: tuple[str, ...] = ()):
+        """
+        :param model: The automapped class of the table.
+        :param key_columns: Columns identifying a row, in the order of the `init_row` arguments.
+        :param init_row: Function creating a row with zeroed statistics from the key column values.
+        :param attribute_columns: Columns that are not statistics, passed to the row getters and overwritten on write.
+        """
+
+        self.model = model
+        self.table = model.__table__
+        self.key_columns = key_columns
+        self.init_row = init_row
+        self.attribute_columns = attribute_columns
+
+        # The statistics columns are the ones zeroed by `init_row`.
+        zero_row = init_row(*([0] * len(key_columns)))
+        self.stat_columns = tuple(col.key for col in self.table.columns
+            if col.key in zero_row.__dict__ and col.key not in key_columns and col.key not in attribute_columns)
+
+def get_stat_tables(m: Models) -> dict[str, StatTable]:
+    """Returns the statistics tables updated by the analyzer by table name."""
+
+    return {
+        'goalie_seasons': StatTable(m.GoalieSeason, ('season_id', 'goalie_id'), m.init_goalie_season),
+        'goalie_team_seasons': StatTable(m.GoalieTeamSeason, ('season_id', 'goalie_id', 'team_id'), m.init_goalie_team_season),
+        'game_goalies': StatTable(m.GameGoalie, ('game_id', 'goalie_id'), m.init_game_goalie, ('team_id',)),
+        'player_seasons': StatTable(m.PlayerSeason, ('season_id', 'player_id'), m.init_player_season),
+        'player_team_seasons': StatTable(m.PlayerTeamSeason, ('season_id', 'player_id', 'team_id'), m.init_player_team_season),
+        'game_players': StatTable(m.GamePlayer, ('game_id', 'player_id'), m.init_game_player, ('team_id',)),
+        'team_seasons': StatTable(m.TeamSeason, ('season_id', 'team_id'), m.init_team_season),
+    }
+
+class StatsBatch:
+    """Accumulates statistics deltas in memory and writes them to the database with set-based statements.
+
+    Rows are transient instances created by the `Models.init_*()` functions, so the analysis code
+    can add deltas to their attributes as if they were loaded from the database.
+    """
+
+    def __init__(self, tables: dict[str, StatTable]):
+        """
+        :param tables: Statistics tables returned by `get_stat_tables()`.
+        """
+
+        self.tables = tables
+        self.rows: dict[str, dict[tuple, Any]] = {name: {} for name in tables}
+
+    def row(self, table_name: str, *key: int, **attributes: Any) -> Any:
+        """Gets the accumulated row for the key, creating a zeroed one if it is not in the batch yet.
+
+        :param attributes: Values of the attribute columns of the table, set on the row.
+        """
+
+        rows = self.rows[table_name]
+        row = rows.get(key)
+        if row is None:
+            row = self.tables[table_name].init_row(*key)
+            rows[key] = row
+        for col, value in attributes.items():
+            setattr(row, col, value)
+        return row
+
+    # region Row getters
+
+    def goalie_season(self, season_id: int, goalie_id: int) -> Any:
+        return self.row('goalie_seasons', season_id, goalie_id)
+
+    def goalie_team_season(self, season_id: int, goalie_id: int, team_id: int) -> Any:
+        return self.row('goalie_team_seasons', season_id, goalie_id, team_id)
+
+    def game_goalie(self, game_id: int, goalie_id: int, team_id: int) -> Any:
+        return self.row('game_goalies', game_id, goalie_id, team_id=team_id)
+
+    def player_season(self, season_id: int, player_id: int) -> Any:
+        return self.row('player_seasons', season_id, player_id)
+
+    def player_team_season(self, season_id: int, player_id: int, team_id: int) -> Any:
+        return self.row('player_team_seasons', season_id, player_id, team_id)
+
+    def game_player(self, game_id: int, player_id: int, team_id: int) -> Any:
+        return self.row('game_players', game_id, player_id, team_id=team_id)
+
+    def team_season(self, season_id: int, team_id: int) -> Any:
+        return self.row('team_seasons', season_id, team_id)
+
+    # endregion
+
+    def merge(self, other: "StatsBatch") -> None:
+        """Adds the deltas accumulated in another batch to this one, leaving the other batch unchanged."""
+
+        for table_name, other_rows in other.rows.items():
+            stat_columns = self.tables[table_name].stat_columns
+            for key, other_row in other_rows.items():
+                row = self.row(table_name, *key)
+                for col in self.tables[table_name].attribute_columns:
+                    setattr(row, col, getattr(other_row, col))
+                for col in stat_columns:
+                    setattr(row, col, getattr(row, col) + getattr(other_row, col))
+
+    def write(self, session: Session) -> None:
+        """Writes the accumulated deltas with one `INSERT ... ON CONFLICT DO UPDATE` per table.
+
+        Rows are written in key order, so concurrent writers lock them in the same order.
+        The rows are kept: the batch can be written again if the statements are rolled back.
+        """
+
+        for table_name, rows in self.rows.items():
+            if len(rows) == 0:
+                continue
+            stat_table = self.tables[table_name]
+            table = stat_table.table
+
+            value_columns = stat_table.stat_columns + stat_table.attribute_columns
+            upsert_values = [dict(zip(stat_table.key_columns, key)) | {col: getattr(rows[key], col) for col in value_columns}
+                             for key in sorted(rows.keys())]
+            statement = pg_insert(table).values(upsert_values)
+            session.execute(statement.on_conflict_do_update(index_elements=list(stat_table.key_columns),
+                set_={col: table.c[col] + statement.excluded[col] for col in stat_table.stat_columns} |
+                     {col: statement.excluded[col] for col in stat_table.attribute_columns}))
@@ -0,0 +1,360 @@
+import argparse
+import datetime
+import sys
+from typing import Any, Final
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from constants import GAME_OVER_STATUS, STATS_LOCK_KEY, TEAMS_RESOURCE_NAME
+from models import Models, get_db_conn_str
+from stats_batch import StatTable, get_stat_tables
+
+# Rebuild of the statistics of seasons from the game events and the game rosters.
+#
+# The analyzer maintains the statistics as running counters, so a lost or duplicated payload leaves them wrong.
+# The rebuild recomputes the rows of the finished games of the seasons with set-based GROUP BY statements,
+# following the rules of `analyze_game_event()` and `analyze_game()`, reports the rows that differ from the counters
+# and optionally replaces them. Events the analyzer rejects (e.g. a shot without a goalie) are left out.
+#
+# Usage: python stats_rebuild.py [--swap] [--max-rows N] SEASON_ID...
+
+# Statistics columns recomputed by the rebuild. The other statistics columns are not updated by the analyzer
+# and are left as they are.
+GOALIE_COLUMNS: Final = ('shots_on_goal', 'saves', 'goals_against', 'short_handed_goals_against', 'power_play_goals_against',
+                         'penalty_minutes', 'games_played', 'wins', 'losses', 'ties')
+PLAYER_COLUMNS: Final = ('shots_on_goal', 'goals', 'assists', 'scoring_chances', 'blocked_shots', 'short_handed_goals', 'power_play_goals',
+                         'penalty_minutes', 'penalties_drawn', 'turnovers', 'faceoffs', 'faceoffs_won', 'games_played')
+TEAM_COLUMNS: Final = ('games_played', 'wins', 'losses', 'ties', 'goals_for', 'goals_against')
+
+# Rebuilt columns of each statistics table and the temporary table with the contributions they are summed from.
+REBUILT_TABLES: Final[dict[str, tuple[tuple[str, ...], str]]] = {
+    'goalie_seasons': (GOALIE_COLUMNS, 'rebuild_goalie_stats'),
+    'goalie_team_seasons': (GOALIE_COLUMNS, 'rebuild_goalie_stats'),
+    'game_goalies': (tuple(col for col in GOALIE_COLUMNS if col not in ('games_played', 'wins', 'losses', 'ties')), 'rebuild_goalie_stats'),
+    'player_seasons': (PLAYER_COLUMNS, 'rebuild_player_stats'),
+    'player_team_seasons': (PLAYER_COLUMNS, 'rebuild_player_stats'),
+    'game_players': (tuple(col for col in PLAYER_COLUMNS if col != 'games_played'), 'rebuild_player_stats'),
+    'team_seasons': (TEAM_COLUMNS, 'rebuild_team_stats'),
+}
+
+# region Contributions
+
+# Finished games of the seasons and their events with the names the analysis payloads use.
+CREATE_GAMES_SQL = """
+CREATE TEMP TABLE rebuild_games ON COMMIT DROP AS
+    SELECT id, season_id, home_team_id, away_team_id, home_start_goalie_id, away_start_goalie_id, home_goals, away_goals
+    FROM games WHERE season_id = ANY(:season_ids) AND status = :game_over_status
+"""
+
+CREATE_EVENTS_SQL = """
+CREATE TEMP TABLE rebuild_events ON COMMIT DROP AS
+    SELECT e.id, e.game_id, g.season_id, lower(n.name) AS event_name, lower(st.name) AS shot_type, e.goal_type,
+        coalesce(e.is_scoring_chance, false) AS is_scoring_chance, coalesce(e.time_length, interval '0') AS time_length,
+        e.team_id, CASE WHEN e.team_id = g.home_team_id THEN g.away_team_id ELSE g.home_team_id END AS team_2_id,
+        e.player_id, e.player_2_id, e.goalie_id, p."order" AS period_order, e.time
+    FROM game_events e
+    JOIN rebuild_games g ON g.id = e.game_id
+    JOIN game_event_names n ON n.id = e.event_name_id
+    JOIN game_periods p ON p.id = e.period_id
+    LEFT JOIN shot_types st ON st.id = e.shot_type_id
+"""
+
+# Events with the persons `analyze_game_event()` requires, and a second player whose team it can determine.
+VALID_EVENTS_SQL = """
+valid_events AS (
+    SELECT * FROM rebuild_events WHERE CASE event_name
+        WHEN 'shot on goal' THEN player_id IS NOT NULL AND goalie_id IS NOT NULL
+            AND (shot_type IS DISTINCT FROM 'blocked' OR player_2_id IS NOT NULL)
+            AND (player_2_id IS NULL OR shot_type IN ('goal', 'missed the net', 'save', 'blocked'))
+        WHEN 'turnover' THEN player_id IS NOT NULL
+        WHEN 'faceoff' THEN player_id IS NOT NULL AND player_2_id IS NOT NULL
+        WHEN 'penalty' THEN player_id IS NOT NULL OR goalie_id IS NOT NULL
+        ELSE player_2_id IS NULL END
+)"""
+
+# Teams of the finished games, with the goalie that started the game in net and the one that finished it.
+GAME_TEAMS_SQL = """
+goalie_changes AS (
+    SELECT game_id, team_id, goalie_id,
+        row_number() OVER (PARTITION BY game_id, team_id ORDER BY period_order DESC, time ASC, id DESC) AS reverse_number
+    FROM rebuild_events WHERE event_name = 'goalie change'
+),
+game_teams AS (
+    SELECT t.*, CASE WHEN last_change.game_id IS NOT NULL THEN last_change.goalie_id ELSE t.start_goalie_id END AS last_goalie_id
+    FROM (SELECT id AS game_id, season_id, true AS is_home, home_team_id AS team_id, home_start_goalie_id AS start_goalie_id,
+                 home_goals AS goals_for, away_goals AS goals_against FROM rebuild_games
+          UNION ALL
+          SELECT id, season_id, false, away_team_id, away_start_goalie_id, away_goals, home_goals FROM rebuild_games) t
+    LEFT JOIN goalie_changes last_change ON last_change.game_id = t.game_id AND last_change.team_id = t.team_id AND last_change.reverse_number = 1
+)"""
+
+# Statistics of the persons in each game: one row per event role and per roster entry. `priority` orders the rows
+# setting the team of the game statistics: the analyzer writes the roster team last.
+CREATE_GOALIE_STATS_SQL = f"""
+CREATE TEMP TABLE rebuild_goalie_stats ON COMMIT DROP AS
+WITH {VALID_EVENTS_SQL}, {GAME_TEAMS_SQL},
+roster_goalies AS (
+    SELECT game_id, goalie_id, true AS is_home FROM games_home_goalies WHERE game_id IN (SELECT id FROM rebuild_games)
+    UNION ALL
+    SELECT game_id, goalie_id, false FROM games_away_goalies WHERE game_id IN (SELECT id FROM rebuild_games)
+)
+SELECT season_id, game_id, goalie_id, CASE WHEN event_name = 'shot on goal' THEN team_2_id ELSE team_id END AS team_id, 0 AS priority,
+    (event_name = 'shot on goal')::int AS shots_on_goal,
+    (event_name = 'shot on goal' AND shot_type = 'save')::int AS saves,
+    (event_name = 'shot on goal' AND shot_type = 'goal')::int AS goals_against,
+    (event_name = 'shot on goal' AND shot_type = 'goal' AND goal_type = 'Short Handed')::int AS short_handed_goals_against,
+    (event_name = 'shot on goal' AND shot_type = 'goal' AND goal_type = 'Power Play')::int AS power_play_goals_against,
+    CASE WHEN event_name = 'penalty' THEN time_length ELSE interval '0' END AS penalty_minutes,
+    0 AS games_played, 0 AS wins, 0 AS losses, 0 AS ties
+FROM valid_events WHERE goalie_id IS NOT NULL
+UNION ALL
+SELECT t.season_id, t.game_id, r.goalie_id, t.team_id, 1, 0, 0, 0, 0, 0, interval '0',
+    ((r.goalie_id = t.start_goalie_id OR EXISTS (SELECT 1 FROM goalie_changes c
+        WHERE c.game_id = t.game_id AND c.team_id = t.team_id AND c.goalie_id = r.goalie_id)) IS TRUE)::int,
+    ((t.goals_for > t.goals_against AND r.goalie_id = t.last_goalie_id) IS TRUE)::int,
+    ((t.goals_for < t.goals_against AND r.goalie_id = t.start_goalie_id) IS TRUE)::int,
+    ((t.goals_for = t.goals_against AND r.goalie_id = t.last_goalie_id) IS TRUE)::int
+FROM roster_goalies r JOIN game_teams t ON t.game_id = r.game_id AND t.is_home = r.is_home
+"""
+
+CREATE_PLAYER_STATS_SQL = f"""
+CREATE TEMP TABLE rebuild_player_stats ON COMMIT DROP AS
+WITH {VALID_EVENTS_SQL}
+SELECT season_id, game_id, player_id, team_id, 0 AS priority,
+    (event_name = 'shot on goal')::int AS shots_on_goal,
+    (event_name = 'shot on goal' AND shot_type = 'goal')::int AS goals,
+    0 AS assists,
+    (event_name = 'shot on goal' AND is_scoring_chance)::int AS scoring_chances,
+    0 AS blocked_shots,
+    (event_name = 'shot on goal' AND shot_type = 'goal' AND goal_type = 'Short Handed')::int AS short_handed_goals,
+    (event_name = 'shot on goal' AND shot_type = 'goal' AND goal_type = 'Power Play')::int AS power_play_goals,
+    CASE WHEN event_name = 'penalty' THEN time_length ELSE interval '0' END AS penalty_minutes,
+    interval '0' AS penalties_drawn,
+    (event_name = 'turnover')::int AS turnovers,
+    (event_name = 'faceoff')::int AS faceoffs,
+    (event_name = 'faceoff')::int AS faceoffs_won,
+    0 AS games_played
+FROM valid_events WHERE player_id IS NOT NULL
+UNION ALL
+SELECT season_id, game_id, player_2_id, CASE WHEN event_name = 'shot on goal' AND shot_type <> 'blocked' THEN team_id ELSE team_2_id END, 0,
+    0, 0,
+    (event_name = 'shot on goal' AND shot_type = 'goal')::int,
+    0,
+    (event_name = 'shot on goal' AND shot_type = 'blocked')::int,
+    0, 0, interval '0',
+    CASE WHEN event_name = 'penalty' THEN time_length ELSE interval '0' END,
+    0,
+    (event_name = 'faceoff')::int,
+    0, 0
+FROM valid_events WHERE player_2_id IS NOT NULL
+UNION ALL
+SELECT g.season_id, g.id, r.player_id, g.home_team_id, 1, 0, 0, 0, 0, 0, 0, 0, interval '0', interval '0', 0, 0, 0, 1
+FROM games_home_players r JOIN rebuild_games g ON g.id = r.game_id
+UNION ALL
+SELECT g.season_id, g.id, r.player_id, g.away_team_id, 1, 0, 0, 0, 0, 0, 0, 0, interval '0', interval '0', 0, 0, 0, 1
+FROM games_away_players r JOIN rebuild_games g ON g.id = r.game_id
+"""
+
+CREATE_TEAM_STATS_SQL = f"""
+CREATE TEMP TABLE rebuild_team_stats ON COMMIT DROP AS
+WITH {GAME_TEAMS_SQL}
+SELECT season_id, team_id, 1 AS games_played,
+    (goals_for > goals_against)::int AS wins, (goals_for < goals_against)::int AS losses, (goals_for = goals_against)::int AS ties,
+    goals_for, goals_against
+FROM game_teams
+"""
+
+# endregion
+
+# region Rebuilt rows
+
+def get_zero_sql(stat_table: StatTable, col: str) -> str:
+    """Returns the SQL literal of the zero value of a statistics column."""
+
+    zero_value = getattr(stat_table.init_row(*([0] * len(stat_table.key_columns))), col)
+    return "interval '0'" if isinstance(zero_value, datetime.timedelta) else "0"
+
+def get_scope_sql(stat_table: StatTable, alias: str) -> str:
+    """Returns the condition of the rows of the rebuilt seasons: by season, or by the game of the season."""
+
+    if 'season_id' in stat_table.key_columns:
+        return f"{alias}.season_id = ANY(:season_ids)"
+    return f"{alias}.game_id IN (SELECT id FROM games WHERE season_id = ANY(:season_ids))"
+
+def get_compared_columns(table_name: str, stat_table: StatTable) -> tuple[str, ...]:
+    return REBUILT_TABLES[table_name][0] + stat_table.attribute_columns
+
+def create_rebuilt_table(conn: Connection, table_name: str, stat_table: StatTable) -> None:
+    """Sums the contributions into the rows of the statistics table, in the temporary table `rebuilt_<table_name>`."""
+
+    columns, source = REBUILT_TABLES[table_name]
+    sums = [f"coalesce(sum({col}), {get_zero_sql(stat_table, col)})" + ("::int" if get_zero_sql(stat_table, col) == "0" else "") for col in columns]
+    # The roster team is the last one written by the analyzer.
+    attributes = [f"(array_agg({col} ORDER BY priority DESC))[1]" for col in stat_table.attribute_columns]
+    keys = ", ".join(stat_table.key_columns)
+    select_list = ", ".join([keys] + [f"{expression} AS {col}" for expression, col in zip(sums + attributes, columns + stat_table.attribute_columns)])
+    conn.execute(text(f"CREATE TEMP TABLE rebuilt_{table_name} ON COMMIT DROP AS SELECT {select_list} FROM {source} GROUP BY {keys}"))
+
+def get_drift(conn: Connection, table_name: str, stat_table: StatTable, season_ids: list[int]) -> tuple[int, list[dict[str, Any]]]:
+    """Compares the rows of the statistics table with the rebuilt ones. Missing rows count as zeroed rows.
+
+    :returns: The number of compared rows and the rows that differ, with the current and the rebuilt values.
+    """
+
+    columns = get_compared_columns(table_name, stat_table)
+    join = " AND ".join(f"c.{key} = r.{key}" for key in stat_table.key_columns)
+    current = [f"coalesce(c.{col}, {get_zero_sql(stat_table, col) if col not in stat_table.attribute_columns else f'r.{col}'})" for col in columns]
+    rebuilt = [f"coalesce(r.{col}, {get_zero_sql(stat_table, col) if col not in stat_table.attribute_columns else f'c.{col}'})" for col in columns]
+    from_sql = f"(SELECT * FROM {table_name} c WHERE {get_scope_sql(stat_table, 'c')}) c FULL JOIN rebuilt_{table_name} r ON {join}"
+
+    compared_count = conn.execute(text(f"SELECT count(*) FROM {from_sql}"), {"season_ids": season_ids}).scalar_one()
+    select_list = ", ".join([f"coalesce(c.{key}, r.{key}) AS {key}" for key in stat_table.key_columns] +
+        [f"{expression} AS current_{col}" for expression, col in zip(current, columns)] +
+        [f"{expression} AS rebuilt_{col}" for expression, col in zip(rebuilt, columns)])
+    drifted_rows = conn.execute(text(f"SELECT {select_list} FROM {from_sql} WHERE ({', '.join(current)}) IS DISTINCT FROM ({', '.join(rebuilt)}) "
+        f"ORDER BY {', '.join(stat_table.key_columns)}"), {"season_ids": season_ids}).mappings().all()
+    return compared_count, [dict(row) for row in drifted_rows]
+
+def swap_rebuilt_rows(conn: Connection, table_name: str, stat_table: StatTable, season_ids: list[int]) -> int:
+    """Replaces the rebuilt columns of the differing rows of the statistics table, and zeroes the rows that were not rebuilt.
+
+    :returns: The number of changed rows.
+    """
+
+    columns = get_compared_columns(table_name, stat_table)
+    keys = ", ".join(stat_table.key_columns)
+    join = " AND ".join(f"c.{key} = r.{key}" for key in stat_table.key_columns)
+    # New rows get the zero values of the statistics the rebuild does not compute, as the analyzer inserts them.
+    other_columns = [col for col in stat_table.stat_columns if col not in columns]
+    insert_list = ", ".join(list(stat_table.key_columns) + list(columns) + other_columns)
+    select_list = ", ".join([f"r.{key}" for key in stat_table.key_columns] + [f"r.{col}" for col in columns] +
+        [get_zero_sql(stat_table, col) for col in other_columns])
+    changed_count = conn.execute(text(f"""
+        INSERT INTO {table_name} ({insert_list})
+        SELECT {select_list} FROM rebuilt_{table_name} r LEFT JOIN {table_name} c ON {join}
+        WHERE ({', '.join(f'c.{col}' for col in columns)}) IS DISTINCT FROM ({', '.join(f'r.{col}' for col in columns)})
+        ON CONFLICT ({keys}) DO UPDATE SET {', '.join(f'{col} = EXCLUDED.{col}' for col in columns)}
+    """)).rowcount
+
+    rebuilt_columns = REBUILT_TABLES[table_name][0]
+    zeros = ", ".join(get_zero_sql(stat_table, col) for col in rebuilt_columns)
+    changed_count += conn.execute(text(f"""
+        UPDATE {table_name} c SET ({', '.join(rebuilt_columns)}) = ROW({zeros})
+        WHERE {get_scope_sql(stat_table, 'c')} AND NOT EXISTS (SELECT 1 FROM rebuilt_{table_name} r WHERE {join})
+            AND ({', '.join(f'c.{col}' for col in rebuilt_columns)}) IS DISTINCT FROM ({zeros})
+    """), {"season_ids": season_ids}).rowcount
+    return changed_count
+
+# endregion
+
+# region Queue
+
+def get_unknown_game_entries_count(conn: Connection) -> int:
+    """Returns the number of pending queue entries of deleted games. Their season is unknown, so the rebuild cannot supersede them."""
+
+    return conn.execute(text("""
+        SELECT count(*) FROM game_events_analysis_queue q
+        WHERE NOT EXISTS (SELECT 1 FROM games WHERE games.id = q.game_id)
+    """)).scalar_one()
+
+def delete_superseded_entries(conn: Connection, season_ids: list[int]) -> int:
+    """Deletes the queue entries and the dead letters of the games of the seasons: the rebuilt statistics already include their data.
+
+    :returns: The number of deleted entries.
+    """
+
+    return sum(conn.execute(text(f"DELETE FROM {table} WHERE game_id IN (SELECT id FROM games WHERE season_id = ANY(:season_ids))"),
+        {"season_ids": season_ids}).rowcount for table in ("game_events_analysis_queue", "game_events_analysis_dead_letters"))
+
+# endregion
+
+def format_drifted_row(stat_table: StatTable, columns: tuple[str, ...], row: dict[str, Any]) -> str:
+    key = ", ".join(f"{key}={row[key]}" for key in stat_table.key_columns)
+    changes = ", ".join(f"{col} {row[f'current_{col}']} -> {row[f'rebuilt_{col}']}" for col in columns
+                        if row[f'current_{col}'] != row[f'rebuilt_{col}'])
+    return f"  {key}: {changes}"
+
+def rebuild_stats(m: Models, season_ids: list[int], swap: bool, max_rows: int) -> int:
+    """Rebuilds the statistics of the seasons, prints the drift report and, if `swap` is set, replaces the drifted rows.
+
+    Everything is computed in one repeatable read transaction, so the counters and the events are compared at the same point.
+    When swapping, the analyzer is paused with the advisory lock and the queue entries of the seasons are deleted
+    in the same transaction: entries added later are applied on top of the rebuilt rows.
+
+    :returns: The number of drifted rows.
+    """
+
+    stat_tables = get_stat_tables(m)
+    params = {"season_ids": season_ids, "game_over_status": GAME_OVER_STATUS}
+
+    with m.connect() as conn:
+        if swap:
+            # Held by the connection, so the analyzer transactions that started before the snapshot have finished.
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": STATS_LOCK_KEY})
+            conn.commit()
+        try:
+            conn.execution_options(isolation_level="REPEATABLE READ")
+            with conn.begin() as transaction:
+                for statement in (CREATE_GAMES_SQL, CREATE_EVENTS_SQL, CREATE_GOALIE_STATS_SQL, CREATE_PLAYER_STATS_SQL, CREATE_TEAM_STATS_SQL):
+                    conn.execute(text(statement), params)
+
+                pending_count = conn.execute(text("""
+                    SELECT count(*) FROM game_events_analysis_queue
+                    WHERE game_id IN (SELECT id FROM games WHERE season_id = ANY(:season_ids))
+                """), params).scalar_one()
+                print(f"Seasons {', '.join(map(str, season_ids))}: {pending_count} queue entries pending.")
+
+                drifted_count = 0
+                for table_name, stat_table in stat_tables.items():
+                    create_rebuilt_table(conn, table_name, stat_table)
+                    compared_count, drifted_rows = get_drift(conn, table_name, stat_table, season_ids)
+                    drifted_count += len(drifted_rows)
+                    print(f"{table_name}: {compared_count} rows, {len(drifted_rows)} drifted.")
+                    columns = get_compared_columns(table_name, stat_table)
+                    for row in drifted_rows[:max_rows]:
+                        print(format_drifted_row(stat_table, columns, row))
+                    if len(drifted_rows) > max_rows:
+                        print(f"  ... {len(drifted_rows) - max_rows} more.")
+
+                if not swap:
+                    transaction.rollback()
+                    return drifted_count
+
+                unknown_game_entries_count = get_unknown_game_entries_count(conn)
+                if unknown_game_entries_count > 0:
+                    print(f"Not swapped: {unknown_game_entries_count} queue entries of deleted games are pending, "
+                          "let the analyzer apply them first.")
+                    transaction.rollback()
+                    return drifted_count
+
+                changed_count = sum(swap_rebuilt_rows(conn, table_name, stat_table, season_ids) for table_name, stat_table in stat_tables.items())
+                deleted_count = delete_superseded_entries(conn, season_ids)
+                conn.execute(text("""
+                    INSERT INTO resource_versions (name, version, last_modified) VALUES (:name, 1, now())
+                    ON CONFLICT (name) DO UPDATE SET version = resource_versions.version + 1, last_modified = now()
+                """), {"name": TEAMS_RESOURCE_NAME})
+                message = (f"INFO: Rebuilt statistics of seasons {', '.join(map(str, season_ids))}: "
+                           f"{changed_count} rows changed, {deleted_count} queue entries superseded.")
+                conn.execute(text("""
+                    INSERT INTO process_logs (process_id, message, date_time)
+                    SELECT id, :message, now() FROM processes_status WHERE name = 'game_events_analyzer'
+                """), {"message": message})
+                print(message)
+        finally:
+            if swap:
+                conn.execution_options(isolation_level="READ COMMITTED")
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": STATS_LOCK_KEY})
+                conn.commit()
+
+    return drifted_count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuilds the statistics of seasons from the game events and reports the drift of the counters.")
+    parser.add_argument("season_ids", type=int, nargs="+", metavar="SEASON_ID")
+    parser.add_argument("--swap", action="store_true", help="Replace the drifted rows with the rebuilt ones.")
+    parser.add_argument("--max-rows", type=int, default=20, help="Maximum number of drifted rows printed per table.")
+    args = parser.parse_args()
+
+    drifted_count = rebuild_stats(Models(get_db_conn_str(), pool_size=1), args.season_ids, args.swap, args.max_rows)
+    # Drift left in place fails the run, so scheduled reports can alert on it.
+    sys.exit(1 if drifted_count > 0 and not args.swap else 0)
@@ -0,0 +1,170 @@
+import json
+import unittest
+from types import SimpleNamespace
+from typing import Any
+
+from constants import GameEventSystemStatus
+from game_analysis import analyze_entry, analyze_game_entries, analyze_net_items, coalesce_entries, get_entry_items, get_game_header
+from models import Models
+from stats_batch import StatsBatch, get_stat_tables
+
+# region Test data
+
+class Row:
+    """Transient row of a statistics table, standing in for the automapped classes."""
+
+    def __init__(self, **kwargs: Any):
+        self.__dict__.update(kwargs)
+
+def create_stat_tables() -> dict[str, Any]:
+    """Returns the statistics tables of `get_stat_tables()` without a database: the table columns are the ones `Models.init_*()` set."""
+
+    m = Models.__new__(Models)
+    for name, init_row, key_count in [("GoalieSeason", m.init_goalie_season, 2), ("GoalieTeamSeason", m.init_goalie_team_season, 3),
+                                      ("GameGoalie", m.init_game_goalie, 2), ("PlayerSeason", m.init_player_season, 2),
+                                      ("PlayerTeamSeason", m.init_player_team_season, 3), ("GamePlayer", m.init_game_player, 2),
+                                      ("TeamSeason", m.init_team_season, 2)]:
+        setattr(m, name, type(name, (Row,), {}))
+        columns = [SimpleNamespace(key=col) for col in init_row(*([0] * key_count)).__dict__]
+        getattr(m, name).__table__ = SimpleNamespace(columns=columns)
+    return get_stat_tables(m)
+
+def create_event(event_id: int, event_name: str, **kwargs: Any) -> dict[str, Any]:
+    return {"id": event_id, "event_name": event_name, "game_id": 1, "game_season_id": 1, "team_id": 10, "team_2_id": 20,
+            "goalie_id": None, "player_id": 11, "player_2_id": None, "shot_type": None, "goal_type": None,
+            "is_scoring_chance": False, "time_length": None} | kwargs
+
+def create_shot(event_id: int, shot_type: str, player_id: int = 11) -> dict[str, Any]:
+    return create_event(event_id, "shot on goal", goalie_id=21, player_id=player_id, shot_type=shot_type)
+
+def create_game(events: list[dict[str, Any]], home_goals: int, away_goals: int) -> dict[str, Any]:
+    return {"type": "game", "id": 1, "season_id": 1, "home_team_id": 10, "away_team_id": 20,
+            "home_start_goalie_id": 1, "away_start_goalie_id": 21, "home_goalies": [1], "away_goalies": [21],
+            "home_players": [11, 12], "away_players": [22], "home_goals": home_goals, "away_goals": away_goals, "events": events}
+
+def create_delta(old_game: dict[str, Any], new_game: dict[str, Any]) -> dict[str, Any]:
+    """Returns the payload of a game delta, the same as `game_delta_to_dict()` in the backend."""
+
+    old_events = {event["id"]: event for event in old_game["events"]}
+    new_events = {event["id"]: event for event in new_game["events"]}
+    old_header = get_game_header(old_game)
+    new_header = get_game_header(new_game)
+    return {"type": "game_delta", "id": 1,
+            "removed_events": [event for event in old_game["events"] if new_events.get(event["id"]) != event],
+            "added_events": [event for event in new_game["events"] if old_events.get(event["id"]) != event],
+            "old_game": old_header if old_header != new_header else None,
+            "new_game": new_header if old_header != new_header else None}
+
+def create_entry(entry_id: int, payload: dict[str, Any], status: int = GameEventSystemStatus.NEW) -> SimpleNamespace:
+    return SimpleNamespace(id=entry_id, game_id=1, status=status, payload=json.dumps(payload))
+
+# endregion
+
+class CoalesceEntriesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stat_tables = create_stat_tables()
+        self.game_v1 = create_game([create_shot(1, "save"), create_event(2, "turnover")], 0, 0)
+        self.game_v2 = create_game([create_shot(1, "goal"), create_event(2, "turnover"), create_shot(3, "save", 12)], 1, 0)
+        self.game_v3 = create_game([create_shot(1, "goal"), create_shot(3, "goal", 12)], 2, 0)
+
+    def get_stats(self, stats: StatsBatch) -> dict[str, dict[tuple, dict[str, Any]]]:
+        """Returns the non-zero statistics of a batch by table and key."""
+
+        result = {}
+        for table_name, rows in stats.rows.items():
+            stat_columns = self.stat_tables[table_name].stat_columns
+            for key, row in rows.items():
+                values = {col: getattr(row, col) for col in stat_columns if getattr(row, col)}
+                if len(values) > 0:
+                    result.setdefault(table_name, {})[key] = values
+        return result
+
+    def analyze_one_by_one(self, entries: list[SimpleNamespace]) -> dict[str, dict[tuple, dict[str, Any]]]:
+        stats = StatsBatch(self.stat_tables)
+        for entry in entries:
+            self.assertIsNone(analyze_entry(entry, stats))
+        return self.get_stats(stats)
+
+    def analyze_coalesced(self, entries: list[SimpleNamespace]) -> dict[str, dict[tuple, dict[str, Any]]]:
+        stats = StatsBatch(self.stat_tables)
+        self.assertIsNone(analyze_net_items(coalesce_entries(entries)[0], stats))
+        return self.get_stats(stats)
+
+    def test_new_deprecated_new_chain(self):
+        entries = [create_entry(1, self.game_v1), create_entry(2, self.game_v1, GameEventSystemStatus.DEPRECATED),
+                   create_entry(3, self.game_v2)]
+        net_items, item_count = coalesce_entries(entries)
+
+        self.assertEqual(item_count, 3 + 3 + 4)
+        self.assertEqual(+net_items, +coalesce_entries([entries[2]])[0])
+        self.assertTrue(all(count >= 0 for count in net_items.values()))
+        self.assertEqual(self.analyze_coalesced(entries), self.analyze_one_by_one([entries[2]]))
+        self.assertEqual(self.analyze_coalesced(entries), self.analyze_one_by_one(entries))
+
+    def test_delta_chain_collapses(self):
+        entries = [create_entry(1, self.game_v1), create_entry(2, create_delta(self.game_v1, self.game_v2)),
+                   create_entry(3, create_delta(self.game_v2, self.game_v3))]
+        direct_entries = [create_entry(1, self.game_v1), create_entry(4, create_delta(self.game_v1, self.game_v3))]
+
+        net_items = coalesce_entries(entries)[0]
+        direct_net_items = coalesce_entries(direct_entries)[0]
+        self.assertEqual({item: count for item, count in net_items.items() if count != 0},
+                         {item: count for item, count in direct_net_items.items() if count != 0})
+        self.assertEqual(self.analyze_coalesced(entries), self.analyze_one_by_one(entries))
+        self.assertEqual(self.analyze_coalesced(entries), self.analyze_one_by_one([create_entry(5, self.game_v3)]))
+
+    def test_equal_states_cancel(self):
+        entries = [create_entry(1, create_delta(self.game_v1, self.game_v2)), create_entry(2, create_delta(self.game_v2, self.game_v1))]
+        net_items, item_count = coalesce_entries(entries)
+
+        self.assertGreater(item_count, 0)
+        self.assertTrue(all(count == 0 for count in net_items.values()))
+        self.assertEqual(self.analyze_coalesced(entries), {})
+
+        analysis = analyze_game_entries(entries, self.stat_tables)
+        self.assertTrue(analysis.is_coalesced)
+        self.assertEqual(analysis.skipped_item_count, item_count)
+        self.assertEqual(self.get_stats(analysis.stats), {})
+
+    def test_unknown_status_falls_back_to_one_by_one(self):
+        entries = [create_entry(1, self.game_v1), create_entry(2, self.game_v2, status=3), create_entry(3, self.game_v2)]
+        self.assertIsNone(get_entry_items(entries[1]))
+        self.assertIsNone(coalesce_entries(entries))
+
+        analysis = analyze_game_entries(entries, self.stat_tables)
+        self.assertFalse(analysis.is_coalesced)
+        self.assertEqual(analysis.applied_entries, entries[:1])
+        self.assertIs(analysis.failed_entry, entries[1])
+        self.assertIn("unknown status", analysis.error_message)
+        self.assertEqual(self.get_stats(analysis.stats), self.analyze_one_by_one(entries[:1]))
+
+class AnalysisExceptionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stat_tables = create_stat_tables()
+
+    def test_penalty_without_time_length(self):
+        valid_entry = create_entry(1, create_event(1, "penalty", player_2_id=22, time_length=120) | {"type": "game_event"})
+        null_entry = create_entry(2, create_event(2, "penalty", time_length=None) | {"type": "game_event"})
+        later_entry = create_entry(3, create_event(3, "turnover") | {"type": "game_event"})
+
+        analysis = analyze_game_entries([valid_entry, null_entry, later_entry], self.stat_tables)
+        self.assertFalse(analysis.is_coalesced)
+        self.assertEqual(analysis.applied_entries, [valid_entry])
+        self.assertIs(analysis.failed_entry, null_entry)
+        self.assertIn("TypeError", analysis.error_message)
+        self.assertEqual(analysis.stats.rows['player_seasons'][(1, 11)].penalty_minutes.total_seconds(), 120)
+        self.assertEqual(analysis.stats.rows['player_seasons'][(1, 22)].penalties_drawn.total_seconds(), 120)
+
+    def test_malformed_payload(self):
+        entry = create_entry(1, {"type": "game_event"})
+        entry.payload = entry.payload[:-1]
+
+        analysis = analyze_game_entries([entry], self.stat_tables)
+        self.assertEqual(analysis.applied_entries, [])
+        self.assertIs(analysis.failed_entry, entry)
+        self.assertIn("JSONDecodeError", analysis.error_message)
+
+if __name__ == "__main__":
+    unittest.main()
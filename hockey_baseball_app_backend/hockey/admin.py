@@ -1,12 +1,12 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.apps import apps
 
 from hockey.utils.constants import GOALIE_POSITION_NAME, NO_GOALIE_FIRST_NAME, NO_GOALIE_LAST_NAME
-from hockey.utils.db_utils import is_no_goalie_object
+from hockey.utils.db_utils import is_no_goalie_object, requeue_analysis_dead_letters
 
-from .models import (Analytics, Arena, ArenaRink, DefensiveZoneExit, Division, Game, GameEventName, GameEvents, GameGoalie, GamePeriod,
+from .models import (Analytics, Arena, ArenaRink, DefensiveZoneExit, Division, Game, GameEventName, GameEvents, GameEventsAnalysisDeadLetter, GameGoalie, GamePeriod,
                      GamePlayer, GameType, Goalie, OffensiveZoneEntry, Player, PlayerPosition, PlayerTransaction,
-                     Season, ShotType, Shots, Team, TeamAgeGroup, TeamLevel, TeamSeason, GameTypeName, Turnovers, PlayerTryout)
+                     ProcessLog, Season, ShotType, Shots, Team, TeamAgeGroup, TeamLevel, TeamSeason, GameTypeName, Turnovers, PlayerTryout)
 
 class ReadOnlyAdminMixin:
     def has_add_permission(self, request, obj=None):
@@ -62,6 +62,24 @@ class GameEventsAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
     ordering = ['-game__date', 'game__home_team__name', 'time']
     search_fields = ['game__date', 'game__home_team__name', 'game__away_team__name', 'time', 'event_name__name']
 
+@admin.register(GameEventsAnalysisDeadLetter)
+class GameEventsAnalysisDeadLetterAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ['failed_at', 'date_time', 'game_id', 'status', 'retry_count', 'error_message']
+    ordering = ['date_time', 'id']
+    search_fields = ['game_id', 'error_message']
+    actions = ['requeue', 'discard']
+
+    @admin.action(description="Requeue selected entries for analysis")
+    def requeue(self, request, queryset):
+        count = requeue_analysis_dead_letters(queryset)
+        self.message_user(request, f"{count} entries requeued.", messages.SUCCESS)
+
+    @admin.action(description="Discard selected entries")
+    def discard(self, request, queryset):
+        count, _ = queryset.delete()
+        self.message_user(request, f"{count} entries discarded, the later entries of their games will be analyzed. "
+                          "Rebuild the statistics of their seasons to correct them.", messages.WARNING)
+
 @admin.register(GameGoalie)
 class GameGoalieAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
     list_display = ['game__date', 'game__home_team__name', 'game__away_team__name', 'goalie__player__last_name', 'goalie__player__first_name']
@@ -138,6 +156,14 @@ class PlayerTryoutAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
     ordering = ['team__name', 'player__last_name', 'player__first_name', '-date']
     search_fields = ['team__name', 'player__last_name', 'player__first_name', 'status', 'date']
 
+@admin.register(ProcessLog)
+class ProcessLogAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ['date_time', 'process__name', 'message']
+    list_filter = ['process__name']
+    ordering = ['-id']
+    search_fields = ['message']
+    show_full_result_count = False
+
 @admin.register(Season)
 class SeasonAdmin(admin.ModelAdmin):
     list_display = ['name', 'start_date']
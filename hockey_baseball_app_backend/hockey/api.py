@@ -10,9 +10,10 @@ from django.forms.models import model_to_dict
 from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from ninja import File, Query, Router, PatchDict
+from ninja.decorators import decorate_view
 from ninja.files import UploadedFile
 from django.contrib.auth import get_user_model
-from django.http import HttpRequest, FileResponse
+from django.http import HttpRequest, HttpResponse, FileResponse, StreamingHttpResponse
 from django.core.files import File as FileSaver
 from django.core.files.storage import default_storage
 from django.core.exceptions import ValidationError
@@ -22,57 +23,66 @@ import faker.providers
 from faker_animals import AnimalsProvider
 
 from hockey.utils.constants import (GOALIE_POSITION_NAME, NO_GOALIE_FIRST_NAME, NO_GOALIE_LAST_NAME, ApiDocTags,
-                                    EventName, GameEventSystemStatus, GameStatus, GoalType, HighlightVisibility, PlayerTryoutStatus, get_constant_class_int_choices,
+                                    EventName, GameEventSystemStatus, GameStatus, GoalType, HighlightVisibility, PlayerTryoutStatus, ResourceName, get_constant_class_int_choices,
                                     ApiDocTags)
-from hockey.utils.event_analysis_serializer import serialize_game, serialize_game_event
+from hockey.utils.event_analysis_serializer import game_to_dict, serialize_game
 from hockey.utils.formulas import get_team_points
 from users.models import UserInvitation
 from users.utils.roles import is_user_admin, is_user_coach, is_user_coach_any
 from users.utils.emails_send import invite_users_to_website
+from users.utils.user_directory import get_users
 
 from .schemas import (AnalysisObject, AnalyticsAccessOut, AnalyticsAccessStatuses, AnalyticsIn, AnalyticsOut, ArenaOut, ArenaRinkOut, ArenaRinkExtendedOut, DefensiveZoneExitIn, DefensiveZoneExitOut, GameBannerOut, GameDashboardOut,
                       GameEventIn, GameEventOut, GameExtendedOut, GameGoalieOut,
                       GameIn, GameLiveDataOut, GameOut, GamePeriodOut, GamePlayerOut, GamePlayersIn, GamePlayersOut,
-                      GameSprayChartFilters, GameTypeOut, GameTypeRecordOut, GoalieBaseOut, GoalieSeasonOut,
+                      GameSprayChartFilters, GameTypeOut, GoalieBaseOut, GoalieSeasonOut,
                       GoalieSeasonsGet, GoalieSprayChartFilters, GoalieTeamSeasonOut, HighlightIn, HighlightOut, HighlightReelIn, HighlightReelUpdateIn,
                       HighlightReelListOut, HighlightUpdateIn, ObjectIdName, Message, ObjectId, OffensiveZoneEntryIn,
                       OffensiveZoneEntryOut, PlayerBaseOut, PlayerPositionOut, GoalieIn,
                       GoalieOut, PlayerIn, PlayerOut, PlayerSeasonOut, PlayerSeasonsGet, PlayerSprayChartFilters, PlayerTeamSeasonOut,
-                      PlayerTryoutIn, PlayerTryoutOut, PlayerTryoutPlayerOut, PlayerTryoutStatusHistoryOut, PlayerTryoutUpdateIn, PlayerTryoutUpdateUserOut, SeasonIn,
-                      SeasonOut, ShotsIn, ShotsOut, SprayChartFilters,
-                      TeamIn, TeamOut, TeamSeasonOut, TurnoversIn, TurnoversOut, VideoLibraryIn, VideoLibraryOut)
-from .models import (Analytics, AnalyticsUserAccess, Arena, ArenaRink, CustomEvents, DefensiveZoneExit, Division, Game, GameEventName, GameEvents, GameEventsAnalysisQueue,
-                     GameGoalie, GamePeriod, GamePlayer, GameType, Goalie, GoalieSeason, GoalieTeamSeason, Highlight, HighlightReel, HighlightUserAccess, OffensiveZoneEntry, Player,
-                     PlayerPosition, PlayerSeason, PlayerTeamSeason, PlayerTransaction, PlayerTryout, PlayerTryoutStatusHistory, Season, ShotType, Shots, Team, TeamAgeGroup, TeamLevel, TeamSeason, GameTypeName,
+                      PlayerTryoutIn, PlayerTryoutOut, PlayerTryoutPlayerOut, ProcessLogOut, PlayerTryoutStatusHistoryOut, PlayerTryoutUpdateIn, SeasonIn,
+                      SeasonOut, ShotsIn, ShotsOut, SprayChartArea, SprayChartFilters, SprayChartHeatmapOut,
+                      TeamIn, TeamOut, TeamSeasonOut, TeamStandingOut, GoalieLeaderStat, LeaderOut, PlayerLeaderStat, TurnoversIn, TurnoversOut, VideoLibraryIn, VideoLibraryOut)
+from .models import (Analytics, AnalyticsUserAccess, Arena, ArenaRink, CustomEvents, DefensiveZoneExit, Division, Game, GameEvents, GameEventsAnalysisQueue,
+                     GameGoalie, GamePlayer, Goalie, GoalieSeason, GoalieTeamSeason, Highlight, HighlightReel, HighlightUserAccess, OffensiveZoneEntry, Player,
+                     PlayerSeason, PlayerTeamSeason, PlayerTransaction, PlayerTryout, PlayerTryoutStatusHistory, ProcessLog, ProcessStatus, Season, Shots, Team, TeamAgeGroup, TeamLevel, TeamSeason, GameTypeName,
                      Turnovers, VideoLibrary)
-from .utils import api_response_templates as resp
-from .utils.db_utils import (create_highlight, form_analytics_out, form_game_dashboard_game_out, form_game_goalie_out, form_game_player_out, form_goalie_out,
-                             form_player_out, fetch_analytics_list, get_current_season,
-                             get_game_current_goalies, get_game_from_dashboard_home_or_away, get_no_goalie, is_no_goalie_dict, is_no_goalie_object, update_game_faceoffs_from_event,
+from .utils import api_response_templates as resp, reference_cache
+from .utils.db_utils import (add_game_delta_to_analysis_queue, create_highlight, annotate_game_result, form_analytics_out, form_game_dashboard_game_out, form_game_goalie_out, form_game_live_data_out, form_game_player_out, form_goalie_out,
+                             form_player_out, form_tryout_user_out, get_analytics_queryset, get_game_type_records, get_games_queryset, get_leaders, get_standings_queryset, get_current_season, get_zero_goalie_season, get_zero_player_season, prefetch_season_stats,
+                             get_game_from_dashboard_home_or_away, get_game_events_queryset, get_game_spray_chart_events, get_goalie_spray_chart_events, get_no_goalie, get_player_spray_chart_events, get_spray_chart_heatmap, is_no_goalie_dict, is_no_goalie_object, update_game_faceoffs_from_event,
                              update_game_shots_from_event, update_game_turnovers_from_event)
+from .utils.reference_cache import get_game_event_name_by_id, get_game_type_ids_with_names, get_player_position
+from .utils.live_feed import AsyncSessionAuth, notify_game_live_feed, stream_game_live_feed
+from .utils.pagination import PAGINATION_DESCRIPTION, paginate
+from .utils.resource_versions import versioned_resource
 
 router = Router()
 
 User = get_user_model()
 
+SPRAY_CHART_HEATMAP_DESCRIPTION = ("Spray chart events counted by square cells of `bin_size` offset units of the `area` points and by shot type, "
+                                   "instead of the events themselves. Takes the same filters as the spray chart.")
+
 # region Goalie and player
 
 @router.get('/player-position/list', response=list[PlayerPositionOut], tags=[ApiDocTags.PLAYER])
 def get_player_positions(request: HttpRequest):
-    positions = PlayerPosition.objects.exclude(name=GOALIE_POSITION_NAME).all()
+    positions = [position for position in reference_cache.player_positions.all() if position.name != GOALIE_POSITION_NAME]
     return positions
 
 @router.get('/goalie/list', response=list[GoalieOut], tags=[ApiDocTags.PLAYER])
 def get_goalies(request: HttpRequest, team_id: int | None = None, birth_year: int | None = None):
     current_season = get_current_season()
     goalies_out: list[GoalieOut] = []
-    goalies = Goalie.objects.filter(player__is_archived=False)
+    goalies = Goalie.objects.select_related('player__team').filter(player__is_archived=False)
     if team_id is not None:
         goalies = goalies.filter(player__team_id=team_id)
     if birth_year is not None:
         goalies = goalies.filter(player__birth_year__year=birth_year)
-    for goalie in goalies:
-        goalies_out.append(form_goalie_out(goalie, current_season))
+    for goalie in prefetch_season_stats(goalies, current_season):
+        goalie_season = (goalie.season_stats[0] if len(goalie.season_stats) > 0 else get_zero_goalie_season(goalie, current_season))
+        goalies_out.append(form_goalie_out(goalie, current_season, goalie_season))
     return goalies_out
 
 @router.post("/goalie/seasons", response=list[GoalieSeasonOut], tags=[ApiDocTags.PLAYER, ApiDocTags.STATS])
@@ -99,7 +109,7 @@ def add_goalie(request: HttpRequest, data: GoalieIn, photo: File[UploadedFile] =
         return 400, {"message": "This goalie is used in case of no goalie in net, so it cannot be added."}
     try:
         with transaction.atomic(using='hockey'):
-            goalie = Player(position=PlayerPosition.objects.get(name=GOALIE_POSITION_NAME), **data.dict())
+            goalie = Player(position=get_player_position(GOALIE_POSITION_NAME), **data.dict())
             goalie.photo = photo
             goalie.save()
             Goalie.objects.create(player=goalie)
@@ -162,18 +172,17 @@ def delete_goalie(request: HttpRequest, goalie_id: int):
 def get_goalie_spray_chart(request: HttpRequest, goalie_id: int, filters: GoalieSprayChartFilters):
     if (filters.season_id is not None) and (filters.game_id is not None):
         return 400, {"message": "season_id and game_id cannot be provided at the same time."}
-    
-    events = GameEvents.objects.filter(goalie_id=goalie_id)
-
-    if filters.season_id is not None:
-        events = events.prefetch_related('game').filter(game__season_id=filters.season_id)
-    if filters.game_id is not None:
-        events = events.filter(game_id=filters.game_id)
-
-    if filters.shot_type_id is not None:
-        events = events.prefetch_related('event_name').filter(event_name__name=EventName.SHOT, shot_type_id=filters.shot_type_id)
+    return get_goalie_spray_chart_events(goalie_id, filters).all()
 
-    return events.all()
+@router.post("/goalie/{goalie_id}/spray-chart/heatmap", response={200: SprayChartHeatmapOut, 400: Message}, tags=[ApiDocTags.PLAYER, ApiDocTags.SPRAY_CHART],
+    description=SPRAY_CHART_HEATMAP_DESCRIPTION)
+def get_goalie_spray_chart_heatmap(request: HttpRequest, goalie_id: int, filters: GoalieSprayChartFilters,
+                                   area: SprayChartArea = SprayChartArea.NET, bin_size: int = 10):
+    if (filters.season_id is not None) and (filters.game_id is not None):
+        return 400, {"message": "season_id and game_id cannot be provided at the same time."}
+    if bin_size < 1:
+        return 400, {"message": "bin_size must be positive."}
+    return get_spray_chart_heatmap(get_goalie_spray_chart_events(goalie_id, filters), area, bin_size)
 
 @router.get("/goalie/{goalie_id}/team-seasons", response=list[GoalieTeamSeasonOut], tags=[ApiDocTags.PLAYER, ApiDocTags.STATS])
 def get_goalie_team_seasons(request: HttpRequest, goalie_id: int, limit: int = 3):
@@ -184,13 +193,14 @@ def get_goalie_team_seasons(request: HttpRequest, goalie_id: int, limit: int = 3
 def get_players(request: HttpRequest, team_id: int | None = None, birth_year: int | None = None):
     current_season = get_current_season()
     players_out: list[PlayerOut] = []
-    players = Player.objects.exclude(position__name=GOALIE_POSITION_NAME).filter(is_archived=False)
+    players = Player.objects.select_related('team').exclude(position__name=GOALIE_POSITION_NAME).filter(is_archived=False)
     if team_id is not None:
         players = players.filter(team_id=team_id)
     if birth_year is not None:
         players = players.filter(birth_year__year=birth_year)
-    for player in players:
-        players_out.append(form_player_out(player, current_season))
+    for player in prefetch_season_stats(players, current_season):
+        player_season = (player.season_stats[0] if len(player.season_stats) > 0 else get_zero_player_season(player, current_season))
+        players_out.append(form_player_out(player, current_season, player_season))
     return players_out
 
 @router.post("/player/seasons", response=list[PlayerSeasonOut], tags=[ApiDocTags.PLAYER, ApiDocTags.STATS])
@@ -213,7 +223,7 @@ def add_player(request: HttpRequest, data: PlayerIn, photo: File[UploadedFile] =
     if not is_user_coach(request.user, data.team_id):
         return 403, {"message": "You are not authorized to add a player."}
     try:
-        if data.position_id == PlayerPosition.objects.get(name=GOALIE_POSITION_NAME).id or is_no_goalie_object(data):
+        if data.position_id == get_player_position(GOALIE_POSITION_NAME).id or is_no_goalie_object(data):
             return 400, {"message": "Goalies are not added through this endpoint."}
         player = Player(**data.dict())
         player.photo = photo
@@ -224,7 +234,7 @@ def add_player(request: HttpRequest, data: PlayerIn, photo: File[UploadedFile] =
 
 @router.patch("/player/{player_id}", response={204: None, 400: Message, 403: Message}, tags=[ApiDocTags.PLAYER])
 def update_player(request: HttpRequest, player_id: int, data: PatchDict[PlayerIn], photo: File[UploadedFile] = None):
-    if data.get('position_id') == PlayerPosition.objects.get(name=GOALIE_POSITION_NAME).id:
+    if data.get('position_id') == get_player_position(GOALIE_POSITION_NAME).id:
         return 400, {"message": "Goalies are not updated through this endpoint."}
     player = get_object_or_404(Player.objects.exclude(position__name=GOALIE_POSITION_NAME), id=player_id)
     if not is_user_coach(request.user, player.team_id):
@@ -275,24 +285,17 @@ def delete_player(request: HttpRequest, player_id: int):
 def get_player_spray_chart(request: HttpRequest, player_id: int, filters: PlayerSprayChartFilters):
     if (filters.season_id is not None) and (filters.game_id is not None):
         return 400, {"message": "season_id and game_id cannot be provided at the same time."}
+    return get_player_spray_chart_events(player_id, filters).all()
 
-    events = GameEvents.objects.filter(player_id=player_id)
-
-    if filters.season_id is not None:
-        events = events.prefetch_related('game').filter(game__season_id=filters.season_id)
-    if filters.game_id is not None:
-        events = events.filter(game_id=filters.game_id)
-
-    if filters.event_name is not None:
-        events = events.prefetch_related('event_name').filter(event_name__name=filters.event_name)
-    if filters.shot_type_id is not None:
-        events = events.prefetch_related('shot_type').filter(shot_type_id=filters.shot_type_id)
-    if filters.is_scoring_chance is not None:
-        events = events.filter(is_scoring_chance=filters.is_scoring_chance)
-    if filters.goal_type is not None:
-        events = events.filter(goal_type=filters.goal_type)
-
-    return events.all()
+@router.post("/player/{player_id}/spray-chart/heatmap", response={200: SprayChartHeatmapOut, 400: Message}, tags=[ApiDocTags.PLAYER, ApiDocTags.SPRAY_CHART],
+    description=SPRAY_CHART_HEATMAP_DESCRIPTION)
+def get_player_spray_chart_heatmap(request: HttpRequest, player_id: int, filters: PlayerSprayChartFilters,
+                                   area: SprayChartArea = SprayChartArea.ICE, bin_size: int = 10):
+    if (filters.season_id is not None) and (filters.game_id is not None):
+        return 400, {"message": "season_id and game_id cannot be provided at the same time."}
+    if bin_size < 1:
+        return 400, {"message": "bin_size must be positive."}
+    return get_spray_chart_heatmap(get_player_spray_chart_events(player_id, filters), area, bin_size)
 
 @router.get("/player/{player_id}/team-seasons", response=list[PlayerTeamSeasonOut], tags=[ApiDocTags.PLAYER, ApiDocTags.STATS])
 def get_player_team_seasons(request: HttpRequest, player_id: int, limit: int = 3):
@@ -319,18 +322,21 @@ def get_team_levels(request: HttpRequest):
     return levels
 
 @router.get('/team/list', response=list[TeamOut], tags=[ApiDocTags.TEAM])
+@decorate_view(*versioned_resource(ResourceName.TEAMS, current_season=True))
 def get_teams(request: HttpRequest):
     teams = Team.objects.prefetch_related('age_group', 'level', 'division').filter(is_archived=False)
     team_ids = teams.values_list('id', flat=True)
     current_season = get_current_season()
     team_seasons = TeamSeason.objects.filter(team_id__in=team_ids, season_id=current_season.id)
     team_seasons_dict = {team_season.team_id: team_season for team_season in team_seasons}
+    missing_team_seasons = [TeamSeason(team=team, season=current_season, games_played=0, goals_for=0, goals_against=0, wins=0, losses=0, ties=0)
+                            for team in teams if team.id not in team_seasons_dict]
+    # Rows created concurrently by other requests or the data analyzer are kept.
+    TeamSeason.objects.bulk_create(missing_team_seasons, ignore_conflicts=True)
+    team_seasons_dict.update({team_season.team_id: team_season for team_season in missing_team_seasons})
     teams_out = []
     for team in teams:
-        team_season = team_seasons_dict.get(team.id)
-        if team_season is None:
-            team_season = TeamSeason.objects.create(team=team, season=current_season, games_played=0,
-                goals_for=0, goals_against=0, wins=0, losses=0, ties=0)
+        team_season = team_seasons_dict[team.id]
         teams_out.append(TeamOut(id=team.id, age_group=team.age_group.name, level_id=team.level_id, level_name=team.level.name,
             division_id=team.division_id, division_name=team.division.name,
             name=team.name, abbreviation=team.abbreviation, city=team.city,
@@ -338,6 +344,27 @@ def get_teams(request: HttpRequest):
             wins=team_season.wins, losses=team_season.losses, ties=team_season.ties, points=get_team_points(team_season)))
     return teams_out
 
+@router.get('/team/standings', response={200: list[TeamStandingOut], 503: Message}, tags=[ApiDocTags.TEAM, ApiDocTags.STATS],
+    description=("Returns the ranked standings of the active teams with statistics in the season, the current season by default, "
+                 "optionally only of a division or an age group.\n\n"
+                 "Teams are ranked by points, then wins, goal differential and goals for."))
+@decorate_view(*versioned_resource(ResourceName.TEAMS, current_season=True))
+def get_team_standings(request: HttpRequest, season_id: int | None = None, division_id: int | None = None, age_group: str | None = None):
+    if season_id is None:
+        current_season = get_current_season()
+        if current_season is None:
+            return 503, {"message": "No current season found."}
+        season_id = current_season.id
+    standings_out = []
+    for team_season in get_standings_queryset(season_id, division_id, age_group):
+        team = team_season.team
+        standings_out.append(TeamStandingOut(rank=team_season.rank, team_id=team.id, team_name=team.name, abbreviation=team.abbreviation,
+            age_group=team.age_group.name, division_id=team.division_id, division_name=team.division.name,
+            games_played=team_season.games_played, wins=team_season.wins, losses=team_season.losses, ties=team_season.ties,
+            points=team_season.points, goals_for=team_season.goals_for, goals_against=team_season.goals_against,
+            goal_differential=team_season.goal_differential))
+    return standings_out
+
 @router.get('/team/{team_id}', response=TeamOut, tags=[ApiDocTags.TEAM])
 def get_team(request: HttpRequest, team_id: int):
     team = get_object_or_404(Team.objects.prefetch_related('age_group', 'level', 'division'), id=team_id)
@@ -413,6 +440,7 @@ def delete_team(request: HttpRequest, team_id: int):
     return 200, {"message": "Deleted."}
 
 @router.get('/season/list', response=list[SeasonOut], tags=[ApiDocTags.TEAM])
+@decorate_view(*versioned_resource(ResourceName.SEASONS))
 def get_seasons(request: HttpRequest):
     seasons = Season.objects.all()
     return seasons
@@ -471,6 +499,39 @@ def get_team_season(request: HttpRequest, team_season_id: int):
 
 # endregion
 
+# region Leaders
+
+LEADERS_DESCRIPTION = ("Returns the top `limit` {persons} of the season, the current season by default, by the statistic, "
+                       "optionally only of the teams of a division or an age group.\n\n"
+                       "Only {persons} with at least `min_games_played` games (and at least one) are listed. "
+                       "Equal values are ordered by fewer games played.")
+
+@router.get('/leaders/players', response={200: list[LeaderOut], 503: Message}, tags=[ApiDocTags.PLAYER, ApiDocTags.STATS],
+    description=LEADERS_DESCRIPTION.format(persons="players"))
+def get_player_leaders(request: HttpRequest, stat: PlayerLeaderStat = PlayerLeaderStat.POINTS, season_id: int | None = None,
+                       division_id: int | None = None, age_group: str | None = None, min_games_played: int = 0, limit: int = 10):
+    if season_id is None:
+        current_season = get_current_season()
+        if current_season is None:
+            return 503, {"message": "No current season found."}
+        season_id = current_season.id
+    limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+    return get_leaders(PlayerSeason.objects.filter(season_id=season_id), 'player', stat, division_id, age_group, min_games_played, limit)
+
+@router.get('/leaders/goalies', response={200: list[LeaderOut], 503: Message}, tags=[ApiDocTags.PLAYER, ApiDocTags.STATS],
+    description=LEADERS_DESCRIPTION.format(persons="goalies"))
+def get_goalie_leaders(request: HttpRequest, stat: GoalieLeaderStat = GoalieLeaderStat.SAVE_PERCENTS, season_id: int | None = None,
+                       division_id: int | None = None, age_group: str | None = None, min_games_played: int = 0, limit: int = 10):
+    if season_id is None:
+        current_season = get_current_season()
+        if current_season is None:
+            return 503, {"message": "No current season found."}
+        season_id = current_season.id
+    limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+    return get_leaders(GoalieSeason.objects.filter(season_id=season_id), 'goalie__player', stat, division_id, age_group, min_games_played, limit)
+
+# endregion
+
 # region Game
 
 @router.get('/arena/list', response=list[ArenaOut], tags=[ApiDocTags.GAME])
@@ -491,40 +552,45 @@ def get_arena_rink(request: HttpRequest, arena_rink_id: int):
 
 @router.get('/game-type/list', response=list[GameTypeOut], tags=[ApiDocTags.GAME])
 def get_game_types(request: HttpRequest):
-    game_types = GameType.objects.all()
+    game_types = reference_cache.game_types.all()
     game_types_out = []
     for game_type in game_types:
         game_type_out = GameTypeOut(id=game_type.id, name=game_type.name, game_type_names=[
             ObjectIdName(id=game_type_name.id, name=game_type_name.name)
-            for game_type_name in game_type.gametypename_set.filter(is_actual=True)])
+            for game_type_name in game_type.actual_names])
         game_types_out.append(game_type_out)
     return game_types_out
 
 @router.get('/game-period/list', response=list[GamePeriodOut], tags=[ApiDocTags.GAME])
+@decorate_view(*versioned_resource(ResourceName.GAME_PERIODS))
 def get_game_periods(request: HttpRequest):
-    game_periods = GamePeriod.objects.order_by('order')
+    game_periods = reference_cache.game_periods.all()
     return game_periods
 
-@router.get('/game/list', response=list[GameOut], tags=[ApiDocTags.GAME],
+@router.get('/game/list', response={200: list[GameOut], 400: Message}, tags=[ApiDocTags.GAME],
     description=("Returns a list of games for the given date range.\n\n"
                  "If `on_now` is True, only returns games that are currently happening.\n\n"
                  "If `from_date` and `to_date` are provided, only returns games in that date range (from_date inclusive, to_date exclusive).\n\n"
-                 "Games are sorted by date in descending order, then time in descending order."))
-def get_games(request: HttpRequest, on_now: bool = False, from_date: datetime.date | None = None, to_date: datetime.date | None = None):
-    games = Game.objects.select_related('rink', 'game_type_name', 'home_start_goalie', 'away_start_goalie', 'game_period')
+                 "Games are sorted by date in descending order, then time in descending order.\n\n" + PAGINATION_DESCRIPTION))
+def get_games(request: HttpRequest, response: HttpResponse, on_now: bool = False, from_date: datetime.date | None = None, to_date: datetime.date | None = None,
+              cursor: str | None = None, limit: int | None = None):
+    games = get_games_queryset()
     if on_now:
         games = games.filter(status=2)
     if from_date is not None:
         games = games.filter(date__gte=from_date)
     if to_date is not None:
         games = games.filter(date__lt=to_date)
-    return games.order_by('-date', '-time').all()
+    try:
+        return paginate(games, ('-date', '-time', '-id'), response, cursor, limit)
+    except ValueError:
+        return resp.invalid_cursor()
 
 @router.get('/game/list/banner', response=list[GameBannerOut], description="Returns a list of current games for the banner.", tags=[ApiDocTags.GAME])
+@decorate_view(*versioned_resource(ResourceName.GAMES, daily=True))
 def get_games_banner(request: HttpRequest):
     now = datetime.datetime.now(datetime.timezone.utc)
-    games = Game.objects.\
-        select_related('rink', 'game_type_name', 'game_period', 'home_team', 'away_team').\
+    games = get_games_queryset().\
         filter(Q(status=2) | (Q(status=1) & Q(date__gte=now.date()) & Q(date__lte=(now + datetime.timedelta(days=1)).date()))).order_by('date')
     games_out = []
     for game in games:
@@ -537,9 +603,10 @@ def get_games_banner(request: HttpRequest):
     return games_out
 
 @router.get('/game/list/dashboard', response=GameDashboardOut, tags=[ApiDocTags.GAME], description="Returns a list of upcoming (including current) and previous games.")
+@decorate_view(*versioned_resource(ResourceName.GAMES))
 def get_games_dashboard(request: HttpRequest, limit: int = 5, team_id: int | None = None):
-    upcoming_games_qs = Game.objects.filter(Q(status=1) | Q(status=2)).select_related('rink', 'game_type_name', 'home_team', 'away_team').order_by('date')
-    previous_games_qs = Game.objects.filter(status=3).select_related('rink', 'game_type_name', 'home_team', 'away_team').order_by('-date')
+    upcoming_games_qs = get_games_queryset().filter(Q(status=1) | Q(status=2)).order_by('date')
+    previous_games_qs = get_games_queryset().filter(status=3).order_by('-date')
 
     if team_id is not None:
         upcoming_games_qs = upcoming_games_qs.filter(Q(home_team_id=team_id) | Q(away_team_id=team_id))
@@ -552,35 +619,15 @@ def get_games_dashboard(request: HttpRequest, limit: int = 5, team_id: int | Non
 
 @router.get('/game/{game_id}', response=GameOut, tags=[ApiDocTags.GAME])
 def get_game(request: HttpRequest, game_id: int):
-    game = get_object_or_404(Game.objects.select_related('rink', 'game_type_name', 'home_start_goalie', 'away_start_goalie', 'game_period'), id=game_id)
+    game = get_object_or_404(get_games_queryset(), id=game_id)
     return game
 
 @router.get('/game/{game_id}/extra', response=GameExtendedOut, tags=[ApiDocTags.GAME])
 def get_game_extra(request: HttpRequest, game_id: int):
     """Returns a game with extra information for the Live Dashboard."""
-    game = get_object_or_404(Game.objects.select_related('rink', 'game_type_name', 'home_start_goalie', 'away_start_goalie', 'game_period'), id=game_id)
-    game_type_games = Game.objects.filter(game_type=game.game_type, season=game.season).\
-        filter(Q(home_team_id=game.home_team_id) | Q(away_team_id=game.away_team_id)).exclude(id=game_id)
-    if game.game_type_name is not None:
-        game_type_games = game_type_games.filter(game_type_name=game.game_type_name)
-    home_team_record = GameTypeRecordOut(wins=0, losses=0, ties=0)
-    away_team_record = GameTypeRecordOut(wins=0, losses=0, ties=0)
-    for game_type_game in game_type_games:
-        if game_type_game.home_team_id == game.home_team_id:
-            if game_type_game.home_goals > game_type_game.away_goals:
-                home_team_record.wins += 1
-            elif game_type_game.home_goals < game_type_game.away_goals:
-                home_team_record.losses += 1
-            else:
-                home_team_record.ties += 1
-        elif game_type_game.away_team_id == game.away_team_id:
-            if game_type_game.away_goals > game_type_game.home_goals:
-                away_team_record.wins += 1
-            elif game_type_game.away_goals < game_type_game.home_goals:
-                away_team_record.losses += 1
-            else:
-                away_team_record.ties += 1
-    
+    game = get_object_or_404(get_games_queryset(), id=game_id)
+    home_team_record, away_team_record = get_game_type_records(game)
+
     return GameExtendedOut(
         id=game.id,
         home_team_id=game.home_team_id,
@@ -622,7 +669,7 @@ def add_game(request: HttpRequest, data: GameIn):
             return 503, {"message": "No current season found."}
         if data.status not in [status[0] for status in get_constant_class_int_choices(GameStatus)]:
             return 400, {"message": f"Invalid status: {data.status}"}
-        if data.game_type_id in [game_type.id for game_type in GameType.objects.filter(gametypename__is_actual=True)] and data.game_type_name_id is None:
+        if data.game_type_id in get_game_type_ids_with_names() and data.game_type_name_id is None:
             return 400, {"message": "If game type has names, game type name must be provided."}
         with transaction.atomic(using='hockey'):
             home_no_goalie = get_no_goalie(data.home_team_id)
@@ -661,13 +708,13 @@ def add_game(request: HttpRequest, data: GameIn):
             game.save()
 
             if data.status == GameStatus.GAME_OVER.id:
-                GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.NEW)
+                GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.NEW, game_id=game.id)
 
     except ValidationError as e:
         return 400, {"message": str(e)}
     except IntegrityError as e:
         return resp.entry_already_exists("Game", str(e))
-    game = Game.objects.get(id=game.id)
+    game = get_games_queryset().get(id=game.id)
     return game
 
 @router.patch("/game/{game_id}", response={204: None, 400: Message, 403: Message}, tags=[ApiDocTags.GAME])
@@ -679,7 +726,7 @@ def update_game(request: HttpRequest, game_id: int, data: PatchDict[GameIn]):
     data_status = data.get('status')
     if data_status is not None and data_status not in [status[0] for status in get_constant_class_int_choices(GameStatus)]:
         return 400, {"message": f"Invalid status: {data_status}"}
-    if data.get('game_type_id') in [game_type.id for game_type in GameType.objects.filter(gametypename__is_actual=True)] and data.get('game_type_name_id') is None:
+    if data.get('game_type_id') in get_game_type_ids_with_names() and data.get('game_type_name_id') is None:
         return 400, {"message": "If game type has names, game type name must be provided."}
     try:
         with transaction.atomic(using='hockey'):
@@ -689,10 +736,10 @@ def update_game(request: HttpRequest, game_id: int, data: PatchDict[GameIn]):
                 pass
             elif data_status is not None and game_status == GameStatus.GAME_OVER.id and data_status != GameStatus.GAME_OVER.id:
                 # Game finish has been undone, remove its data from statistics.
-                GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.DEPRECATED)
+                GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.DEPRECATED, game_id=game.id)
             elif game_status == GameStatus.GAME_OVER.id and data_status in [GameStatus.GAME_OVER.id, None] and len(data) > 0:
-                # If game has been modified after finishing, re-apply its data to statistics.
-                GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.DEPRECATED)
+                # If game has been modified after finishing, apply the changes of its data to statistics.
+                old_game_data = game_to_dict(game)
 
             if data.get('date') is not None and game.date != data.get('date'):
                 game.season = get_current_season(data.get('date'))
@@ -715,14 +762,16 @@ def update_game(request: HttpRequest, game_id: int, data: PatchDict[GameIn]):
 
             if game_status != data_status and data_status == GameStatus.GAME_OVER.id:
                 # Game has finished, add its data to statistics.
-                GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.NEW)
+                GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.NEW, game_id=game.id)
             elif data_status is not None and game_status == GameStatus.GAME_OVER.id and data_status != GameStatus.GAME_OVER.id:
                 # Game finish has been undone, remove its data from statistics.
                 pass
             elif game_status == GameStatus.GAME_OVER.id and data_status in [GameStatus.GAME_OVER.id, None] and len(data) > 0:
-                # If game has been modified after finishing, re-apply its data to statistics.
-                GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.NEW)
-                
+                # If game has been modified after finishing, apply the changes of its data to statistics.
+                add_game_delta_to_analysis_queue(old_game_data, game)
+
+            notify_game_live_feed(game.id)
+
     except ValidationError as e:
         return 400, {"message": str(e)}
     return 204, None
@@ -734,7 +783,8 @@ def delete_game(request: HttpRequest, game_id: int):
         return 403, {"message": "You are not authorized to delete this game."}
     with transaction.atomic(using='hockey'):
         if game.status == GameStatus.GAME_OVER.id:
-            GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.DEPRECATED)
+            GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.DEPRECATED, game_id=game.id)
+        notify_game_live_feed(game.id)
         game.delete()
     return 204, None
 
@@ -751,7 +801,9 @@ def update_game_defensive_zone_exit(request: HttpRequest, defensive_zone_exit_id
         return 403, {"message": "You are not authorized to update this game."}
     for attr, value in data.items():
         setattr(defensive_zone_exit, attr, value)
-    defensive_zone_exit.save()
+    with transaction.atomic(using='hockey'):
+        defensive_zone_exit.save()
+        notify_game_live_feed(game.id)
     return 204, None
 
 @router.get("/game/offensive-zone-entry/{offensive_zone_entry_id}", response=OffensiveZoneEntryOut, tags=[ApiDocTags.GAME])
@@ -767,7 +819,9 @@ def update_game_offensive_zone_entry(request: HttpRequest, offensive_zone_entry_
         return 403, {"message": "You are not authorized to update this game."}
     for attr, value in data.items():
         setattr(offensive_zone_entry, attr, value)
-    offensive_zone_entry.save()
+    with transaction.atomic(using='hockey'):
+        offensive_zone_entry.save()
+        notify_game_live_feed(game.id)
     return 204, None
 
 @router.get("/game/shots/{shots_id}", response=ShotsOut, tags=[ApiDocTags.GAME])
@@ -783,45 +837,48 @@ def get_game_turnovers(request: HttpRequest, turnovers_id: int):
 @router.get("/game/{game_id}/live-data", response=GameLiveDataOut, tags=[ApiDocTags.GAME])
 def get_game_live_data(request: HttpRequest, game_id: int):
     game = get_object_or_404(Game, id=game_id)
-    home_goalie_id, away_goalie_id = get_game_current_goalies(game)
-    home_faceoff_win = (round((game.home_faceoffs_won_count / game.faceoffs_count) * 100) if game.faceoffs_count > 0 else 0)
-    away_faceoff_win = ((100 - home_faceoff_win) if game.faceoffs_count > 0 else 0)
-    return GameLiveDataOut(game_period_id=game.game_period_id,
-                           home_goalie_id=home_goalie_id,
-                           away_goalie_id=away_goalie_id,
-                           home_goals=game.home_goals, away_goals=game.away_goals,
-                           home_faceoff_win=home_faceoff_win,
-                           away_faceoff_win=away_faceoff_win,
-                           home_defensive_zone_exit=game.home_defensive_zone_exit,
-                           away_defensive_zone_exit=game.away_defensive_zone_exit,
-                           home_offensive_zone_entry=game.home_offensive_zone_entry,
-                           away_offensive_zone_entry=game.away_offensive_zone_entry,
-                           home_shots=game.home_shots,
-                           away_shots=game.away_shots,
-                           home_turnovers=game.home_turnovers,
-                           away_turnovers=game.away_turnovers,
-                           events=game.gameevents_set.order_by("period__order", "-time").all())
+    return form_game_live_data_out(game, game.gameevents_set.order_by("period__order", "-time").all())
+
+@router.get("/game/{game_id}/live-feed", response={200: None, 404: Message}, auth=AsyncSessionAuth(), tags=[ApiDocTags.GAME],
+    description=("Streams the live data of the game as server-sent events.\n\n"
+                 "The first `snapshot` event contains the same data as `/game/{game_id}/live-data`. "
+                 "Each `update` event contains the changed game data and only the added or updated `events`, "
+                 "with the IDs of the deleted events in `deleted_event_ids`. "
+                 "A new `snapshot` may be sent at any time and replaces the previous data. "
+                 "A `close` event is sent if the game is deleted."))
+async def get_game_live_feed(request: HttpRequest, game_id: int):
+    if not await Game.objects.filter(id=game_id).aexists():
+        return 404, {"message": "Game not found."}
+    return StreamingHttpResponse(stream_game_live_feed(game_id), content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @router.get('/game/{game_id}/events', response={200: list[GameEventOut], 400: Message},
-            description="Get game events for a given game and optional player IDs (comma separated list of player IDs).",
+            description="Get game events for a given game and optional player IDs (comma separated list of player IDs).\n\n" + PAGINATION_DESCRIPTION,
             tags=[ApiDocTags.GAME, ApiDocTags.GAME_EVENT])
-def get_game_events(request: HttpRequest, game_id: int, player_ids: str | None = None):
-    game_events = GameEvents.objects.filter(game_id=game_id)
+def get_game_events(request: HttpRequest, response: HttpResponse, game_id: int, player_ids: str | None = None, cursor: str | None = None, limit: int | None = None):
+    player_ids_list = None
     if player_ids is not None:
         try:
             player_ids_list = [ int(player_id.strip()) for player_id in player_ids.split(',') ]
         except ValueError:
             return 400, {"message": "Invalid player IDs format."}
-        game_events = game_events.filter(Q(player_id__in=player_ids_list) | Q(player_2_id__in=player_ids_list) | Q(goalie_id__in=player_ids_list))
-    game_events = game_events.order_by("period__order", "-time").all()
-    return game_events
+    game_events = get_game_events_queryset(game_id, player_ids_list)
+    try:
+        return paginate(game_events.select_related('period'), ('period__order', '-time', 'id'), response, cursor, limit)
+    except ValueError:
+        return resp.invalid_cursor()
 
 @router.post('/game/{game_id}/spray-chart', response=list[GameEventOut], tags=[ApiDocTags.GAME, ApiDocTags.SPRAY_CHART])
 def get_game_spray_chart(request: HttpRequest, game_id: int, filters: GameSprayChartFilters):
-    events = GameEvents.objects.filter(game_id=game_id)
-    if filters.event_name is not None:
-        events = events.prefetch_related('event_name').filter(event_name__name=filters.event_name)
-    return events.all()
+    return get_game_spray_chart_events(game_id, filters).all()
+
+@router.post('/game/{game_id}/spray-chart/heatmap', response={200: SprayChartHeatmapOut, 400: Message}, tags=[ApiDocTags.GAME, ApiDocTags.SPRAY_CHART],
+    description=SPRAY_CHART_HEATMAP_DESCRIPTION)
+def get_game_spray_chart_heatmap(request: HttpRequest, game_id: int, filters: GameSprayChartFilters,
+                                 area: SprayChartArea = SprayChartArea.ICE, bin_size: int = 10):
+    if bin_size < 1:
+        return 400, {"message": "bin_size must be positive."}
+    return get_spray_chart_heatmap(get_game_spray_chart_events(game_id, filters), area, bin_size)
 
 # endregion
 
@@ -850,7 +907,7 @@ def get_game_players(request: HttpRequest, game_id: int):
 
 @router.get('/game-player/goalie/{goalie_id}', response=list[GameGoalieOut], tags=[ApiDocTags.GAME_PLAYER, ApiDocTags.STATS])
 def get_goalie_games(request: HttpRequest, goalie_id: int, limit: int = 5):
-    goalie_games = GameGoalie.objects.filter(goalie_id=goalie_id).order_by('-game__date')[:limit]
+    goalie_games = annotate_game_result(GameGoalie.objects.select_related('goalie__player').filter(goalie_id=goalie_id)).order_by('-game__date')[:limit]
     games: list[GameGoalieOut] = []
     for game_goalie in goalie_games:
         games.append(form_game_goalie_out(game_goalie))
@@ -858,7 +915,7 @@ def get_goalie_games(request: HttpRequest, goalie_id: int, limit: int = 5):
 
 @router.get('/game-player/player/{player_id}', response=list[GamePlayerOut], tags=[ApiDocTags.GAME_PLAYER, ApiDocTags.STATS])
 def get_player_games(request: HttpRequest, player_id: int, limit: int = 5):
-    player_games = GamePlayer.objects.filter(player_id=player_id).order_by('-game__date')[:limit]
+    player_games = annotate_game_result(GamePlayer.objects.select_related('player').filter(player_id=player_id)).order_by('-game__date')[:limit]
     games: list[GamePlayerOut] = []
     for game_player in player_games:
         games.append(form_game_player_out(game_player))
@@ -869,13 +926,15 @@ def get_player_games(request: HttpRequest, player_id: int, limit: int = 5):
 # region Game events
 
 @router.get('/game-event-name/list', response=list[ObjectIdName], tags=[ApiDocTags.GAME_EVENT])
+@decorate_view(*versioned_resource(ResourceName.GAME_EVENT_NAMES))
 def get_game_event_names(request: HttpRequest):
-    game_event_names = GameEventName.objects.all()
+    game_event_names = reference_cache.game_event_names.all()
     return game_event_names
 
 @router.get('/shot-type/list', response=list[ObjectIdName], tags=[ApiDocTags.GAME_EVENT])
+@decorate_view(*versioned_resource(ResourceName.SHOT_TYPES))
 def get_shot_types(request: HttpRequest):
-    shot_types = ShotType.objects.order_by('name').all()
+    shot_types = reference_cache.shot_types.all()
     return shot_types
 
 @router.get('/game-event/{game_event_id}', response=GameEventOut, tags=[ApiDocTags.GAME_EVENT])
@@ -894,7 +953,7 @@ def add_game_event(request: HttpRequest, data: GameEventIn):
 
         with transaction.atomic(using='hockey'):
 
-            event_name = GameEventName.objects.filter(id=data.event_name_id).first()
+            event_name = get_game_event_name_by_id(data.event_name_id)
 
             if event_name.name == EventName.GOALIE_CHANGE and data.goalie_id is None:
                 data.goalie_id = get_no_goalie(data.team_id).pk
@@ -905,9 +964,9 @@ def add_game_event(request: HttpRequest, data: GameEventIn):
             data_new = data.dict()
 
             if game.status == GameStatus.GAME_OVER.id:
-                old_game_stats = serialize_game(game)
+                old_game_data = game_to_dict(game)
             else:
-                old_game_stats = None
+                old_game_data = None
 
             game_event = GameEvents.objects.create(**data_new)
 
@@ -917,41 +976,23 @@ def add_game_event(request: HttpRequest, data: GameEventIn):
             if game_event.shot_type is not None and event_name.name != EventName.SHOT:
                 raise ValueError(f"Shot type is only allowed for '{EventName.SHOT}' events.")
 
-            affect_stats_level = None
-
             if event_name.name == EventName.SHOT:
                 error = update_game_shots_from_event(game, data=data, is_deleted=False)
                 if error is not None:
                     raise ValueError(error)
-                elif game_event.shot_type.name.lower() == 'goal':
-                    affect_stats_level = 'game'
-                else:
-                    affect_stats_level = 'game_event'
             elif event_name.name == EventName.TURNOVER:
                 error = update_game_turnovers_from_event(game, data=data, is_deleted=False)
                 if error is not None:
                     raise ValueError(error)
-                else:
-                    affect_stats_level = 'game_event'
             elif event_name.name == EventName.FACEOFF:
                 error = update_game_faceoffs_from_event(game, data=data, is_deleted=False)
                 if error is not None:
                     raise ValueError(error)
-                else:
-                    affect_stats_level = 'game_event'
-            elif event_name.name == EventName.PENALTY:
-                affect_stats_level = 'game_event'
-            elif event_name.name == EventName.GOALIE_CHANGE:
-                affect_stats_level = 'game'
 
-            if game.status == GameStatus.GAME_OVER.id:
-                if affect_stats_level == 'game':
-                    if old_game_stats is None:
-                        raise Exception("Game stats are not available.")
-                    GameEventsAnalysisQueue.objects.create(payload=old_game_stats, status=GameEventSystemStatus.DEPRECATED)
-                    GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.NEW)
-                elif affect_stats_level == 'game_event':
-                    GameEventsAnalysisQueue.objects.create(payload=serialize_game_event(game_event), status=GameEventSystemStatus.NEW)
+            if old_game_data is not None:
+                add_game_delta_to_analysis_queue(old_game_data, game)
+
+            notify_game_live_feed(game.id, updated_event_ids=[game_event.id])
 
     except ValueError as e:
         return 400, {"message": str(e)}
@@ -972,39 +1013,23 @@ def update_game_event(request: HttpRequest, game_event_id: int, data: PatchDict[
         with transaction.atomic(using='hockey'):
 
             if game.status == GameStatus.GAME_OVER.id:
-                old_game_stats = serialize_game(game)
-                old_game_event_stats = serialize_game_event(game_event)
+                old_game_data = game_to_dict(game)
             else:
-                old_game_stats = None
-                old_game_event_stats = None
-
-            affect_stats_level = None
+                old_game_data = None
 
             # Undo old shot/turnover data.
             if game_event.event_name.name == EventName.SHOT:
                 error = update_game_shots_from_event(game, event=game_event, is_deleted=True)
                 if error is not None:
                     raise ValueError(error)
-                elif game_event.shot_type.name.lower() == 'goal':
-                    affect_stats_level = 'game'
-                else:
-                    affect_stats_level = 'game_event'
             elif game_event.event_name.name == EventName.TURNOVER:
                 error = update_game_turnovers_from_event(game, event=game_event, is_deleted=True)
                 if error is not None:
                     raise ValueError(error)
-                else:
-                    affect_stats_level = 'game_event'
             elif game_event.event_name.name == EventName.FACEOFF:
                 error = update_game_faceoffs_from_event(game, event=game_event, is_deleted=True)
                 if error is not None:
                     raise ValueError(error)
-                else:
-                    affect_stats_level = 'game_event'
-            elif game_event.event_name.name == EventName.PENALTY:
-                affect_stats_level = 'game_event'
-            elif game_event.event_name.name == EventName.GOALIE_CHANGE:
-                affect_stats_level = 'game'
 
             game_event.save()
 
@@ -1025,39 +1050,19 @@ def update_game_event(request: HttpRequest, game_event_id: int, data: PatchDict[
                 error = update_game_shots_from_event(game, event=game_event, is_deleted=False)
                 if error is not None:
                     raise ValueError(error)
-                elif game_event.shot_type.name.lower() == 'goal':
-                    affect_stats_level = 'game'
-                elif affect_stats_level is None:
-                    affect_stats_level = 'game_event'
             elif game_event.event_name.name == EventName.TURNOVER:
                 error = update_game_turnovers_from_event(game, event=game_event, is_deleted=False)
                 if error is not None:
                     raise ValueError(error)
-                elif affect_stats_level is None:
-                    affect_stats_level = 'game_event'
             elif game_event.event_name.name == EventName.FACEOFF:
                 error = update_game_faceoffs_from_event(game, event=game_event, is_deleted=False)
                 if error is not None:
                     raise ValueError(error)
-                elif affect_stats_level is None:
-                    affect_stats_level = 'game_event'
-            elif game_event.event_name.name == EventName.PENALTY:
-                if affect_stats_level is None:
-                    affect_stats_level = 'game_event'
-            elif game_event.event_name.name == EventName.GOALIE_CHANGE:
-                affect_stats_level = 'game'
 
-            if game.status == GameStatus.GAME_OVER.id:
-                if affect_stats_level == 'game':
-                    if old_game_stats is None:
-                        raise Exception("Game stats are not available.")
-                    GameEventsAnalysisQueue.objects.create(payload=old_game_stats, status=GameEventSystemStatus.DEPRECATED)
-                    GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.NEW)
-                elif affect_stats_level == 'game_event':
-                    if old_game_event_stats is None:
-                        raise Exception("Game event stats are not available.")
-                    GameEventsAnalysisQueue.objects.create(payload=old_game_event_stats, status=GameEventSystemStatus.DEPRECATED)
-                    GameEventsAnalysisQueue.objects.create(payload=serialize_game_event(game_event), status=GameEventSystemStatus.NEW)
+            if old_game_data is not None:
+                add_game_delta_to_analysis_queue(old_game_data, game)
+
+            notify_game_live_feed(game.id, updated_event_ids=[game_event_id])
 
     except ValueError as e:
         return 400, {"message": str(e)}
@@ -1073,54 +1078,32 @@ def delete_game_event(request: HttpRequest, game_event_id: int):
         return 403, {"message": "You are not authorized to delete this game event."}
 
     if game.status == GameStatus.GAME_OVER.id:
-        old_game_stats = serialize_game(game)
-        old_game_event_stats = serialize_game_event(game_event)
+        old_game_data = game_to_dict(game)
     else:
-        old_game_stats = None
-        old_game_event_stats = None
+        old_game_data = None
 
     try:
         with transaction.atomic(using='hockey'):
 
-            affect_stats_level = None
-
             if game_event.event_name.name == EventName.SHOT:
                 error = update_game_shots_from_event(game_event.game, event=game_event, is_deleted=True)
                 if error is not None:
                     raise ValueError(error)
-                elif game_event.shot_type.name.lower() == 'goal':
-                    affect_stats_level = 'game'
-                else:
-                    affect_stats_level = 'game_event'
             elif game_event.event_name.name == EventName.TURNOVER:
                 error = update_game_turnovers_from_event(game_event.game, event=game_event, is_deleted=True)
                 if error is not None:
                     raise ValueError(error)
-                else:
-                    affect_stats_level = 'game_event'
             elif game_event.event_name.name == EventName.FACEOFF:
                 error = update_game_faceoffs_from_event(game_event.game, event=game_event, is_deleted=True)
                 if error is not None:
                     raise ValueError(error)
-                else:
-                    affect_stats_level = 'game_event'
-            elif game_event.event_name.name == EventName.PENALTY:
-                affect_stats_level = 'game_event'
-            elif game_event.event_name.name == EventName.GOALIE_CHANGE:
-                affect_stats_level = 'game'
 
             game_event.delete()
 
-            if game_event.game.status == GameStatus.GAME_OVER.id:
-                if affect_stats_level == 'game':
-                    if old_game_stats is None:
-                        raise Exception("Game stats are not available.")
-                    GameEventsAnalysisQueue.objects.create(payload=old_game_stats, status=GameEventSystemStatus.DEPRECATED)
-                    GameEventsAnalysisQueue.objects.create(payload=serialize_game(game), status=GameEventSystemStatus.NEW)
-                elif affect_stats_level == 'game_event':
-                    if old_game_event_stats is None:
-                        raise Exception("Game event stats are not available.")
-                    GameEventsAnalysisQueue.objects.create(payload=old_game_event_stats, status=GameEventSystemStatus.DEPRECATED)
+            if old_game_data is not None:
+                add_game_delta_to_analysis_queue(old_game_data, game)
+
+            notify_game_live_feed(game.id, deleted_event_ids=[game_event_id])
 
     except ValueError as e:
         return 400, {"message": str(e)}
@@ -1131,15 +1114,23 @@ def delete_game_event(request: HttpRequest, game_event_id: int):
 
 # region Analytics
 
-@router.get('/analytics/list/{object}', response={200: list[AnalyticsOut], 400: Message}, tags=[ApiDocTags.ANALYTICS])
-def get_analytics_list(request: HttpRequest, object: AnalysisObject):
-    result = fetch_analytics_list(object, request.user)
-    return (400, {"message": "Invalid object."}) if result is None else result
+def fetch_analytics_list(request: HttpRequest, response: HttpResponse, object: AnalysisObject, object_id: int | None, cursor: str | None, limit: int | None):
+    analytics = get_analytics_queryset(object, request.user, object_id)
+    if analytics is None:
+        return 400, {"message": "Invalid object."}
+    try:
+        analytics = paginate(analytics, ('-date', '-time', '-id'), response, cursor, limit)
+    except ValueError:
+        return resp.invalid_cursor()
+    return [form_analytics_out(a) for a in analytics]
+
+@router.get('/analytics/list/{object}', response={200: list[AnalyticsOut], 400: Message}, description=PAGINATION_DESCRIPTION, tags=[ApiDocTags.ANALYTICS])
+def get_analytics_list(request: HttpRequest, response: HttpResponse, object: AnalysisObject, cursor: str | None = None, limit: int | None = None):
+    return fetch_analytics_list(request, response, object, None, cursor, limit)
 
-@router.get('/analytics/list/{object}/{id}', response={200: list[AnalyticsOut], 400: Message}, tags=[ApiDocTags.ANALYTICS])
-def get_analytics_list_by_object_id(request: HttpRequest, object: AnalysisObject, id: int):
-    result = fetch_analytics_list(object, request.user, id)
-    return (400, {"message": "Invalid object."}) if result is None else result
+@router.get('/analytics/list/{object}/{id}', response={200: list[AnalyticsOut], 400: Message}, description=PAGINATION_DESCRIPTION, tags=[ApiDocTags.ANALYTICS])
+def get_analytics_list_by_object_id(request: HttpRequest, response: HttpResponse, object: AnalysisObject, id: int, cursor: str | None = None, limit: int | None = None):
+    return fetch_analytics_list(request, response, object, id, cursor, limit)
 
 @router.get('/analytics/{analytics_id}', response={200: AnalyticsOut, 403: Message}, tags=[ApiDocTags.ANALYTICS])
 def get_analytics(request: HttpRequest, analytics_id: int):
@@ -1185,10 +1176,12 @@ def get_analytics_access(request: HttpRequest, analytics_id: int):
         return 403, {"message": "You are not authorized to get the access to this analytics."}
     
     access_list = AnalyticsUserAccess.objects.filter(analytics=analytics).all()
-    user_with_access_ids = [access.user_id for access in access_list]
-    users_with_access = User.objects.using('default').filter(id__in=user_with_access_ids).all()
+    users_with_access = get_users(access.user_id for access in access_list)
     access_out_list = []
-    for user in users_with_access:
+    for access in access_list:
+        user = users_with_access.get(access.user_id)
+        if user is None:
+            continue
         access_out_list.append(AnalyticsAccessOut(email=user.email, first_name=user.first_name, last_name=user.last_name,
             status=AnalyticsAccessStatuses.ALLOWED, invited_at=None))
     
@@ -1266,17 +1259,17 @@ def delete_analytics(request: HttpRequest, analytics_id: int):
 
 # region Highlight reels
 
-@router.get('/highlight-reels', response=list[HighlightReelListOut], tags=[ApiDocTags.HIGHLIGHT_REEL])
-def get_highlight_reels(request: HttpRequest):
-    highlight_reels = HighlightReel.objects.all()
+@router.get('/highlight-reels', response={200: list[HighlightReelListOut], 400: Message}, description=PAGINATION_DESCRIPTION, tags=[ApiDocTags.HIGHLIGHT_REEL])
+def get_highlight_reels(request: HttpRequest, response: HttpResponse, cursor: str | None = None, limit: int | None = None):
+    try:
+        highlight_reels = paginate(HighlightReel.objects.all(), ('id',), response, cursor, limit)
+    except ValueError:
+        return resp.invalid_cursor()
     highlight_reels_out = []
-    
-    user_ids = list(set([reel.user_id for reel in highlight_reels if reel.user_id is not None]))
-    users = {user.id: user for user in User.objects.using('default').filter(id__in=user_ids)} if user_ids else {}
-    
+    users = get_users(reel.user_id for reel in highlight_reels)
     for reel in highlight_reels:
-        user = users.get(reel.user_id) if reel.user_id else None
-        created_by = f'{user.first_name} {user.last_name}' if user is not None else "?"
+        user = users.get(reel.user_id)
+        created_by = user.full_name if user is not None else "?"
         highlight_reels_out.append(HighlightReelListOut(id=reel.id, name=reel.name, description=reel.description,
                                                         date=reel.date, user_id=reel.user_id, created_by=created_by))
     return highlight_reels_out
@@ -1419,15 +1412,17 @@ def delete_highlight(request: HttpRequest, highlight_id: int):
 
 # region Video Library
 
-@router.get('/video-library', response=list[VideoLibraryOut], tags=[ApiDocTags.VIDEO_LIBRARY])
-def get_video_library(request: HttpRequest):
-    video_library = VideoLibrary.objects.all()
+@router.get('/video-library', response={200: list[VideoLibraryOut], 400: Message}, description=PAGINATION_DESCRIPTION, tags=[ApiDocTags.VIDEO_LIBRARY])
+def get_video_library(request: HttpRequest, response: HttpResponse, cursor: str | None = None, limit: int | None = None):
+    try:
+        video_library = paginate(VideoLibrary.objects.all(), ('id',), response, cursor, limit)
+    except ValueError:
+        return resp.invalid_cursor()
     video_library_out = []
-    user_ids = list(set([video.user_id for video in video_library if video.user_id is not None]))
-    users = {user.id: user for user in User.objects.using('default').filter(id__in=user_ids)} if user_ids else {}
+    users = get_users(video.user_id for video in video_library)
     for video in video_library:
-        user = users.get(video.user_id) if video.user_id else None
-        added_by = f'{user.first_name} {user.last_name}' if user is not None else "?"
+        user = users.get(video.user_id)
+        added_by = user.full_name if user is not None else "?"
         video_library_out.append(VideoLibraryOut(id=video.id, name=video.name, description=video.description,
             youtube_link=video.youtube_link, added_by=added_by, date=video.date))
     return video_library_out
@@ -1456,9 +1451,10 @@ def delete_video_library(request: HttpRequest, video_library_id: int):
 # region Player Tryouts
 
 @router.get('/player-tryouts/list/{player_type}', response={200: list[PlayerTryoutOut], 400: Message},
-    description="Get a list of player/goalie tryouts.",
+    description="Get a list of player/goalie tryouts.\n\n" + PAGINATION_DESCRIPTION,
     tags=[ApiDocTags.PLAYER_TRYOUTS])
-def get_player_tryouts(request: HttpRequest, player_type: Literal["players", "goalies"], team_id: int | None = None, player_id: int | None = None):
+def get_player_tryouts(request: HttpRequest, response: HttpResponse, player_type: Literal["players", "goalies"], team_id: int | None = None, player_id: int | None = None,
+                       cursor: str | None = None, limit: int | None = None):
     player_tryouts = PlayerTryout.objects
     if team_id is not None:
         player_tryouts = player_tryouts.filter(team_id=team_id)
@@ -1486,28 +1482,22 @@ def get_player_tryouts(request: HttpRequest, player_type: Literal["players", "go
     else:
         return 400, {"message": "Invalid player type."}
 
-    player_tryouts = player_tryouts.order_by('-date').all()
+    try:
+        player_tryouts = paginate(player_tryouts, ('-date', '-id'), response, cursor, limit)
+    except ValueError:
+        return resp.invalid_cursor()
 
-    got_users = {}
+    users = get_users([user_id for tryout in player_tryouts for user_id in (tryout.user_id, tryout.changed_by)])
     got_players_have_analysis = {}
     player_tryouts_out = []
 
     for tryout in player_tryouts:
 
-        if tryout.user_id not in got_users:
-            user_db = User.objects.using('default').get(id=tryout.user_id)
-            user = PlayerTryoutUpdateUserOut(id=user_db.id, first_name=user_db.first_name, last_name=user_db.last_name)
-            got_users[tryout.user_id] = user
-        if tryout.changed_by not in got_users:
-            changed_by_db = User.objects.using('default').get(id=tryout.changed_by)
-            changed_by = PlayerTryoutUpdateUserOut(id=changed_by_db.id, first_name=changed_by_db.first_name, last_name=changed_by_db.last_name)
-            got_users[tryout.changed_by] = changed_by
-
         if tryout.player_id not in got_players_have_analysis:
             got_players_have_analysis[tryout.player_id] = (tryout.player.analytics.count() > 0)
             
         player_tryouts_out.append(PlayerTryoutOut(id=tryout.id,
-            changed_by=got_users[tryout.changed_by], changed_at=tryout.changed_at, note=tryout.note, user=got_users[tryout.user_id],
+            changed_by=form_tryout_user_out(users, tryout.changed_by), changed_at=tryout.changed_at, note=tryout.note, user=form_tryout_user_out(users, tryout.user_id),
             player=PlayerTryoutPlayerOut(id=tryout.player_id, first_name=tryout.player.first_name, last_name=tryout.player.last_name,
                 number=tryout.player.number, position_name=tryout.player.position.name, shoots=tryout.player.shoots,
                 has_analytics=got_players_have_analysis[tryout.player_id]),
@@ -1535,14 +1525,9 @@ def get_player_tryout(request: HttpRequest, player_tryout_id: int):
     tryout = get_object_or_404(PlayerTryout, id=player_tryout_id)
     if not is_user_coach(request.user, tryout.team_id) and tryout.user_id != request.user.id:
         return 403, {"message": "You are not authorized to view this player tryout."}
-    user_db = User.objects.using('default').get(id=tryout.user_id)
-    user = PlayerTryoutUpdateUserOut(id=user_db.id, first_name=user_db.first_name, last_name=user_db.last_name)
-    if tryout.changed_by == tryout.user_id:
-        changed_by = user
-    else:
-        changed_by_db = User.objects.using('default').get(id=tryout.changed_by)
-        changed_by = PlayerTryoutUpdateUserOut(id=changed_by_db.id, first_name=changed_by_db.first_name, last_name=changed_by_db.last_name)
-    return PlayerTryoutOut(id=tryout.id, changed_by=changed_by, changed_at=tryout.changed_at, note=tryout.note, user=user,
+    users = get_users([tryout.user_id, tryout.changed_by])
+    return PlayerTryoutOut(id=tryout.id, changed_by=form_tryout_user_out(users, tryout.changed_by), changed_at=tryout.changed_at, note=tryout.note,
+        user=form_tryout_user_out(users, tryout.user_id),
         player=PlayerTryoutPlayerOut(id=tryout.player_id, first_name=tryout.player.first_name, last_name=tryout.player.last_name,
             number=tryout.player.number, position_name=tryout.player.position.name, shoots=tryout.player.shoots,
             has_analytics=(tryout.player.analytics.count() > 0)),
@@ -1553,14 +1538,12 @@ def get_player_tryout_status_history(request: HttpRequest, player_tryout_id: int
     tryout = get_object_or_404(PlayerTryout, id=player_tryout_id)
     if not is_user_coach(request.user, tryout.team_id) and tryout.user_id != request.user.id:
         return 403, {"message": "You are not authorized to view the status history of this player tryout."}
-    got_users = {}
+    status_history = list(tryout.status_history.order_by('date_time').all())
+    users = get_users(history.user_id for history in status_history)
     status_history_out = []
-    for history in tryout.status_history.order_by('date_time').all():
-        if history.user_id not in got_users:
-            user = User.objects.using('default').get(id=history.user_id)
-            got_users[history.user_id] = PlayerTryoutUpdateUserOut(id=user.id, first_name=user.first_name, last_name=user.last_name)
+    for history in status_history:
         status_history_out.append(PlayerTryoutStatusHistoryOut(id=history.id, status=history.status, note=history.note,
-            date_time=history.date_time, user=got_users[history.user_id]))
+            date_time=history.date_time, user=form_tryout_user_out(users, history.user_id)))
     return status_history_out
 
 @router.put('/player-tryouts/{player_tryout_id}', response={204: None, 400: Message, 403: Message}, tags=[ApiDocTags.PLAYER_TRYOUTS])
@@ -1591,4 +1574,21 @@ def delete_player_tryout(request: HttpRequest, player_tryout_id: int):
     player_tryout.delete()
     return 204, None
 
-# endregion
\ No newline at end of file
+# endregion
+
+# region Processes
+
+@router.get('/process/{process_name}/log', response={200: list[ProcessLogOut], 403: Message},
+    description="Get log entries of a process, newest first. To get the next page, pass the ID of the last received entry as `before_id`.",
+    tags=[ApiDocTags.PROCESSES])
+def get_process_log(request: HttpRequest, process_name: str, before_id: int | None = None, limit: int = 100):
+    if not is_user_admin(request.user):
+        return 403, {"message": "You are not authorized to view process logs."}
+    process = get_object_or_404(ProcessStatus, name=process_name)
+    logs = ProcessLog.objects.filter(process=process)
+    if before_id is not None:
+        logs = logs.filter(id__lt=before_id)
+    limit = max(1, min(limit, settings.PROCESS_LOG_MAX_PAGE_SIZE))
+    return logs.order_by('-id')[:limit]
+
+# endregion
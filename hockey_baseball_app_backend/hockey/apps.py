@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class HockeyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hockey'
+
+    def ready(self):
+        from hockey.utils.reference_cache import connect_reference_cache_signals
+        from hockey.utils.resource_versions import connect_resource_version_signals
+        connect_reference_cache_signals()
+        connect_resource_version_signals()
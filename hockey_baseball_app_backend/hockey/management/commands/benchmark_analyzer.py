@@ -0,0 +1,296 @@
+import datetime
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from faker import Faker
+
+from hockey.models import (Arena, ArenaRink, DefensiveZoneExit, Division, Game, GameEventName, GameEvents, GamePeriod, GameType, Goalie, OffensiveZoneEntry,
+                           Player, PlayerPosition, ProcessStatus, Season, ShotType, Shots, Team, TeamAgeGroup, TeamLevel, Turnovers)
+from hockey.utils.constants import GOALIE_POSITION_NAME, EventName, GameEventSystemStatus, GameStatus, GoalType
+from hockey.utils.event_analysis_serializer import serialize_game, serialize_game_event
+
+# Seconds to wait for the analyzer to finish its first pass over the empty queue.
+ANALYZER_START_TIMEOUT = 60
+# Seconds between the checks of the queue while the analyzer drains it.
+DRAIN_POLL_INTERVAL = 0.01
+
+# Shares of the generated events and shots. Ordered, so the choices do not depend on the hash seed.
+EVENT_NAME_WEIGHTS = OrderedDict([(EventName.SHOT, 0.5), (EventName.TURNOVER, 0.2), (EventName.FACEOFF, 0.2), (EventName.PENALTY, 0.1)])
+SHOT_TYPE_WEIGHTS = OrderedDict([("Goal", 0.1), ("Save", 0.6), ("Missed the Net", 0.2), ("Blocked", 0.1)])
+
+
+class League:
+    """Synthetic league generated from a seed, so the runs with the same options analyze the same payloads."""
+
+    def __init__(self, fake: Faker, teams_count: int, players_count: int, goalies_count: int):
+        self.fake = fake
+        self.season = Season.objects.create(name="2025-2026", start_date=datetime.date(2025, 9, 1))
+        self.rink = ArenaRink.objects.create(name="Rink 1", arena=Arena.objects.create(name=fake.company(), address=fake.street_address()))
+        self.game_type = GameType.objects.get_or_create(name="Regular Season")[0]
+        self.periods = [GamePeriod.objects.get_or_create(name=name, order=order)[0] for order, name in enumerate(["1st", "2nd", "3rd"], start=1)]
+        self.event_names = {name: GameEventName.objects.get_or_create(name=name)[0]
+                            for name in [EventName.SHOT, EventName.TURNOVER, EventName.FACEOFF, EventName.PENALTY, EventName.GOALIE_CHANGE]}
+        self.shot_types = {name: ShotType.objects.get_or_create(name=name)[0] for name in SHOT_TYPE_WEIGHTS}
+
+        age_group = TeamAgeGroup.objects.get_or_create(name="U18")[0]
+        level = TeamLevel.objects.get_or_create(name="AA")[0]
+        division = Division.objects.get_or_create(name="East")[0]
+        self.teams = Team.objects.bulk_create([
+            Team(age_group=age_group, level=level, division=division, name=f"{fake.city()} {fake.last_name()}s {number}", logo="team_logo/benchmark.png",
+                 city=fake.city())
+            for number in range(1, teams_count + 1)])
+
+        skater_position = PlayerPosition.objects.get_or_create(name="Center")[0]
+        goalie_position = PlayerPosition.objects.get_or_create(name=GOALIE_POSITION_NAME)[0]
+        self.players: dict[int, list[Player]] = {}
+        self.goalies: dict[int, list[Goalie]] = {}
+        for team in self.teams:
+            team_players = Player.objects.bulk_create([
+                self.new_player(team, number, (goalie_position if number <= goalies_count else skater_position))
+                for number in range(1, goalies_count + players_count + 1)])
+            self.goalies[team.id] = Goalie.objects.bulk_create([Goalie(player=player) for player in team_players[:goalies_count]])
+            self.players[team.id] = team_players[goalies_count:]
+
+    def new_player(self, team: Team, number: int, position: PlayerPosition) -> Player:
+        fake = self.fake
+        return Player(team=team, number=number, first_name=fake.first_name_male(), last_name=fake.last_name(), position=position,
+                      birth_year=fake.date_between(datetime.date(2007, 1, 1), datetime.date(2009, 12, 31)), birthplace_country=fake.country(),
+                      address_country="Canada", address_region=fake.state(), address_city=fake.city(), address_street=fake.street_address(),
+                      address_postal_code=fake.postcode(), height=fake.random_int(62, 78), weight=fake.random_int(130, 220),
+                      shoots=fake.random_element("LR"))
+
+    def create_game(self, date: datetime.date, events_count: int) -> Game:
+        """Creates a finished game with full rosters and `events_count` events."""
+
+        fake = self.fake
+        home_team, away_team = fake.random_sample(self.teams, 2)
+        game = Game.objects.create(home_team=home_team, away_team=away_team, game_type=self.game_type, date=date, time=datetime.time(18, 0), rink=self.rink,
+                                   season=self.season, status=GameStatus.GAME_OVER.id,
+                                   home_start_goalie=self.goalies[home_team.id][0], away_start_goalie=self.goalies[away_team.id][0],
+                                   home_defensive_zone_exit=DefensiveZoneExit.objects.create(), home_offensive_zone_entry=OffensiveZoneEntry.objects.create(),
+                                   home_shots=Shots.objects.create(), home_turnovers=Turnovers.objects.create(),
+                                   away_defensive_zone_exit=DefensiveZoneExit.objects.create(), away_offensive_zone_entry=OffensiveZoneEntry.objects.create(),
+                                   away_shots=Shots.objects.create(), away_turnovers=Turnovers.objects.create())
+        game.home_goalies.set(self.goalies[home_team.id])
+        game.away_goalies.set(self.goalies[away_team.id])
+        game.home_players.set(self.players[home_team.id])
+        game.away_players.set(self.players[away_team.id])
+
+        events = [self.new_event(game, home_team, away_team) for _ in range(events_count)]
+        if fake.pybool(25) and len(self.goalies[home_team.id]) > 1:
+            events.append(GameEvents(game=game, event_name=self.event_names[EventName.GOALIE_CHANGE], time=datetime.time(0, 10), period=self.periods[1],
+                                     team=home_team, goalie=self.goalies[home_team.id][1]))
+        GameEvents.objects.bulk_create(events)
+
+        goal = self.shot_types["Goal"]
+        game.home_goals = sum(1 for event in events if event.shot_type == goal and event.team == home_team)
+        game.away_goals = sum(1 for event in events if event.shot_type == goal and event.team == away_team)
+        game.save(update_fields=["home_goals", "away_goals"])
+        return game
+
+    def new_event(self, game: Game, home_team: Team, away_team: Team) -> GameEvents:
+        """Generates an event with the people the analyzer requires for its kind."""
+
+        fake = self.fake
+        team = fake.random_element([home_team, away_team])
+        other_team = (away_team if team == home_team else home_team)
+        name = fake.random_element(EVENT_NAME_WEIGHTS)
+        event = GameEvents(game=game, event_name=self.event_names[name], period=fake.random_element(self.periods),
+                           time=datetime.time(0, fake.random_int(0, 19), fake.random_int(0, 59)), team=team,
+                           player=fake.random_element(self.players[team.id]))
+
+        if name == EventName.SHOT:
+            shot_type_name = fake.random_element(SHOT_TYPE_WEIGHTS)
+            event.shot_type = self.shot_types[shot_type_name]
+            event.goalie = self.goalies[other_team.id][0]
+            event.is_scoring_chance = fake.pybool(30)
+            if shot_type_name == "Goal":
+                event.goal_type = fake.random_element([GoalType.EVEN_STRENGTH, GoalType.POWER_PLAY, GoalType.SHORT_HANDED])
+                event.player_2 = fake.random_element(self.players[team.id] + [None])
+            elif shot_type_name == "Blocked":
+                event.player_2 = fake.random_element(self.players[other_team.id])
+        elif name == EventName.FACEOFF:
+            event.player_2 = fake.random_element(self.players[other_team.id])
+        elif name == EventName.PENALTY:
+            event.time_length = datetime.timedelta(minutes=fake.random_element([2, 4, 5]))
+            event.player_2 = fake.random_element(self.players[other_team.id] + [None])
+        return event
+
+    def edit_event(self, game: Game) -> list[tuple[str, int]]:
+        """Moves a random event of the game to another player of its team, as a coach correcting it would.
+
+        :returns: The queue entries of the event as (payload, status) tuples: the DEPRECATED one, then the NEW one.
+        """
+
+        event = self.fake.random_element(list(game.gameevents_set.select_related("game", "event_name", "period", "shot_type").filter(player__isnull=False)))
+        old_payload = serialize_game_event(event)
+        event.player = self.fake.random_element([player for player in self.players[event.team_id] if player.id != event.player_id])
+        event.save(update_fields=["player"])
+        return [(old_payload, GameEventSystemStatus.DEPRECATED), (serialize_game_event(event), GameEventSystemStatus.NEW)]
+
+
+class Command(BaseCommand):
+    help = ("Benchmarks the game events analyzer: loads a synthetic league into a scratch database, queues the analysis payloads of its games "
+            "and times the analyzer draining the queue. Runs with the same options analyze the same payloads, so they are comparable across commits.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teams", type=int, default=8, help="Number of teams.")
+        parser.add_argument("--players", type=int, default=18, help="Number of skaters per team.")
+        parser.add_argument("--goalies", type=int, default=2, help="Number of goalies per team.")
+        parser.add_argument("--games", type=int, default=100, help="Number of finished games.")
+        parser.add_argument("--events", type=int, default=80, help="Number of events per game.")
+        parser.add_argument("--edits", type=int, default=2,
+                            help="Number of edits per game after it has finished: event corrections and status flips, each queueing a DEPRECATED and a NEW payload.")
+        parser.add_argument("--seed", type=int, default=1, help="Seed of the generated league and edits.")
+        parser.add_argument("--db-name", default="hockey_benchmark", help="Scratch database created for the run and dropped afterwards.")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the scratch database after the run.")
+        parser.add_argument("--analyzer-dir", default=str(Path(settings.BASE_DIR).parent / "data_analyzer"), help="Directory of game_events_analyzer.py.")
+        parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for the queue to be drained.")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        analyzer_path = Path(options["analyzer_dir"]) / "game_events_analyzer.py"
+        if not analyzer_path.exists():
+            raise CommandError(f"{analyzer_path} does not exist.")
+
+        connection = connections["hockey"]
+        connection.settings_dict["TEST"]["NAME"] = options["db_name"]
+        old_db_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            payloads = self.create_payloads(options)
+            results = self.run_analyzer(analyzer_path, payloads, options["timeout"])
+        finally:
+            connection.creation.destroy_test_db(old_db_name, verbosity=0, keepdb=options["keepdb"])
+
+        results = {key: options[key] for key in ["teams", "players", "goalies", "games", "events", "edits", "seed"]} | results
+        if options["json"]:
+            self.stdout.write(json.dumps(results))
+            return
+        self.stdout.write(f"Payloads: {results['payloads']} in {results['seconds']:.2f} s ({results['payloads_per_second']:.1f} payloads/s)")
+        self.stdout.write(f"Queries: {results['queries']} ({results['queries_per_payload']:.2f} per payload)")
+        self.stdout.write(f"Peak RSS: {results['peak_rss_mb']:.1f} MB")
+        if results["failed_payloads"] > 0:
+            self.stdout.write(self.style.WARNING(f"Failed payloads: {results['failed_payloads']}"))
+
+    def create_payloads(self, options: dict) -> list[tuple[str, int, int]]:
+        """Generates the league and the payloads the backend queues for it.
+
+        :returns: The queue entries as (payload, status, game ID) tuples in the queue order: the games as they finish,
+            then the edits of the finished games in random order.
+        """
+
+        fake = Faker()
+        fake.seed_instance(options["seed"])
+        league = League(fake, options["teams"], options["players"], options["goalies"])
+
+        games = [league.create_game(league.season.start_date + datetime.timedelta(days=number), options["events"]) for number in range(options["games"])]
+        payloads = [(serialize_game(game), GameEventSystemStatus.NEW, game.id) for game in games]
+
+        edits = []
+        for game in games:
+            for _ in range(options["edits"]):
+                if fake.pybool(75):
+                    edits.append([(payload, status, game.id) for payload, status in league.edit_event(game)])
+                else:
+                    # The finish of the game undone and redone.
+                    game_payload = serialize_game(game)
+                    edits.append([(game_payload, GameEventSystemStatus.DEPRECATED, game.id), (game_payload, GameEventSystemStatus.NEW, game.id)])
+        fake.random.shuffle(edits)
+        return payloads + [payload for edit in edits for payload in edit]
+
+    def run_analyzer(self, analyzer_path: Path, payloads: list[tuple[str, int, int]], timeout: float) -> dict:
+        """Starts the analyzer, queues the payloads once it is idle and measures the time until they are applied.
+
+        The analyzer log is kept if the run fails, so the error message can point to it.
+        """
+
+        db = connections["hockey"].settings_dict
+        metrics_file = tempfile.NamedTemporaryFile(suffix=".prom", delete=False)
+        log_file = tempfile.NamedTemporaryFile(suffix=".log", delete=False)
+        env = os.environ | {"DB_USER": db["USER"] or "", "DB_PASSWORD": db["PASSWORD"] or "", "DB_HOST": db["HOST"] or "localhost",
+                            "DB_PORT": str(db["PORT"] or 5432), "DB_NAME_HOCKEY": db["NAME"], "SSLMODE": os.environ.get("SSLMODE", "prefer"),
+                            "ANALYZER_METRICS_TEXTFILE": metrics_file.name}
+        try:
+            process = subprocess.Popen([sys.executable, analyzer_path.name], cwd=analyzer_path.parent, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+            try:
+                self.wait_for_analyzer_start(process, log_file.name)
+
+                now = datetime.datetime.now(datetime.timezone.utc)
+                rows = [(uuid.uuid4(), payload, status, now + datetime.timedelta(microseconds=number), game_id)
+                        for number, (payload, status, game_id) in enumerate(payloads)]
+                with transaction.atomic(using="hockey"), connections["hockey"].cursor() as cursor:
+                    cursor.executemany("INSERT INTO game_events_analysis_queue (id, payload, status, date_time, game_id) VALUES (%s, %s, %s, %s, %s)", rows)
+                start_time = time.monotonic()
+
+                with connections["hockey"].cursor() as cursor:
+                    while True:
+                        cursor.execute("SELECT count(*) FROM game_events_analysis_queue WHERE retry_at IS NULL")
+                        if cursor.fetchone()[0] == 0:
+                            break
+                        if time.monotonic() - start_time > timeout:
+                            raise CommandError(f"The queue was not drained in {timeout} s, see the analyzer log {log_file.name}.")
+                        if self.is_exited(process):
+                            raise CommandError(f"The analyzer has exited, see its log {log_file.name}.")
+                        time.sleep(DRAIN_POLL_INTERVAL)
+                seconds = time.monotonic() - start_time
+            finally:
+                process.send_signal(signal.SIGTERM)
+                _, _, rusage = os.wait4(process.pid, 0)
+            # The metrics file is read after the analyzer has exited, so it includes the last pass.
+            metrics = read_metrics(metrics_file.name)
+        finally:
+            metrics_file.close()
+            os.unlink(metrics_file.name)
+            log_file.close()
+
+        os.unlink(log_file.name)
+        queries = int(metrics.get("analyzer_round_trips_total", 0))
+        return {
+            "payloads": len(payloads),
+            "failed_payloads": int(metrics.get('analyzer_entries_total{result="retried"}', 0) + metrics.get('analyzer_entries_total{result="dead_lettered"}', 0)),
+            "seconds": seconds,
+            "payloads_per_second": len(payloads) / seconds,
+            "queries": queries,
+            "queries_per_payload": queries / len(payloads),
+            # Kilobytes on Linux.
+            "peak_rss_mb": rusage.ru_maxrss / 1024,
+        }
+
+    def wait_for_analyzer_start(self, process: subprocess.Popen, log_path: str) -> None:
+        """Waits until the analyzer has finished its first pass over the empty queue and waits for notifications."""
+
+        start_time = time.monotonic()
+        while not ProcessStatus.objects.filter(name="game_events_analyzer", status="OK").exists():
+            if self.is_exited(process):
+                raise CommandError(f"The analyzer has exited, see its log {log_path}.")
+            if time.monotonic() - start_time > ANALYZER_START_TIMEOUT:
+                raise CommandError(f"The analyzer has not started in {ANALYZER_START_TIMEOUT} s, see its log {log_path}.")
+            time.sleep(0.1)
+
+    def is_exited(self, process: subprocess.Popen) -> bool:
+        # Not `process.poll()`: it would reap the process before `os.wait4()` gets its resource usage.
+        return os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None
+
+
+def read_metrics(path: str) -> dict[str, float]:
+    """Reads the samples of a Prometheus text format file, keyed by their names with labels."""
+
+    samples = {}
+    with open(path) as file:
+        for line in file:
+            if line.startswith("#") or not line.strip():
+                continue
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:12
+
+from django.db import migrations
+
+
+# Notifies the game events analyzer when new entries are added to the analysis queue.
+# The notification is delivered when the inserting transaction commits.
+CREATE_NOTIFY_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION game_events_analysis_queue_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('game_events_analysis_queue', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER game_events_analysis_queue_notify
+    AFTER INSERT ON game_events_analysis_queue
+    FOR EACH STATEMENT EXECUTE FUNCTION game_events_analysis_queue_notify();
+"""
+
+DROP_NOTIFY_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS game_events_analysis_queue_notify ON game_events_analysis_queue;
+DROP FUNCTION IF EXISTS game_events_analysis_queue_notify();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0078_alter_analytics_game_alter_analytics_player'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_NOTIFY_TRIGGER_SQL, reverse_sql=DROP_NOTIFY_TRIGGER_SQL),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:40
+
+from django.db import migrations, models
+
+
+# Game payloads store the game ID in "id", game event payloads in "game_id".
+BACKFILL_GAME_ID_SQL = """
+UPDATE game_events_analysis_queue
+SET game_id = (CASE WHEN payload::jsonb->>'type' = 'game' THEN payload::jsonb->>'id' ELSE payload::jsonb->>'game_id' END)::integer
+WHERE game_id IS NULL;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0079_game_events_analysis_queue_notify'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameeventsanalysisqueue',
+            name='game_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_GAME_ID_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='gameeventsanalysisqueue',
+            index=models.Index(fields=['game_id', 'date_time'], name='idx_analysis_queue_game_date'),
+        ),
+    ]
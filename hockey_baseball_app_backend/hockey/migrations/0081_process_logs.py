@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 11:05
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+def copy_process_logs(apps, schema_editor):
+    """Keep the existing text logs as a single entry per process."""
+    ProcessStatus = apps.get_model('hockey', 'ProcessStatus')
+    ProcessLog = apps.get_model('hockey', 'ProcessLog')
+
+    for process_status in ProcessStatus.objects.exclude(log=""):
+        ProcessLog.objects.create(process=process_status, message=process_status.log)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0080_game_events_analysis_queue_game_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('date_time', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('process', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='hockey.processstatus')),
+            ],
+            options={
+                'db_table': 'process_logs',
+                'indexes': [models.Index(fields=['process', '-id'], name='idx_process_logs_process_id')],
+            },
+        ),
+        migrations.RunPython(copy_process_logs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='processstatus',
+            name='log',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 11:40
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0081_process_logs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+                ('last_modified', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+            ],
+            options={
+                'db_table': 'resource_versions',
+            },
+        ),
+    ]
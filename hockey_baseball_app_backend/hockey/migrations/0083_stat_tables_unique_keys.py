@@ -0,0 +1,78 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:10
+
+from django.db import migrations, models
+
+
+STAT_TABLE_KEYS = {
+    'GameGoalie': ('game', 'goalie'),
+    'GamePlayer': ('game', 'player'),
+    'GoalieSeason': ('season', 'goalie'),
+    'GoalieTeamSeason': ('season', 'goalie', 'team'),
+    'PlayerSeason': ('season', 'player'),
+    'PlayerTeamSeason': ('season', 'player', 'team'),
+    'TeamSeason': ('season', 'team'),
+}
+
+def merge_duplicate_stats(apps, schema_editor):
+    """Merge duplicate statistics rows into the oldest one, summing their statistics.
+
+    The rows hold deltas added by the data analyzer, so duplicates created by concurrent inserts add up.
+    """
+    quote = schema_editor.quote_name
+    for model_name, key_fields in STAT_TABLE_KEYS.items():
+        model = apps.get_model('hockey', model_name)
+        table = quote(model._meta.db_table)
+        key_columns = [quote(model._meta.get_field(field).column) for field in key_fields]
+        stat_columns = [quote(field.column) for field in model._meta.concrete_fields
+                        if not field.primary_key and not field.is_relation and not field.generated]
+        keys = ", ".join(key_columns)
+        schema_editor.execute(f"""
+            WITH merged AS (
+                SELECT min(id) AS keep_id, {keys}, {", ".join(f"sum({col}) AS {col}" for col in stat_columns)}
+                FROM {table} GROUP BY {keys} HAVING count(*) > 1
+            ), updated AS (
+                UPDATE {table} SET {", ".join(f"{col} = merged.{col}" for col in stat_columns)}
+                FROM merged WHERE {table}.id = merged.keep_id
+            )
+            DELETE FROM {table} USING merged
+            WHERE {" AND ".join(f"{table}.{col} = merged.{col}" for col in key_columns)} AND {table}.id <> merged.keep_id
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0082_resource_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_stats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='gamegoalie',
+            constraint=models.UniqueConstraint(fields=('game', 'goalie'), name='unique_game_goalie'),
+        ),
+        migrations.AddConstraint(
+            model_name='gameplayer',
+            constraint=models.UniqueConstraint(fields=('game', 'player'), name='unique_game_player'),
+        ),
+        migrations.AddConstraint(
+            model_name='goalieseason',
+            constraint=models.UniqueConstraint(fields=('season', 'goalie'), name='unique_goalie_season'),
+        ),
+        migrations.AddConstraint(
+            model_name='goalieteamseason',
+            constraint=models.UniqueConstraint(fields=('season', 'goalie', 'team'), name='unique_goalie_team_season'),
+        ),
+        migrations.AddConstraint(
+            model_name='playerseason',
+            constraint=models.UniqueConstraint(fields=('season', 'player'), name='unique_player_season'),
+        ),
+        migrations.AddConstraint(
+            model_name='playerteamseason',
+            constraint=models.UniqueConstraint(fields=('season', 'player', 'team'), name='unique_player_team_season'),
+        ),
+        migrations.AddConstraint(
+            model_name='teamseason',
+            constraint=models.UniqueConstraint(fields=('season', 'team'), name='unique_team_season'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Person column of each game statistics model and the home roster table of the person.
+GAME_STAT_ROSTERS = {
+    'GamePlayer': ('player_id', 'games_home_players'),
+    'GameGoalie': ('goalie_id', 'games_home_goalies'),
+}
+
+def set_game_stats_team(apps, schema_editor):
+    """Set the team of the rows to the home team if the person is on the home roster, otherwise to the away team,
+    the way the game logs determined it before."""
+    quote = schema_editor.quote_name
+    for model_name, (person_column, home_roster_table) in GAME_STAT_ROSTERS.items():
+        model = apps.get_model('hockey', model_name)
+        table = quote(model._meta.db_table)
+        schema_editor.execute(f"""
+            UPDATE {table} SET team_id = CASE
+                WHEN EXISTS (SELECT 1 FROM {home_roster_table} roster
+                             WHERE roster.game_id = games.id AND roster.{person_column} = {table}.{person_column})
+                THEN games.home_team_id ELSE games.away_team_id END
+            FROM games WHERE games.id = {table}.game_id
+        """)
+    # Check the deferred foreign keys now, so the columns can be altered in the same transaction.
+    schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0083_stat_tables_unique_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameplayer',
+            name='team',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.RESTRICT, to='hockey.team'),
+        ),
+        migrations.AddField(
+            model_name='gamegoalie',
+            name='team',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.RESTRICT, to='hockey.team'),
+        ),
+        migrations.RunPython(set_game_stats_team, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='gameplayer',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='hockey.team'),
+        ),
+        migrations.AlterField(
+            model_name='gamegoalie',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='hockey.team'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:10
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0084_game_player_goalie_team'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teamseason',
+            name='goal_differential',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('goals_for'), '-', models.F('goals_against')), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='teamseason',
+            name='points',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('wins'), '*', models.Value(2)), '+', models.F('ties')), output_field=models.IntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='teamseason',
+            index=models.Index(fields=['season', '-points', '-wins', '-goal_differential', '-goals_for'], name='idx_team_seasons_standings'),
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:40
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0085_team_season_standings'),
+    ]
+
+    # Generated fields cannot be altered, so they are re-added with floating point division.
+    operations = [
+        migrations.RemoveField(
+            model_name='gamegoalie',
+            name='save_percents',
+        ),
+        migrations.AddField(
+            model_name='gamegoalie',
+            name='save_percents',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(goals_against__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('saves', models.FloatField()), '/', django.db.models.expressions.CombinedExpression(models.F('goals_against'), '+', models.F('saves'))), '*', models.Value(100))), default=models.Value(0), output_field=models.FloatField()), output_field=models.FloatField(), verbose_name='Save %'),
+        ),
+        migrations.RemoveField(
+            model_name='goalieseason',
+            name='save_percents',
+        ),
+        migrations.AddField(
+            model_name='goalieseason',
+            name='save_percents',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('saves__gt', 0), ('goals_against__gt', 0), _connector='OR'), then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('saves', models.FloatField()), '/', django.db.models.expressions.CombinedExpression(models.F('saves'), '+', models.F('goals_against'))), '*', models.Value(100))), default=models.Value(0), output_field=models.FloatField()), output_field=models.FloatField(), verbose_name='Save %'),
+        ),
+        migrations.RemoveField(
+            model_name='goalieseason',
+            name='shots_on_goal_per_game',
+        ),
+        migrations.AddField(
+            model_name='goalieseason',
+            name='shots_on_goal_per_game',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(games_played__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('shots_on_goal', models.FloatField()), '/', models.F('games_played'))), default=models.Value(0), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.RemoveField(
+            model_name='goalieteamseason',
+            name='save_percents',
+        ),
+        migrations.AddField(
+            model_name='goalieteamseason',
+            name='save_percents',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('saves__gt', 0), ('goals_against__gt', 0), _connector='OR'), then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('saves', models.FloatField()), '/', django.db.models.expressions.CombinedExpression(models.F('saves'), '+', models.F('goals_against'))), '*', models.Value(100))), default=models.Value(0), output_field=models.FloatField()), output_field=models.FloatField(), verbose_name='Save %'),
+        ),
+        migrations.RemoveField(
+            model_name='goalieteamseason',
+            name='shots_on_goal_per_game',
+        ),
+        migrations.AddField(
+            model_name='goalieteamseason',
+            name='shots_on_goal_per_game',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(games_played__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('shots_on_goal', models.FloatField()), '/', models.F('games_played'))), default=models.Value(0), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.RemoveField(
+            model_name='playerseason',
+            name='faceoff_win_percents',
+        ),
+        migrations.AddField(
+            model_name='playerseason',
+            name='faceoff_win_percents',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(faceoffs__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('faceoffs_won', models.FloatField()), '/', models.F('faceoffs')), '*', models.Value(100))), default=models.Value(0), output_field=models.FloatField()), output_field=models.FloatField(), verbose_name='Faceoff Win %'),
+        ),
+        migrations.RemoveField(
+            model_name='playerseason',
+            name='shots_on_goal_per_game',
+        ),
+        migrations.AddField(
+            model_name='playerseason',
+            name='shots_on_goal_per_game',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(games_played__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('shots_on_goal', models.FloatField()), '/', models.F('games_played'))), default=models.Value(0), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.RemoveField(
+            model_name='playerteamseason',
+            name='faceoff_win_percents',
+        ),
+        migrations.AddField(
+            model_name='playerteamseason',
+            name='faceoff_win_percents',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(faceoffs__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('faceoffs_won', models.FloatField()), '/', models.F('faceoffs')), '*', models.Value(100))), default=models.Value(0), output_field=models.FloatField()), output_field=models.FloatField(), verbose_name='Faceoff Win %'),
+        ),
+        migrations.RemoveField(
+            model_name='playerteamseason',
+            name='shots_on_goal_per_game',
+        ),
+        migrations.AddField(
+            model_name='playerteamseason',
+            name='shots_on_goal_per_game',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(games_played__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('shots_on_goal', models.FloatField()), '/', models.F('games_played'))), default=models.Value(0), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.AddIndex(
+            model_name='goalieseason',
+            index=models.Index(fields=['season', '-save_percents'], name='idx_goalie_seasons_save_pct'),
+        ),
+        migrations.AddIndex(
+            model_name='goalieseason',
+            index=models.Index(fields=['season', '-wins'], name='idx_goalie_seasons_wins'),
+        ),
+        migrations.AddIndex(
+            model_name='playerseason',
+            index=models.Index(fields=['season', '-points'], name='idx_player_seasons_points'),
+        ),
+        migrations.AddIndex(
+            model_name='playerseason',
+            index=models.Index(fields=['season', '-goals'], name='idx_player_seasons_goals'),
+        ),
+        migrations.AddIndex(
+            model_name='playerseason',
+            index=models.Index(fields=['season', '-penalty_minutes'], name='idx_player_seasons_pim'),
+        ),
+    ]
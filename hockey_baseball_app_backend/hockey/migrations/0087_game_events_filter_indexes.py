@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Keeps the season of the game events equal to the season of their game: the events take it when inserted or updated,
+# and take the new season when the season of the game changes.
+CREATE_SEASON_TRIGGERS_SQL = """
+UPDATE game_events SET season_id = games.season_id FROM games WHERE games.id = game_events.game_id;
+
+CREATE OR REPLACE FUNCTION game_events_set_season() RETURNS trigger AS $$
+BEGIN
+    NEW.season_id := (SELECT season_id FROM games WHERE id = NEW.game_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER game_events_set_season
+    BEFORE INSERT OR UPDATE ON game_events
+    FOR EACH ROW EXECUTE FUNCTION game_events_set_season();
+
+CREATE OR REPLACE FUNCTION games_update_events_season() RETURNS trigger AS $$
+BEGIN
+    UPDATE game_events SET season_id = NEW.season_id WHERE game_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER games_update_events_season
+    AFTER UPDATE OF season_id ON games
+    FOR EACH ROW WHEN (OLD.season_id IS DISTINCT FROM NEW.season_id) EXECUTE FUNCTION games_update_events_season();
+"""
+
+DROP_SEASON_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS games_update_events_season ON games;
+DROP FUNCTION IF EXISTS games_update_events_season();
+DROP TRIGGER IF EXISTS game_events_set_season ON game_events;
+DROP FUNCTION IF EXISTS game_events_set_season();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0086_season_stats_leaders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameevents',
+            name='season',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.RESTRICT, to='hockey.season'),
+        ),
+        migrations.RunSQL(CREATE_SEASON_TRIGGERS_SQL, reverse_sql=DROP_SEASON_TRIGGERS_SQL),
+        migrations.AddIndex(
+            model_name='gameevents',
+            index=models.Index(fields=['player', 'season', 'event_name'], name='idx_game_events_player_season'),
+        ),
+        migrations.AddIndex(
+            model_name='gameevents',
+            index=models.Index(fields=['goalie', 'season', 'event_name', 'shot_type'], name='idx_game_events_goalie_season'),
+        ),
+        migrations.AddIndex(
+            model_name='gameevents',
+            index=models.Index(fields=['game', 'period', '-time'], name='idx_game_events_game_time'),
+        ),
+    ]
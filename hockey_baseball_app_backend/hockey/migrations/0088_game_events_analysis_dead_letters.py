@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:40
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+# The failed entries were skipped by the analyzer for good: move them to the dead letters, so they block their games.
+MOVE_FAILED_ENTRIES_SQL = """
+INSERT INTO game_events_analysis_dead_letters (id, payload, status, date_time, error_message, game_id, retry_count)
+SELECT id, payload, status, date_time, error_message, game_id, 1 FROM game_events_analysis_queue WHERE error_message IS NOT NULL;
+
+DELETE FROM game_events_analysis_queue WHERE error_message IS NOT NULL;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hockey', '0087_game_events_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameEventsAnalysisDeadLetter',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('payload', models.TextField()),
+                ('status', models.IntegerField(blank=True, null=True)),
+                ('date_time', models.DateTimeField()),
+                ('error_message', models.TextField()),
+                ('game_id', models.IntegerField(blank=True, null=True)),
+                ('retry_count', models.IntegerField()),
+                ('failed_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+            ],
+            options={
+                'db_table': 'game_events_analysis_dead_letters',
+            },
+        ),
+        migrations.AddField(
+            model_name='gameeventsanalysisqueue',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gameeventsanalysisqueue',
+            name='retry_count',
+            field=models.IntegerField(db_default=0),
+        ),
+        migrations.RunSQL(MOVE_FAILED_ENTRIES_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='gameeventsanalysisqueue',
+            index=models.Index(condition=models.Q(('retry_at', None)), fields=['date_time', 'id'], name='idx_analysis_queue_pending'),
+        ),
+        migrations.AddIndex(
+            model_name='gameeventsanalysisdeadletter',
+            index=models.Index(fields=['game_id'], name='idx_analysis_dead_letters_game'),
+        ),
+    ]
@@ -5,7 +5,7 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import Q, Case, DateField, ExpressionWrapper, Index, UniqueConstraint, When, Value, F
-from django.db.models.functions import Concat
+from django.db.models.functions import Cast, Concat, Now
 
 from hockey.utils.constants import GOALIE_POSITION_NAME, GameStatus, GoalType, HighlightVisibility, IdName, PlayerTryoutStatus, RinkZone, get_constant_class_int_choices, get_constant_class_str_choices
 
@@ -93,11 +93,29 @@ class TeamSeason(models.Model):
     losses = models.IntegerField()
     ties = models.IntegerField()
 
+    points = models.GeneratedField(
+        expression=F('wins') * 2 + F('ties'),
+        output_field=models.IntegerField(),
+        db_persist=True)
+    """Standings points, see `formulas.get_team_points()`."""
+
+    goal_differential = models.GeneratedField(
+        expression=F('goals_for') - F('goals_against'),
+        output_field=models.IntegerField(),
+        db_persist=True)
+
     def __str__(self):
         return f'{self.team.name} - {self.season.name}'
 
     class Meta:
         db_table = "team_seasons"
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'team'], name='unique_team_season'),
+        ]
+        indexes = [
+            # Standings order, see `db_utils.STANDINGS_ORDERING`.
+            Index(fields=['season', '-points', '-wins', '-goal_differential', '-goals_for'], name='idx_team_seasons_standings'),
+        ]
 
 class PlayerPosition(models.Model):
 
@@ -180,14 +198,14 @@ class PlayerSeason(models.Model):
     turnovers = models.IntegerField(default=0)
 
     faceoff_win_percents = models.GeneratedField(
-        expression=Case(When(faceoffs__gt=0, then=((F('faceoffs_won') / F('faceoffs'))* 100)),
+        expression=Case(When(faceoffs__gt=0, then=((Cast('faceoffs_won', models.FloatField()) / F('faceoffs')) * 100)),
                         default=Value(0), output_field=models.FloatField()),
         output_field=models.FloatField(),
         db_persist=True,
         verbose_name="Faceoff Win %")
 
     shots_on_goal_per_game = models.GeneratedField(
-        expression=Case(When(games_played__gt=0, then=(F('shots_on_goal') / F('games_played'))),
+        expression=Case(When(games_played__gt=0, then=(Cast('shots_on_goal', models.FloatField()) / F('games_played'))),
                         default=Value(0), output_field=models.FloatField()),
         output_field=models.FloatField(),
         db_persist=True)
@@ -199,6 +217,15 @@ class PlayerSeason(models.Model):
 
     class Meta:
         db_table = "player_seasons"
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'player'], name='unique_player_season'),
+        ]
+        indexes = [
+            # Most requested leaderboards.
+            Index(fields=['season', '-points'], name='idx_player_seasons_points'),
+            Index(fields=['season', '-goals'], name='idx_player_seasons_goals'),
+            Index(fields=['season', '-penalty_minutes'], name='idx_player_seasons_pim'),
+        ]
 
     def __str__(self):
         return f'{str(self.player)} - {self.season.name}'
@@ -242,14 +269,14 @@ class PlayerTeamSeason(models.Model):
     turnovers = models.IntegerField(default=0)
 
     faceoff_win_percents = models.GeneratedField(
-        expression=Case(When(faceoffs__gt=0, then=((F('faceoffs_won') / F('faceoffs'))* 100)),
+        expression=Case(When(faceoffs__gt=0, then=((Cast('faceoffs_won', models.FloatField()) / F('faceoffs')) * 100)),
                         default=Value(0), output_field=models.FloatField()),
         output_field=models.FloatField(),
         db_persist=True,
         verbose_name="Faceoff Win %")
 
     shots_on_goal_per_game = models.GeneratedField(
-        expression=Case(When(games_played__gt=0, then=(F('shots_on_goal') / F('games_played'))),
+        expression=Case(When(games_played__gt=0, then=(Cast('shots_on_goal', models.FloatField()) / F('games_played'))),
                         default=Value(0), output_field=models.FloatField()),
         output_field=models.FloatField(),
         db_persist=True)
@@ -261,6 +288,9 @@ class PlayerTeamSeason(models.Model):
 
     class Meta:
         db_table = "player_team_seasons"
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'player', 'team'], name='unique_player_team_season'),
+        ]
 
     def __str__(self):
         return f'{str(self.player)} - {self.team.name} - {self.season.name}'
@@ -353,14 +383,14 @@ class GoalieSeason(models.Model):
     """PPGA field."""
 
     save_percents = models.GeneratedField(
-        expression=Case(When(Q(saves__gt=0) | Q(goals_against__gt=0), then=((F('saves') / (F('saves') + F('goals_against'))) * 100)),
+        expression=Case(When(Q(saves__gt=0) | Q(goals_against__gt=0), then=((Cast('saves', models.FloatField()) / (F('saves') + F('goals_against'))) * 100)),
                         default=Value(0), output_field=models.FloatField()),
         output_field=models.FloatField(),
         db_persist=True,
         verbose_name="Save %")
 
     shots_on_goal_per_game = models.GeneratedField(
-        expression=Case(When(games_played__gt=0, then=(F('shots_on_goal') / F('games_played'))),
+        expression=Case(When(games_played__gt=0, then=(Cast('shots_on_goal', models.FloatField()) / F('games_played'))),
                         default=Value(0), output_field=models.FloatField()),
         output_field=models.FloatField(),
         db_persist=True)
@@ -372,6 +402,14 @@ class GoalieSeason(models.Model):
 
     class Meta:
         db_table = "goalie_seasons"
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'goalie'], name='unique_goalie_season'),
+        ]
+        indexes = [
+            # Most requested leaderboards.
+            Index(fields=['season', '-save_percents'], name='idx_goalie_seasons_save_pct'),
+            Index(fields=['season', '-wins'], name='idx_goalie_seasons_wins'),
+        ]
 
     def __str__(self):
         return f'{str(self.goalie)} - {self.season.name}'
@@ -400,14 +438,14 @@ class GoalieTeamSeason(models.Model):
     """PPGA field."""
 
     save_percents = models.GeneratedField(
-        expression=Case(When(Q(saves__gt=0) | Q(goals_against__gt=0), then=((F('saves') / (F('saves') + F('goals_against'))) * 100)),
+        expression=Case(When(Q(saves__gt=0) | Q(goals_against__gt=0), then=((Cast('saves', models.FloatField()) / (F('saves') + F('goals_against'))) * 100)),
                         default=Value(0), output_field=models.FloatField()),
         output_field=models.FloatField(),
         db_persist=True,
         verbose_name="Save %")
 
     shots_on_goal_per_game = models.GeneratedField(
-        expression=Case(When(games_played__gt=0, then=(F('shots_on_goal') / F('games_played'))),
+        expression=Case(When(games_played__gt=0, then=(Cast('shots_on_goal', models.FloatField()) / F('games_played'))),
                         default=Value(0), output_field=models.FloatField()),
         output_field=models.FloatField(),
         db_persist=True)
@@ -419,6 +457,9 @@ class GoalieTeamSeason(models.Model):
 
     class Meta:
         db_table = "goalie_team_seasons"
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'goalie', 'team'], name='unique_goalie_team_season'),
+        ]
 
     def __str__(self):
         return f'{str(self.goalie)} - {self.team.name} - {self.season.name}'
@@ -622,6 +663,8 @@ class GamePlayer(models.Model):
 
     game = models.ForeignKey(Game, on_delete=models.CASCADE)
     player = models.ForeignKey(Player, on_delete=models.RESTRICT)
+    team = models.ForeignKey(Team, on_delete=models.RESTRICT)
+    """Team the player played for in the game, the home or away team of the game."""
     goals = models.IntegerField(default=0)
     assists = models.IntegerField(default=0)
     shots_on_goal = models.IntegerField(default=0)
@@ -649,11 +692,16 @@ class GamePlayer(models.Model):
 
     class Meta:
         db_table = "game_players"
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'player'], name='unique_game_player'),
+        ]
 
 class GameGoalie(models.Model):
 
     game = models.ForeignKey(Game, on_delete=models.CASCADE)
     goalie = models.ForeignKey(Goalie, on_delete=models.RESTRICT)
+    team = models.ForeignKey(Team, on_delete=models.RESTRICT)
+    """Team the goalie played for in the game, the home or away team of the game."""
     shots_on_goal = models.IntegerField(default=0)
     goals_against = models.IntegerField(default=0)
     saves = models.IntegerField(default=0)
@@ -672,7 +720,7 @@ class GameGoalie(models.Model):
     #     db_persist=True)
 
     save_percents = models.GeneratedField(
-        expression=Case(When(goals_against__gt=0, then=((F('saves') / (F('goals_against') + F('saves'))) * 100)),
+        expression=Case(When(goals_against__gt=0, then=((Cast('saves', models.FloatField()) / (F('goals_against') + F('saves'))) * 100)),
                         default=Value(0), output_field=models.FloatField()),
         output_field=models.FloatField(),
         db_persist=True,
@@ -683,6 +731,9 @@ class GameGoalie(models.Model):
 
     class Meta:
         db_table = "game_goalies"
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'goalie'], name='unique_game_goalie'),
+        ]
 
 class GameEventName(models.Model):
 
@@ -706,6 +757,8 @@ class ShotType(models.Model):
 class GameEvents(models.Model):
 
     game = models.ForeignKey(Game, on_delete=models.CASCADE)
+    # Season of the game, copied by the database triggers for the spray chart filters.
+    season = models.ForeignKey(Season, on_delete=models.RESTRICT, null=True, blank=True, editable=False)
     event_name = models.ForeignKey(GameEventName, on_delete=models.RESTRICT)
     time = models.TimeField(auto_now=False, auto_now_add=False)
     period = models.ForeignKey(GamePeriod, on_delete=models.RESTRICT)
@@ -740,6 +793,13 @@ class GameEvents(models.Model):
 
     class Meta:
         db_table = "game_events"
+        indexes = [
+            # Spray chart filters.
+            Index(fields=['player', 'season', 'event_name'], name='idx_game_events_player_season'),
+            Index(fields=['goalie', 'season', 'event_name', 'shot_type'], name='idx_game_events_goalie_season'),
+            # Events of a game in time order.
+            Index(fields=['game', 'period', '-time'], name='idx_game_events_game_time'),
+        ]
 
 class CustomEvents(models.Model):
     event_name = models.CharField(max_length=150)
@@ -870,18 +930,90 @@ class GameEventsAnalysisQueue(models.Model):
     error_message = models.TextField(null=True, blank=True)
     """If the analysis failed, this field will be set to the error message."""
 
+    game_id = models.IntegerField(null=True, blank=True)
+    """ID of the game the payload belongs to. Entries of the same game are analyzed in order by a single worker.\n
+    Not a foreign key because the entries of deleted games stay in the queue until they are analyzed.
+    """
+
+    retry_count = models.IntegerField(db_default=0)
+    """Number of failed analysis attempts."""
+
+    retry_at = models.DateTimeField(null=True, blank=True)
+    """If the analysis failed, the entry and the later entries of its game are not analyzed before this time."""
+
     class Meta:
         db_table = "game_events_analysis_queue"
+        indexes = [
+            models.Index(fields=['game_id', 'date_time'], name='idx_analysis_queue_game_date'),
+            models.Index(fields=['date_time', 'id'], condition=Q(retry_at=None), name='idx_analysis_queue_pending'),
+        ]
+
+class GameEventsAnalysisDeadLetter(models.Model):
+    """Analysis queue entry that failed the maximum number of attempts.\n
+    The later entries of its game wait in the queue until it is requeued or discarded.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    """ID of the queue entry."""
+
+    payload = models.TextField()
+    status = models.IntegerField(null=True, blank=True)
+    date_time = models.DateTimeField()
+    """Time the entry was added to the queue."""
+
+    error_message = models.TextField()
+    game_id = models.IntegerField(null=True, blank=True)
+    retry_count = models.IntegerField()
+    failed_at = models.DateTimeField(db_default=Now())
+
+    def __str__(self):
+        return f"{self.date_time} - game {self.game_id}"
+
+    class Meta:
+        db_table = "game_events_analysis_dead_letters"
+        indexes = [
+            models.Index(fields=['game_id'], name='idx_analysis_dead_letters_game'),
+        ]
 
 class ProcessStatus(models.Model):
     name = models.CharField(max_length=150, unique=True)
     status = models.CharField(max_length=150, null=True, blank=True)
     last_finished = models.DateTimeField(null=True, blank=True)
     last_updated = models.DateTimeField(auto_now=True)
-    log = models.TextField(default="")
 
     def __str__(self):
         return f"{self.name}"
 
     class Meta:
         db_table = "processes_status"
+
+class ProcessLog(models.Model):
+    """Append-only log of a process. Old entries are deleted by the process itself."""
+
+    process = models.ForeignKey(ProcessStatus, related_name='logs', on_delete=models.CASCADE)
+    message = models.TextField()
+    date_time = models.DateTimeField(db_default=Now())
+
+    def __str__(self):
+        return f"{self.date_time} - {self.process.name}"
+
+    class Meta:
+        db_table = "process_logs"
+        indexes = [
+            models.Index(fields=['process', '-id'], name='idx_process_logs_process_id'),
+        ]
+
+class ResourceVersion(models.Model):
+    """Version of a group of API resources, bumped after each committed change of their data.\n
+    Used to answer conditional GET requests without loading the resources.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    last_modified = models.DateTimeField(db_default=Now())
+
+    def __str__(self):
+        return f"{self.name} - {self.version}"
+
+    class Meta:
+        db_table = "resource_versions"
@@ -192,6 +192,42 @@ class PlayerSeasonOut(Schema):
 class PlayerTeamSeasonOut(PlayerSeasonOut):
     team_id: int
 
+class PlayerLeaderStat(StrEnum):
+    """Player season statistics with leaderboards."""
+    POINTS = "points"
+    GOALS = "goals"
+    ASSISTS = "assists"
+    SHOTS_ON_GOAL = "shots_on_goal"
+    SHOTS_ON_GOAL_PER_GAME = "shots_on_goal_per_game"
+    SCORING_CHANCES = "scoring_chances"
+    BLOCKED_SHOTS = "blocked_shots"
+    POWER_PLAY_GOALS = "power_play_goals"
+    SHORT_HANDED_GOALS = "short_handed_goals"
+    OVERALL_DIFF = "overall_diff"
+    FACEOFF_WIN_PERCENTS = "faceoff_win_percents"
+    PENALTY_MINUTES = "penalty_minutes"
+    PENALTIES_DRAWN = "penalties_drawn"
+
+class GoalieLeaderStat(StrEnum):
+    """Goalie season statistics with leaderboards."""
+    SAVE_PERCENTS = "save_percents"
+    SAVES = "saves"
+    WINS = "wins"
+    SHOTS_ON_GOAL = "shots_on_goal"
+    SHOTS_ON_GOAL_PER_GAME = "shots_on_goal_per_game"
+    POINTS = "points"
+    PENALTY_MINUTES = "penalty_minutes"
+
+class LeaderOut(Schema):
+    id: int = Field(..., description="Player or goalie ID.")
+    first_name: str
+    last_name: str
+    number: int
+    team_id: int | None
+    team_name: str | None
+    games_played: int
+    value: int | float | datetime.timedelta = Field(..., description="Value of the statistic.")
+
 # endregion
 
 # region Team, season, division, level
@@ -239,6 +275,23 @@ class TeamSeasonOut(Schema):
     def resolve_points(obj: TeamSeason) -> int:
         return get_team_points(obj)
 
+class TeamStandingOut(Schema):
+    rank: int = Field(..., description="Position in the standings. Teams equal on points and all tiebreakers share the position.")
+    team_id: int
+    team_name: str
+    abbreviation: str | None
+    age_group: str
+    division_id: int
+    division_name: str
+    games_played: int
+    wins: int
+    losses: int
+    ties: int
+    points: int
+    goals_for: int
+    goals_against: int
+    goal_differential: int
+
 # endregion
 
 # region Game
@@ -559,6 +612,10 @@ class GameLiveDataOut(Schema):
     away_turnovers: TurnoversOut
     events: list[GameEventOut]
 
+class GameLiveUpdateOut(GameLiveDataOut):
+    """Live data update pushed by the live feed. `events` only contains the added and updated events."""
+    deleted_event_ids: list[int]
+
 # endregion
 
 # region Spray charts
@@ -579,6 +636,21 @@ class PlayerSprayChartFilters(SprayChartFilters):
 class GameSprayChartFilters(Schema):
     event_name: str | None = Field(None, description=get_constant_class_str_description(EventName))
 
+class SprayChartArea(StrEnum):
+    """Spray chart of the event points: on the ice or on the net."""
+    ICE = "ice"
+    NET = "net"
+
+class SprayChartHeatmapCellOut(Schema):
+    row: int = Field(..., description="Index of the cell by the top offset: offsets from `row * bin_size` to `(row + 1) * bin_size` exclusive.")
+    column: int = Field(..., description="Index of the cell by the left offset: offsets from `column * bin_size` to `(column + 1) * bin_size` exclusive.")
+    shot_type_id: int | None
+    count: int
+
+class SprayChartHeatmapOut(Schema):
+    bin_size: int
+    cells: list[SprayChartHeatmapCellOut] = Field(..., description="Number of events of each shot type in each cell. Cells without events are omitted.")
+
 # endregion
 
 # region Highlight Reels
@@ -810,4 +882,13 @@ class PlayerTryoutStatusHistoryOut(Schema):
     date_time: datetime.datetime
     user: PlayerTryoutUpdateUserOut
 
+# endregion
+
+# region Processes
+
+class ProcessLogOut(Schema):
+    id: int
+    date_time: datetime.datetime
+    message: str
+
 # endregion
\ No newline at end of file
@@ -1,3 +1,522 @@
-from django.test import TestCase
+import asyncio
+import copy
+import datetime
+import json
+import uuid
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connections
+from django.test import SimpleTestCase, TestCase
 
-# Create your tests here.
+from hockey.models import (Arena, ArenaRink, DefensiveZoneExit, Division, Game, GameEventName, GameEvents, GameEventsAnalysisDeadLetter, GameEventsAnalysisQueue, GameGoalie, GamePeriod, GamePlayer, GameType, Goalie, GoalieSeason,
+                           OffensiveZoneEntry, Player, PlayerPosition, PlayerSeason, Season, ShotType, Shots, Team, TeamAgeGroup, TeamLevel, TeamSeason, Turnovers)
+from hockey.schemas import GoalieSprayChartFilters, PlayerSprayChartFilters
+from hockey.utils.constants import GOALIE_POSITION_NAME, EventName, GameEventSystemStatus, GameStatus, ResourceName
+from hockey.utils.db_utils import get_game_events_queryset, get_goalie_spray_chart_events, get_player_spray_chart_events, requeue_analysis_dead_letters
+from hockey.utils.event_analysis_serializer import game_delta_to_dict, game_to_dict
+from hockey.utils.live_feed import form_live_feed_update, hub
+from hockey.utils.resource_versions import bump_resource_versions
+from hockey.utils.reference_cache import clear_reference_cache, get_game_event_name, get_season_by_date
+
+# region Test data
+
+def create_team(name: str) -> Team:
+    return Team.objects.create(age_group=TeamAgeGroup.objects.get_or_create(name="U18")[0], level=TeamLevel.objects.get_or_create(name="AA")[0],
+                               division=Division.objects.get_or_create(name="East")[0], name=name, logo="team_logo/test.png", city="Toronto")
+
+def create_player(team: Team, number: int, position_name: str = "Center") -> Player:
+    return Player.objects.create(team=team, number=number, first_name=f"First{number}", last_name=f"Last{number}", birth_year=datetime.date(2008, 1, 1),
+                                 birthplace_country="Canada", address_country="Canada", address_region="Ontario", address_city="Toronto",
+                                 address_street="Main St", address_postal_code="M1M 1M1", height=70, weight=170, shoots='L',
+                                 position=PlayerPosition.objects.get_or_create(name=position_name)[0])
+
+def create_goalie(team: Team, number: int) -> Goalie:
+    return Goalie.objects.create(player=create_player(team, number, GOALIE_POSITION_NAME))
+
+def create_game(home_team: Team, away_team: Team, date: datetime.date = datetime.date(2025, 10, 1), game_type_name: str = "Regular Season", **kwargs) -> Game:
+    rink = ArenaRink.objects.create(name="Rink 1", arena=Arena.objects.create(name="Arena", address="1 Main St"))
+    return Game.objects.create(home_team=home_team, away_team=away_team, game_type=GameType.objects.get_or_create(name=game_type_name)[0],
+                               date=date, time=datetime.time(18, 0), rink=rink,
+                               home_defensive_zone_exit=DefensiveZoneExit.objects.create(), home_offensive_zone_entry=OffensiveZoneEntry.objects.create(),
+                               home_shots=Shots.objects.create(), home_turnovers=Turnovers.objects.create(),
+                               away_defensive_zone_exit=DefensiveZoneExit.objects.create(), away_offensive_zone_entry=OffensiveZoneEntry.objects.create(),
+                               away_shots=Shots.objects.create(), away_turnovers=Turnovers.objects.create(), **kwargs)
+
+def create_finished_game(events_count: int) -> Game:
+    """Creates a finished game with rosters and `events_count` shots, turnovers and penalties."""
+    season = Season.objects.get_or_create(name="2025-2026", start_date=datetime.date(2025, 9, 1))[0]
+    home_team = create_team("Home")
+    away_team = create_team("Away")
+    home_goalie = create_goalie(home_team, 1)
+    away_goalie = create_goalie(away_team, 31)
+    home_players = [create_player(home_team, number) for number in range(2, 8)]
+    away_players = [create_player(away_team, number) for number in range(32, 38)]
+
+    game = create_game(home_team, away_team, season=season, status=GameStatus.GAME_OVER.id,
+                       home_start_goalie=home_goalie, away_start_goalie=away_goalie)
+    game.home_goalies.set([home_goalie])
+    game.away_goalies.set([away_goalie])
+    game.home_players.set(home_players)
+    game.away_players.set(away_players)
+
+    periods = [GamePeriod.objects.get_or_create(name=name, order=order)[0] for order, name in enumerate(["1st", "2nd", "3rd"], start=1)]
+    shot = GameEventName.objects.get_or_create(name=EventName.SHOT)[0]
+    turnover = GameEventName.objects.get_or_create(name=EventName.TURNOVER)[0]
+    penalty = GameEventName.objects.get_or_create(name=EventName.PENALTY)[0]
+    save = ShotType.objects.get_or_create(name="Save")[0]
+    GameEvents.objects.bulk_create([
+        GameEvents(game=game, event_name=event_name, time=datetime.time(0, i % 20, i % 60), period=periods[i % 3], team=home_team,
+                   player=home_players[i % 6], goalie=(away_goalie if event_name == shot else None), shot_type=(save if event_name == shot else None),
+                   time_length=(datetime.timedelta(minutes=2) if event_name == penalty else None))
+        for i, event_name in enumerate([shot, turnover, penalty] * (events_count // 3) + [shot] * (events_count % 3))])
+    return game
+
+# endregion
+
+class GameDeltaTests(SimpleTestCase):
+
+    def form_event(self, event_id: int, event_name: str, **kwargs) -> dict:
+        return {"type": "game_event", "id": event_id, "game_id": 1, "game_season_id": 1, "event_name": event_name,
+                "team_id": 10, "team_2_id": 20, "player_id": 100, "player_2_id": None, "goalie_id": None} | kwargs
+
+    def form_game(self) -> dict:
+        return {"type": "game", "id": 1, "home_team_id": 10, "away_team_id": 20, "home_start_goalie_id": 1000, "away_start_goalie_id": 2000,
+                "home_goals": 1, "away_goals": 0, "home_goalies": [1000], "away_goalies": [2000], "home_players": [100], "away_players": [200],
+                "season_id": 1, "events": [self.form_event(1, "turnover"), self.form_event(2, "shot on goal", goalie_id=2000, shot_type="goal")]}
+
+    def test_unchanged_game(self):
+        game = self.form_game()
+        self.assertIsNone(game_delta_to_dict(game, copy.deepcopy(game)))
+
+    def test_changed_event(self):
+        old_game = self.form_game()
+        new_game = copy.deepcopy(old_game)
+        new_game["events"][0]["player_id"] = 101
+        new_game["events"].append(self.form_event(3, "faceoff", player_2_id=200))
+        delta = game_delta_to_dict(old_game, new_game)
+        self.assertEqual(delta["removed_events"], [old_game["events"][0]])
+        self.assertEqual(delta["added_events"], [new_game["events"][0], new_game["events"][2]])
+        self.assertIsNone(delta["old_game"])
+        self.assertIsNone(delta["new_game"])
+
+    def test_changed_game(self):
+        old_game = self.form_game()
+        new_game = copy.deepcopy(old_game)
+        new_game["home_goals"] = 2
+        new_game["events"].append(self.form_event(3, "goalie change", player_id=None, goalie_id=1001))
+        delta = game_delta_to_dict(old_game, new_game)
+        self.assertEqual(delta["added_events"], [new_game["events"][2]])
+        self.assertEqual(delta["old_game"]["events"], [])
+        self.assertEqual(delta["new_game"]["home_goals"], 2)
+        self.assertEqual(delta["new_game"]["events"], [new_game["events"][2]])
+
+class GameSerializationTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def test_game_to_dict_query_count(self):
+        game = create_finished_game(events_count=200)
+        game = Game.objects.get(id=game.id)
+        # Events with their names, periods and shot types, and the four rosters.
+        with self.assertNumQueries(5, using='hockey'):
+            game_data = game_to_dict(game)
+        self.assertEqual(len(game_data["events"]), 200)
+        self.assertEqual(len(game_data["home_players"]), 6)
+        self.assertEqual(game_data["away_goalies"], [game.away_start_goalie_id])
+        self.assertEqual(game_data["events"][0]["event_name"], EventName.SHOT.lower())
+        self.assertEqual(game_data["events"][0]["game_season_id"], game.season_id)
+
+class AnalysisDeadLetterTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def test_requeue_keeps_queue_order(self):
+        failed_at = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        dead_letter = GameEventsAnalysisDeadLetter.objects.create(id=uuid.uuid4(), payload="{}", status=GameEventSystemStatus.NEW, date_time=failed_at,
+                                                                  error_message="ERROR: No player specified.", game_id=1, retry_count=5)
+        later_entry = GameEventsAnalysisQueue.objects.create(payload="{}", status=GameEventSystemStatus.NEW, game_id=1)
+
+        self.assertEqual(requeue_analysis_dead_letters(GameEventsAnalysisDeadLetter.objects.all()), 1)
+
+        self.assertFalse(GameEventsAnalysisDeadLetter.objects.exists())
+        entries = list(GameEventsAnalysisQueue.objects.order_by('date_time'))
+        self.assertEqual([entry.id for entry in entries], [dead_letter.id, later_entry.id])
+        self.assertEqual(entries[0].date_time, failed_at)
+        self.assertEqual(entries[0].retry_count, 0)
+        self.assertIsNone(entries[0].error_message)
+
+class GameListTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user(email="coach@test.com", password="testpassword"))
+        self.home_team, self.away_team = create_team("Home"), create_team("Away")
+
+    def create_games(self, count: int) -> None:
+        for i in range(count):
+            create_game(self.home_team, self.away_team, home_start_goalie=create_goalie(self.home_team, i * 2 + 1),
+                        away_start_goalie=create_goalie(self.away_team, i * 2 + 2), game_period=GamePeriod.objects.get_or_create(name="1", order=1)[0])
+
+    def test_game_list_query_count(self):
+        # One query for the games with all their relations, regardless of the number of games.
+        for count in [2, 10]:
+            self.create_games(count - Game.objects.count())
+            with self.assertNumQueries(1, using='hockey'):
+                games = self.client.get("/api/hockey/game/list").json()
+            self.assertEqual(len(games), count)
+            self.assertRegex(games[0]["home_start_goalie_name"], r"^First\d+ Last\d+$")
+            self.assertEqual(games[0]["game_type"], "Regular Season")
+            self.assertEqual(games[0]["game_period_name"], "1")
+
+    def test_game_query_count(self):
+        self.create_games(1)
+        game = Game.objects.get()
+        with self.assertNumQueries(1, using='hockey'):
+            self.assertEqual(self.client.get(f"/api/hockey/game/{game.id}").json()["away_start_goalie_name"], "First2 Last2")
+        # The game, and the games of its type for the team records.
+        with self.assertNumQueries(2, using='hockey'):
+            self.assertEqual(self.client.get(f"/api/hockey/game/{game.id}/extra").json()["arena_name"], "Arena")
+
+    def test_game_type_records(self):
+        other_team = create_team("Other")
+        game = create_game(self.home_team, self.away_team)
+        # Home games of the home team and away games of the away team are counted.
+        for home_team, away_team, home_goals, away_goals in [(self.home_team, other_team, 3, 1), (self.home_team, other_team, 0, 2),
+                                                             (self.home_team, self.away_team, 1, 1), (other_team, self.away_team, 0, 5),
+                                                             (other_team, self.away_team, 2, 2), (self.away_team, other_team, 4, 0),
+                                                             (other_team, self.home_team, 4, 0)]:
+            create_game(home_team, away_team, home_goals=home_goals, away_goals=away_goals)
+        create_game(self.home_team, other_team, game_type_name="Playoffs", home_goals=1)
+        with self.assertNumQueries(2, using='hockey'):
+            game_out = self.client.get(f"/api/hockey/game/{game.id}/extra").json()
+        self.assertEqual(game_out["home_team_game_type_record"], {"wins": 1, "losses": 1, "ties": 1})
+        self.assertEqual(game_out["away_team_game_type_record"], {"wins": 1, "losses": 0, "ties": 1})
+
+class PlayerListTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        self.season = Season.objects.create(name="2025-2026", start_date=datetime.date(2025, 9, 1))
+        self.team = create_team("Team")
+        self.client.force_login(get_user_model().objects.create_user(email="coach@test.com", password="testpassword"))
+
+    def test_goalie_list(self):
+        goalies = [create_goalie(self.team, number) for number in range(1, 11)]
+        GoalieSeason.objects.create(goalie=goalies[0], season=self.season, saves=9, goals_against=1)
+        # Current season, goalies with players and teams, and their season statistics.
+        with self.assertNumQueries(3, using='hockey'):
+            response = self.client.get("/api/hockey/goalie/list")
+        self.assertEqual(response.status_code, 200)
+        goalies_out = {goalie["id"]: goalie for goalie in response.json()}
+        self.assertEqual(len(goalies_out), 10)
+        self.assertEqual(goalies_out[goalies[0].pk]["saves"], 9)
+        self.assertEqual(goalies_out[goalies[1].pk]["saves"], 0)
+        self.assertEqual(goalies_out[goalies[1].pk]["team_name"], "Team")
+        self.assertEqual(GoalieSeason.objects.count(), 1)
+
+    def test_player_list(self):
+        players = [create_player(self.team, number) for number in range(2, 22)]
+        PlayerSeason.objects.create(player=players[0], season=self.season, goals=2, assists=1)
+        # Current season, players with teams, and their season statistics.
+        with self.assertNumQueries(3, using='hockey'):
+            response = self.client.get("/api/hockey/player/list")
+        self.assertEqual(response.status_code, 200)
+        players_out = {player["id"]: player for player in response.json()}
+        self.assertEqual(len(players_out), 20)
+        self.assertEqual(players_out[players[0].id]["points"], 3)
+        self.assertEqual(players_out[players[1].id]["points"], 0)
+        self.assertEqual(players_out[players[1].id]["team_name"], "Team")
+        self.assertEqual(PlayerSeason.objects.count(), 1)
+
+class GameLogTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user(email="coach@test.com", password="testpassword"))
+        season = Season.objects.create(name="2025-2026", start_date=datetime.date(2025, 9, 1))
+        self.team, opponent = create_team("Team"), create_team("Opponent")
+        self.player, self.goalie = create_player(self.team, 10), create_goalie(self.team, 1)
+        # Home win, away loss, away win and home tie of the team.
+        for day, (home_team, away_team, home_goals, away_goals) in enumerate([(self.team, opponent, 3, 1), (opponent, self.team, 2, 0),
+                                                                               (opponent, self.team, 1, 4), (self.team, opponent, 2, 2)]):
+            game = create_game(home_team, away_team, datetime.date(2025, 10, day + 1), season=season, home_goals=home_goals, away_goals=away_goals)
+            GamePlayer.objects.create(game=game, player=self.player, team=self.team, goals=day)
+            GameGoalie.objects.create(game=game, goalie=self.goalie, team=self.team, saves=day)
+
+    def test_player_games(self):
+        with self.assertNumQueries(1, using='hockey'):
+            games = self.client.get(f"/api/hockey/game-player/player/{self.player.id}", {"limit": 10}).json()
+        self.assertEqual([game["score"] for game in games], ["(T) 2 - 2", "(W) 1 - 4", "(L) 2 - 0", "(W) 3 - 1"])
+        self.assertEqual({game["team_name"] for game in games}, {"Team"})
+        self.assertEqual({game["team_vs_name"] for game in games}, {"Opponent"})
+        self.assertEqual(games[0]["goals"], 3)
+
+    def test_goalie_games(self):
+        with self.assertNumQueries(1, using='hockey'):
+            games = self.client.get(f"/api/hockey/game-player/goalie/{self.goalie.pk}", {"limit": 2}).json()
+        self.assertEqual([game["score"] for game in games], ["(T) 2 - 2", "(W) 1 - 4"])
+        self.assertEqual([game["saves"] for game in games], [3, 2])
+        self.assertEqual(games[0]["first_name"], "First1")
+
+class LeadersTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        clear_reference_cache()
+        self.season = Season.objects.create(name="2025-2026", start_date=datetime.date(2025, 9, 1))
+        self.team = create_team("Team")
+        self.client.force_login(get_user_model().objects.create_user(email="coach@test.com", password="testpassword"))
+
+    def test_player_leaders(self):
+        players = [create_player(self.team, number) for number in range(2, 7)]
+        for player, (games_played, goals, assists) in zip(players, [(5, 3, 4), (4, 6, 1), (1, 9, 0), (0, 0, 0), (6, 2, 0)]):
+            PlayerSeason.objects.create(player=player, season=self.season, games_played=games_played, goals=goals, assists=assists,
+                                        penalty_minutes=datetime.timedelta(minutes=goals))
+        # Equal points are ordered by fewer games played, players without games are not listed.
+        with self.assertNumQueries(1, using='hockey'):
+            leaders = self.client.get("/api/hockey/leaders/players", {"season_id": self.season.id}).json()
+        self.assertEqual([(leader["id"], leader["value"]) for leader in leaders],
+                         [(players[2].id, 9), (players[1].id, 7), (players[0].id, 7), (players[4].id, 2)])
+        self.assertEqual(leaders[0]["team_name"], "Team")
+        leaders = self.client.get("/api/hockey/leaders/players", {"stat": "penalty_minutes", "min_games_played": 2, "limit": 1}).json()
+        self.assertEqual([(leader["id"], leader["value"]) for leader in leaders], [(players[1].id, "06:00")])
+
+    def test_goalie_leaders(self):
+        goalies = [create_goalie(self.team, number) for number in range(1, 4)]
+        for goalie, (saves, goals_against) in zip(goalies, [(18, 2), (27, 1), (10, 10)]):
+            GoalieSeason.objects.create(goalie=goalie, season=self.season, games_played=2, saves=saves, goals_against=goals_against)
+        leaders = self.client.get("/api/hockey/leaders/goalies").json()
+        self.assertEqual([leader["id"] for leader in leaders], [goalies[1].pk, goalies[0].pk, goalies[2].pk])
+        self.assertAlmostEqual(leaders[1]["value"], 90)
+        self.assertEqual(self.client.get("/api/hockey/leaders/goalies", {"stat": "unknown"}).status_code, 422)
+
+class SprayChartHeatmapTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        clear_reference_cache()
+        self.game = create_finished_game(events_count=9)
+        self.shots = list(self.game.gameevents_set.filter(event_name__name=EventName.SHOT).order_by('id'))
+        for shot, (ice_top_offset, ice_left_offset) in zip(self.shots, [(5, 5), (25, 3), (9, 0)]):
+            shot.ice_top_offset, shot.ice_left_offset = ice_top_offset, ice_left_offset
+            shot.save()
+        self.client.force_login(get_user_model().objects.create_user(email="coach@test.com", password="testpassword"))
+
+    def test_game_heatmap(self):
+        shot_type_id = self.shots[0].shot_type_id
+        with self.assertNumQueries(1, using='hockey'):
+            heatmap = self.client.post(f"/api/hockey/game/{self.game.id}/spray-chart/heatmap", {}, content_type="application/json").json()
+        self.assertEqual(heatmap, {"bin_size": 10, "cells": [{"row": 0, "column": 0, "shot_type_id": shot_type_id, "count": 2},
+                                                              {"row": 2, "column": 0, "shot_type_id": shot_type_id, "count": 1}]})
+        heatmap = self.client.post(f"/api/hockey/game/{self.game.id}/spray-chart/heatmap?bin_size=4", {}, content_type="application/json").json()
+        self.assertEqual([(cell["row"], cell["column"], cell["count"]) for cell in heatmap["cells"]], [(1, 1, 1), (2, 0, 1), (6, 0, 1)])
+        response = self.client.post(f"/api/hockey/game/{self.game.id}/spray-chart/heatmap?bin_size=0", {}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_player_heatmap(self):
+        heatmap = self.client.post(f"/api/hockey/player/{self.shots[0].player_id}/spray-chart/heatmap", {"game_id": self.game.id},
+                                   content_type="application/json").json()
+        self.assertEqual([(cell["row"], cell["column"], cell["count"]) for cell in heatmap["cells"]], [(0, 0, 2)])
+        heatmap = self.client.post(f"/api/hockey/player/{self.shots[0].player_id}/spray-chart/heatmap?area=net", {},
+                                   content_type="application/json").json()
+        self.assertEqual(heatmap["cells"], [])
+
+class GameEventFilterTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        clear_reference_cache()
+        self.game = [create_finished_game(events_count=30) for _ in range(3)][0]
+        self.player = self.game.home_players.order_by('id').first()
+        # The test tables are tiny, so make the planner show which indexes the queries can use.
+        with connections['hockey'].cursor() as cursor:
+            cursor.execute("ANALYZE game_events")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_event_season(self):
+        self.assertFalse(GameEvents.objects.exclude(season_id=self.game.season_id).exists())
+        season = Season.objects.create(name="2026-2027", start_date=datetime.date(2026, 9, 1))
+        Game.objects.filter(id=self.game.id).update(season=season)
+        self.assertFalse(GameEvents.objects.filter(game_id=self.game.id).exclude(season_id=season.id).exists())
+        self.assertTrue(GameEvents.objects.exclude(game_id=self.game.id).filter(season_id=self.game.season_id).exists())
+
+    def test_spray_chart_indexes(self):
+        events = get_player_spray_chart_events(self.player.id, PlayerSprayChartFilters(season_id=self.game.season_id, event_name=EventName.SHOT))
+        self.assertIn("idx_game_events_player_season", events.explain())
+        self.assertEqual(events.count(), 5)
+        events = get_goalie_spray_chart_events(self.game.away_start_goalie_id, GoalieSprayChartFilters(season_id=self.game.season_id,
+                                               shot_type_id=ShotType.objects.get(name="Save").id))
+        self.assertIn("idx_game_events_goalie_season", events.explain())
+        self.assertEqual(events.count(), 10)
+
+    def test_game_events_by_players(self):
+        events = get_game_events_queryset(self.game.id, [self.player.id, self.game.away_start_goalie_id])
+        self.assertNotIn("Seq Scan", events.explain())
+        # The shots of the player are also the shots on the goalie.
+        self.assertEqual(events.count(), 10)
+        self.assertEqual(get_game_events_queryset(self.game.id).count(), 30)
+
+class TeamListTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        clear_reference_cache()
+        self.season = Season.objects.create(name="2025 / 2026", start_date=datetime.date(2025, 9, 1))
+        self.client.force_login(get_user_model().objects.create_user(email="coach@test.com", password="testpassword"))
+
+    def test_missing_team_seasons_created(self):
+        teams = [create_team(f"Team {i}") for i in range(3)]
+        TeamSeason.objects.create(team=teams[0], season=self.season, games_played=2, goals_for=5, goals_against=1, wins=2, losses=0, ties=0)
+        response = self.client.get("/api/hockey/team/list")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({team["id"]: team["wins"] for team in response.json()}, {teams[0].id: 2, teams[1].id: 0, teams[2].id: 0})
+        self.assertEqual(TeamSeason.objects.filter(season=self.season).count(), 3)
+        with self.assertRaises(IntegrityError):
+            TeamSeason.objects.create(team=teams[1], season=self.season, games_played=0, goals_for=0, goals_against=0, wins=0, losses=0, ties=0)
+
+    def test_standings(self):
+        teams = [create_team(f"Team {i}") for i in range(5)]
+        teams[4].division = Division.objects.create(name="West")
+        teams[4].save()
+        # Points, then wins, goal differential and goals for decide the order.
+        for team, (wins, losses, ties, goals_for, goals_against) in zip(teams, [(1, 0, 2, 5, 5), (2, 1, 0, 6, 4), (2, 0, 0, 4, 1),
+                                                                                 (2, 0, 0, 3, 0), (0, 3, 0, 1, 9)]):
+            TeamSeason.objects.create(team=team, season=self.season, games_played=wins + losses + ties, goals_for=goals_for, goals_against=goals_against,
+                                      wins=wins, losses=losses, ties=ties)
+        response = self.client.get("/api/hockey/team/standings")
+        self.assertEqual(response.status_code, 200)
+        standings = response.json()
+        self.assertEqual([(row["team_id"], row["rank"]) for row in standings],
+                         [(teams[2].id, 1), (teams[3].id, 2), (teams[1].id, 3), (teams[0].id, 4), (teams[4].id, 5)])
+        self.assertEqual((standings[0]["points"], standings[0]["goal_differential"]), (4, 3))
+        response = self.client.get("/api/hockey/team/standings", {"season_id": self.season.id, "division_id": teams[4].division_id})
+        self.assertEqual([(row["team_id"], row["rank"], row["division_name"]) for row in response.json()], [(teams[4].id, 1, "West")])
+
+class ReferenceCacheTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        # Test transactions are rolled back without signals, so rows cached by other tests may be gone.
+        clear_reference_cache()
+
+    def test_season_by_date(self):
+        Season.objects.create(name="2024 / 2025", start_date=datetime.date(2024, 9, 1))
+        Season.objects.create(name="2025 / 2026", start_date=datetime.date(2025, 9, 1))
+        with self.assertNumQueries(1, using='hockey'):
+            self.assertEqual(get_season_by_date(datetime.date(2025, 1, 1)).name, "2024 / 2025")
+            self.assertEqual(get_season_by_date(datetime.date(2025, 9, 1)).name, "2025 / 2026")
+            self.assertIsNone(get_season_by_date(datetime.date(2024, 8, 31)))
+
+    def test_invalidation_on_save_and_delete(self):
+        event_name = GameEventName.objects.create(name=EventName.GOALIE_CHANGE)
+        self.assertEqual(get_game_event_name(EventName.GOALIE_CHANGE), event_name)
+        event_name.name = "Goalie Swap"
+        event_name.save()
+        self.assertIsNone(get_game_event_name(EventName.GOALIE_CHANGE))
+        self.assertEqual(get_game_event_name("Goalie Swap"), event_name)
+        event_name.delete()
+        self.assertIsNone(get_game_event_name("Goalie Swap"))
+
+class ConditionalGetTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        clear_reference_cache()
+        self.client.force_login(get_user_model().objects.create_user(email="coach@test.com", password="testpassword"))
+
+    def test_not_modified(self):
+        response = self.client.get("/api/hockey/shot-type/list")
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        # Only the resource version is read.
+        with self.assertNumQueries(1, using='hockey'):
+            response = self.client.get("/api/hockey/shot-type/list", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_modified_after_change(self):
+        etag = self.client.get("/api/hockey/season/list").headers["ETag"]
+        with self.captureOnCommitCallbacks(using="hockey", execute=True):
+            Season.objects.create(name="2025 / 2026", start_date=datetime.date(2025, 9, 1))
+        response = self.client.get("/api/hockey/season/list", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(len(response.json()), 1)
+        # Versions of other resources are not affected.
+        etag = self.client.get("/api/hockey/game-period/list").headers["ETag"]
+        bump_resource_versions([ResourceName.SEASONS])
+        self.assertEqual(self.client.get("/api/hockey/game-period/list", headers={"If-None-Match": etag}).status_code, 304)
+
+    def test_unauthenticated(self):
+        etag = self.client.get("/api/hockey/shot-type/list").headers["ETag"]
+        self.client.logout()
+        response = self.client.get("/api/hockey/shot-type/list", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 401)
+
+class LiveFeedTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        clear_reference_cache()
+        self.game = create_finished_game(events_count=6)
+
+    def parse_message(self, message: str) -> tuple[str, dict]:
+        event_line, data_line, _, _ = message.split("\n")
+        return event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))
+
+    def test_update(self):
+        event_ids = list(self.game.gameevents_set.order_by('id').values_list('id', flat=True))
+        GameEvents.objects.filter(id__in=event_ids[1:3]).delete()
+        event, data = self.parse_message(form_live_feed_update(
+            {"game_id": self.game.id, "updated_event_ids": event_ids[0:2], "deleted_event_ids": [event_ids[2]]}))
+        self.assertEqual(event, "update")
+        self.assertEqual([event["id"] for event in data["events"]], [event_ids[0]])
+        # Events deleted after the notification are sent as deleted.
+        self.assertEqual(data["deleted_event_ids"], [event_ids[2], event_ids[1]])
+        self.assertEqual(data["home_shots"]["id"], self.game.home_shots_id)
+
+    def test_deleted_game(self):
+        self.assertIsNone(form_live_feed_update({"game_id": self.game.id + 1, "updated_event_ids": [], "deleted_event_ids": []}))
+
+    def test_authentication(self):
+        self.assertEqual(self.client.get(f"/api/hockey/game/{self.game.id}/live-feed").status_code, 401)
+        self.client.force_login(get_user_model().objects.create_user(email="coach@test.com", password="testpassword"))
+        self.assertEqual(self.client.get(f"/api/hockey/game/{self.game.id + 1}/live-feed").status_code, 404)
+
+    async def test_fan_out(self):
+        hub.reset()
+        queues = [asyncio.Queue(maxsize=2) for _ in range(3)]
+        hub.subscribers[self.game.id] = set(queues)
+        payload = json.dumps({"game_id": self.game.id, "updated_event_ids": [], "deleted_event_ids": []})
+        await hub.dispatch(payload)
+        messages = [queue.get_nowait() for queue in queues]
+        # The update is formed once for all subscribers.
+        self.assertTrue(all(message is messages[0] for message in messages))
+        for _ in range(3):
+            await hub.dispatch(payload)
+        self.assertEqual(queues[0].qsize(), 1)
+
+class PaginationTests(TestCase):
+    databases = {'default', 'hockey'}
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user(email="coach@test.com", password="testpassword"))
+        home_team, away_team = create_team("Home"), create_team("Away")
+        # Games with equal dates and times are ordered by ID.
+        for date in [datetime.date(2025, 10, 1), datetime.date(2025, 10, 2), datetime.date(2025, 10, 2), datetime.date(2025, 10, 2), datetime.date(2025, 10, 3)]:
+            create_game(home_team, away_team, date)
+
+    def test_game_pages(self):
+        all_ids = [game["id"] for game in self.client.get("/api/hockey/game/list").json()]
+        self.assertEqual(len(all_ids), 5)
+        ids, params = [], {"limit": 2}
+        for _ in range(3):
+            response = self.client.get("/api/hockey/game/list", params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(game["id"] for game in response.json())
+            params["cursor"] = response.headers.get("X-Next-Cursor")
+        self.assertEqual(ids, all_ids)
+        # The last page has no next cursor.
+        self.assertIsNone(params["cursor"])
+
+    def test_invalid_cursor(self):
+        for cursor in ["invalid", "WyJhIl0=", "WyIyMDI1LTEwLTAxIiwgInkiLCAxXQ=="]:
+            response = self.client.get("/api/hockey/game/list", {"cursor": cursor})
+            self.assertEqual(response.status_code, 400)
@@ -4,4 +4,8 @@ def entry_already_exists(entry_name: str, details: str | None = None) -> tuple[i
     res = 400, {"message": f"{entry_name} already exists or data is incorrect."}
     if details is not None:
         res[1]['details'] = details
-    return res
\ No newline at end of file
+    return res
+
+def invalid_cursor() -> tuple[int, dict[str, str]]:
+    """Returns tuple `(400, {"message": "Invalid cursor."})`."""
+    return 400, {"message": "Invalid cursor."}
@@ -8,6 +8,7 @@ from typing import Any, Final, Type
 GOALIE_POSITION_NAME: Final[str] = "Goalie"
 NO_GOALIE_FIRST_NAME: Final[str] = "No"
 NO_GOALIE_LAST_NAME: Final[str] = "Goalie"
+LIVE_FEED_CHANNEL: Final[str] = "game_live_feed"
 
 # endregion
 
@@ -61,6 +62,15 @@ class HighlightVisibility:
     RESTRICTED: Final[IdName] = IdName(2, "Restricted")
     PUBLIC: Final[IdName] = IdName(3, "Public")
 
+class ResourceName:
+    """Names of the resource versions used for conditional GET requests."""
+    GAMES: Final[str] = "games"
+    TEAMS: Final[str] = "teams"
+    SEASONS: Final[str] = "seasons"
+    GAME_EVENT_NAMES: Final[str] = "game_event_names"
+    SHOT_TYPES: Final[str] = "shot_types"
+    GAME_PERIODS: Final[str] = "game_periods"
+
 def get_constant_class_int_choices(constant_class) -> list[tuple[int, str]]:
     return sorted([(num_name.id, num_name.name) for _, num_name in inspect.getmembers(constant_class, lambda x: isinstance(x, IdName))], key=lambda x: x[0])
 
@@ -85,3 +95,4 @@ class ApiDocTags:
     HIGHLIGHT_REEL: Final[str] = "Hockey - Highlight Reel"
     VIDEO_LIBRARY: Final[str] = "Hockey - Video Library"
     PLAYER_TRYOUTS: Final[str] = "Hockey - Tryout"
+    PROCESSES: Final[str] = "Hockey - Processes"
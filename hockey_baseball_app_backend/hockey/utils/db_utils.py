@@ -1,26 +1,30 @@
 import datetime
-from typing import Any
+from typing import Any, Iterable
 
-from django.db import IntegrityError
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Prefetch, Q, Value, When, Window
+from django.db.models.functions import Cast, Floor, Rank
 from django.db.models.query import QuerySet
 
-from hockey.models import Analytics, AnalyticsUserAccess, CustomEvents, DefensiveZoneExit, Game, GameEventName, GameEvents, GameGoalie, GamePlayer, Goalie, GoalieSeason, Highlight, HighlightReel, HighlightUserAccess, OffensiveZoneEntry, Player, PlayerPosition, PlayerSeason, Season, ShotType, Shots, Team, Turnovers
-from hockey.schemas import AnalysisObject, AnalyticsGameOut, AnalyticsOut, AnalyticsPlayerOut, AnalyticsTeamOut, GameDashboardGameOut, GameEventIn, GameGoalieOut, GameOut, GamePlayerOut, GoalieOut, HighlightIn, PlayerOut
-from hockey.utils.constants import GOALIE_POSITION_NAME, NO_GOALIE_FIRST_NAME, NO_GOALIE_LAST_NAME, EventName, GoalType
+from hockey.models import Analytics, AnalyticsUserAccess, CustomEvents, DefensiveZoneExit, Game, GameEvents, GameEventsAnalysisDeadLetter, GameEventsAnalysisQueue, GameGoalie, GamePlayer, Goalie, GoalieSeason, Highlight, HighlightReel, HighlightUserAccess, OffensiveZoneEntry, Player, PlayerSeason, Season, Shots, Team, TeamSeason, Turnovers
+from hockey.schemas import (AnalysisObject, AnalyticsGameOut, AnalyticsOut, AnalyticsPlayerOut, AnalyticsTeamOut, GameDashboardGameOut, GameEventIn, GameGoalieOut, GameSprayChartFilters, GameTypeRecordOut, GameLiveDataOut, GameLiveUpdateOut, GameOut, GamePlayerOut, GoalieOut, GoalieSprayChartFilters, HighlightIn, LeaderOut,
+                            PlayerOut, PlayerSprayChartFilters, PlayerTryoutUpdateUserOut, SprayChartArea, SprayChartHeatmapCellOut, SprayChartHeatmapOut)
+from hockey.utils.constants import GOALIE_POSITION_NAME, NO_GOALIE_FIRST_NAME, NO_GOALIE_LAST_NAME, EventName, GameEventSystemStatus, GoalType
+from hockey.utils.event_analysis_serializer import game_to_dict, serialize_game_delta
+from hockey.utils.reference_cache import get_game_event_name, get_player_position, get_season_by_date, get_shot_type_by_id
 
 from users.utils.roles import is_user_admin
+from users.utils.user_directory import UserInfo
 
 
 def get_current_season(date: datetime.date | None = None) -> Season | None:
     """Get the current season based on the date. If no date is provided, use the current date."""
     if date is None:
         date = datetime.datetime.now(datetime.timezone.utc).date()
-    seasons = Season.objects.filter(start_date__lte=date).exclude(start_date__gt=date).order_by('-start_date').first()
-    return seasons
+    return get_season_by_date(date)
 
 def get_game_current_goalies(game: Game) -> tuple[int, int]:
-    goalie_change_event_name = GameEventName.objects.get(name=EventName.GOALIE_CHANGE)
+    goalie_change_event_name = get_game_event_name(EventName.GOALIE_CHANGE)
     home_goalie = GameEvents.objects.filter(game=game, event_name=goalie_change_event_name, team=game.home_team).order_by('-period_id', 'time').first()
     if home_goalie is None:
         home_goalie = game.home_start_goalie
@@ -38,9 +42,129 @@ def get_game_from_dashboard_home_or_away(home_or_away: DefensiveZoneExit | Offen
     else:
         return home_or_away.away_game
 
-def fetch_analytics_list(object: AnalysisObject, user, object_id: int | None = None) -> list[AnalyticsOut] | None:
-    """Returns a filtered list of analytics, or None if object is invalid."""
-    analytics = Analytics.objects.select_related('team', 'player', 'game').order_by('-date', '-time')
+def get_games_queryset() -> QuerySet[Game]:
+    """Returns the game queryset with all relations used by the game output schemas, loaded in one query."""
+    return Game.objects.select_related('rink__arena', 'game_type', 'game_type_name', 'game_period', 'home_team', 'away_team',
+                                       'home_start_goalie__player', 'away_start_goalie__player')
+
+def get_game_type_records(game: Game) -> tuple[GameTypeRecordOut, GameTypeRecordOut]:
+    """Returns the records of the home team in its other home games and of the away team in its other away games
+    of the same game type and season as the game, counted in one query."""
+    game_type_games = Game.objects.filter(game_type_id=game.game_type_id, season_id=game.season_id).\
+        filter(Q(home_team_id=game.home_team_id) | Q(away_team_id=game.away_team_id)).exclude(id=game.id)
+    if game.game_type_name_id is not None:
+        game_type_games = game_type_games.filter(game_type_name_id=game.game_type_name_id)
+    is_home_game = Q(home_team_id=game.home_team_id)
+    is_away_game = ~is_home_game & Q(away_team_id=game.away_team_id)
+    records = game_type_games.aggregate(
+        home_wins=Count('id', filter=is_home_game & Q(home_goals__gt=F('away_goals'))),
+        home_losses=Count('id', filter=is_home_game & Q(home_goals__lt=F('away_goals'))),
+        home_ties=Count('id', filter=is_home_game & Q(home_goals=F('away_goals'))),
+        away_wins=Count('id', filter=is_away_game & Q(away_goals__gt=F('home_goals'))),
+        away_losses=Count('id', filter=is_away_game & Q(away_goals__lt=F('home_goals'))),
+        away_ties=Count('id', filter=is_away_game & Q(away_goals=F('home_goals'))))
+    return (GameTypeRecordOut(wins=records['home_wins'], losses=records['home_losses'], ties=records['home_ties']),
+            GameTypeRecordOut(wins=records['away_wins'], losses=records['away_losses'], ties=records['away_ties']))
+
+STANDINGS_ORDERING = ('-points', '-wins', '-goal_differential', '-goals_for')
+"""Order of teams in season standings: points, then wins, goal differential and goals for as tiebreakers."""
+
+def get_standings_queryset(season_id: int, division_id: int | None = None, age_group: str | None = None) -> QuerySet[TeamSeason]:
+    """Returns the team seasons of the active teams in the season, in standings order and annotated with their `rank`."""
+    team_seasons = TeamSeason.objects.select_related('team__division', 'team__age_group').filter(season_id=season_id, team__is_archived=False)
+    if division_id is not None:
+        team_seasons = team_seasons.filter(team__division_id=division_id)
+    if age_group is not None:
+        team_seasons = team_seasons.filter(team__age_group__name=age_group)
+    return team_seasons.annotate(rank=Window(Rank(), order_by=[F(field.lstrip('-')).desc() for field in STANDINGS_ORDERING])).\
+        order_by(*STANDINGS_ORDERING, 'team__name')
+
+def get_leaders(season_stats: QuerySet, player_path: str, stat: str, division_id: int | None = None, age_group: str | None = None,
+                min_games_played: int = 0, limit: int = 10) -> list[LeaderOut]:
+    """Returns the top players or goalies of the season statistics by the statistic.
+
+    :param season_stats: `PlayerSeason` or `GoalieSeason` rows of the season.
+    :param player_path: Path to the player from the rows, `player` or `goalie__player`.
+    """
+    season_stats = season_stats.select_related(f'{player_path}__team').filter(games_played__gte=max(min_games_played, 1)).\
+        exclude(**{f'{player_path}__first_name': NO_GOALIE_FIRST_NAME, f'{player_path}__last_name': NO_GOALIE_LAST_NAME})
+    if division_id is not None:
+        season_stats = season_stats.filter(**{f'{player_path}__team__division_id': division_id})
+    if age_group is not None:
+        season_stats = season_stats.filter(**{f'{player_path}__team__age_group__name': age_group})
+    # Equal values are ordered by fewer games played.
+    season_stats = season_stats.order_by(F(stat).desc(nulls_last=True), 'games_played', 'id')[:limit]
+    leaders_out = []
+    for season_stat in season_stats:
+        player = season_stat.player if player_path == 'player' else season_stat.goalie.player
+        leaders_out.append(LeaderOut(id=player.id, first_name=player.first_name, last_name=player.last_name, number=player.number,
+            team_id=player.team_id, team_name=(player.team.name if player.team is not None else None),
+            games_played=season_stat.games_played, value=getattr(season_stat, stat)))
+    return leaders_out
+
+def filter_events_by_event_name(events: QuerySet[GameEvents], event_name: str) -> QuerySet[GameEvents]:
+    """Filters the events by the event name ID, without joining the event names."""
+    game_event_name = get_game_event_name(event_name)
+    return events.filter(event_name_id=game_event_name.id) if game_event_name is not None else events.none()
+
+def get_goalie_spray_chart_events(goalie_id: int, filters: GoalieSprayChartFilters) -> QuerySet[GameEvents]:
+    events = GameEvents.objects.filter(goalie_id=goalie_id)
+    if filters.season_id is not None:
+        events = events.filter(season_id=filters.season_id)
+    if filters.game_id is not None:
+        events = events.filter(game_id=filters.game_id)
+    if filters.shot_type_id is not None:
+        events = filter_events_by_event_name(events, EventName.SHOT).filter(shot_type_id=filters.shot_type_id)
+    return events
+
+def get_player_spray_chart_events(player_id: int, filters: PlayerSprayChartFilters) -> QuerySet[GameEvents]:
+    events = GameEvents.objects.filter(player_id=player_id)
+    if filters.season_id is not None:
+        events = events.filter(season_id=filters.season_id)
+    if filters.game_id is not None:
+        events = events.filter(game_id=filters.game_id)
+    if filters.event_name is not None:
+        events = filter_events_by_event_name(events, filters.event_name)
+    if filters.shot_type_id is not None:
+        events = events.filter(shot_type_id=filters.shot_type_id)
+    if filters.is_scoring_chance is not None:
+        events = events.filter(is_scoring_chance=filters.is_scoring_chance)
+    if filters.goal_type is not None:
+        events = events.filter(goal_type=filters.goal_type)
+    return events
+
+def get_game_spray_chart_events(game_id: int, filters: GameSprayChartFilters) -> QuerySet[GameEvents]:
+    events = GameEvents.objects.filter(game_id=game_id)
+    if filters.event_name is not None:
+        events = filter_events_by_event_name(events, filters.event_name)
+    return events
+
+def get_game_events_queryset(game_id: int, player_ids: list[int] | None = None) -> QuerySet[GameEvents]:
+    """Returns the events of the game, only of the given players or goalies if `player_ids` is provided.
+
+    Events of the players are matched with a union of the events by each person column, so each part can use its index.
+    """
+    events = GameEvents.objects.filter(game_id=game_id)
+    if player_ids is not None:
+        player_events = [events.filter(**{f'{column}__in': player_ids}).values('id') for column in ('player_id', 'player_2_id', 'goalie_id')]
+        events = events.filter(id__in=player_events[0].union(*player_events[1:]))
+    return events
+
+def get_spray_chart_heatmap(events: QuerySet[GameEvents], area: SprayChartArea, bin_size: int) -> SprayChartHeatmapOut:
+    """Counts the events by square cells of `bin_size` offset units and shot type, in the database.
+    Events without the points of the area are skipped."""
+    top_field, left_field = f'{area}_top_offset', f'{area}_left_offset'
+    def get_bin(field: str):
+        return Cast(Floor(Cast(field, FloatField()) / bin_size), IntegerField())
+    cells = events.filter(**{f'{top_field}__isnull': False, f'{left_field}__isnull': False}).\
+        values('shot_type_id', row=get_bin(top_field), column=get_bin(left_field)).\
+        annotate(count=Count('id')).order_by('row', 'column', 'shot_type_id')
+    return SprayChartHeatmapOut(bin_size=bin_size, cells=[SprayChartHeatmapCellOut(row=cell['row'], column=cell['column'],
+        shot_type_id=cell['shot_type_id'], count=cell['count']) for cell in cells])
+
+def get_analytics_queryset(object: AnalysisObject, user, object_id: int | None = None) -> QuerySet[Analytics] | None:
+    """Returns a filtered queryset of analytics, or None if object is invalid."""
+    analytics = Analytics.objects.select_related('team', 'player', 'game')
     if not is_user_admin(user):
         analytics = analytics.filter(Q(user_id=user.id) | Q(users_with_access__user_id=user.id))
     if object == AnalysisObject.TEAM:
@@ -59,7 +183,7 @@ def fetch_analytics_list(object: AnalysisObject, user, object_id: int | None = N
         analytics = analytics.filter(game_id=object_id) if object_id is not None else analytics.filter(game_id__isnull=False)
     else:
         return None
-    return [form_analytics_out(a) for a in analytics]
+    return analytics
 
 # region No goalie
 
@@ -73,7 +197,7 @@ def get_no_goalie(team_id: int) -> Goalie:
     """Gets or creates the default goalie to be used if no goalie in net."""
     no_goalie = Goalie.objects.filter(player__team_id=team_id, player__first_name=NO_GOALIE_FIRST_NAME, player__last_name=NO_GOALIE_LAST_NAME).first()
     if no_goalie is None:
-        no_goalie_player = Player.objects.create(position=PlayerPosition.objects.get(name=GOALIE_POSITION_NAME),
+        no_goalie_player = Player.objects.create(position=get_player_position(GOALIE_POSITION_NAME),
             first_name=NO_GOALIE_FIRST_NAME, last_name=NO_GOALIE_LAST_NAME, team_id=team_id, number=100, height=60, weight=90, shoots='L',
             birth_year=datetime.date(2001, 1, 1), birthplace_country="Canada", address_country="Canada", address_region="Ontario",
             address_city="Ottawa", address_street=f"Team {team_id}", address_postal_code="111111", player_bio="Empty Net")
@@ -84,9 +208,30 @@ def get_no_goalie(team_id: int) -> Goalie:
 
 # region Form outputs
 
-def form_goalie_out(goalie: Goalie, season: Season) -> GoalieOut:
-    goalie_season: GoalieSeason
-    goalie_season, _ = GoalieSeason.objects.get_or_create(goalie=goalie, season=season)
+def get_zero_goalie_season(goalie: Goalie, season: Season | None) -> GoalieSeason:
+    """Get unsaved goalie season statistics with zero values, for goalies without statistics in the season."""
+    return GoalieSeason(goalie=goalie, season=season, save_percents=0, shots_on_goal_per_game=0, points=0)
+
+def get_zero_player_season(player: Player, season: Season | None) -> PlayerSeason:
+    """Get unsaved player season statistics with zero values, for players without statistics in the season."""
+    return PlayerSeason(player=player, season=season, faceoff_win_percents=0, shots_on_goal_per_game=0, points=0)
+
+def prefetch_season_stats(queryset: QuerySet, season: Season | None) -> QuerySet:
+    """Prefetch the statistics of goalies or players in the season into the `season_stats` list attribute."""
+    if queryset.model is Goalie:
+        stats_lookup, stats_queryset = 'goalieseason_set', GoalieSeason.objects.filter(season=season)
+    else:
+        stats_lookup, stats_queryset = 'playerseason_set', PlayerSeason.objects.filter(season=season)
+    return queryset.prefetch_related(Prefetch(stats_lookup, queryset=stats_queryset, to_attr='season_stats'))
+
+def form_goalie_out(goalie: Goalie, season: Season, goalie_season: GoalieSeason | None = None) -> GoalieOut:
+    """Form the goalie output with the season statistics.
+
+    :param goalie_season: Statistics of the goalie in the season, if they are already loaded.
+        Otherwise they are fetched and created if missing.
+    """
+    if goalie_season is None:
+        goalie_season, _ = GoalieSeason.objects.get_or_create(goalie=goalie, season=season)
     goalie_out = GoalieOut(
         id=goalie.player.id,
         first_name=goalie.player.first_name,
@@ -123,9 +268,14 @@ def form_goalie_out(goalie: Goalie, season: Season) -> GoalieOut:
     )
     return goalie_out
 
-def form_player_out(player: Player, season: Season) -> PlayerOut:
-    player_season: PlayerSeason
-    player_season, _ = PlayerSeason.objects.get_or_create(player=player, season=season)
+def form_player_out(player: Player, season: Season, player_season: PlayerSeason | None = None) -> PlayerOut:
+    """Form the player output with the season statistics.
+
+    :param player_season: Statistics of the player in the season, if they are already loaded.
+        Otherwise they are fetched and created if missing.
+    """
+    if player_season is None:
+        player_season, _ = PlayerSeason.objects.get_or_create(player=player, season=season)
     player_out = PlayerOut(
         id=player.id,
         first_name=player.first_name,
@@ -169,25 +319,57 @@ def form_player_out(player: Player, season: Season) -> PlayerOut:
     )
     return player_out
 
+def form_game_live_data_out(game: Game, events: Iterable[GameEvents], deleted_event_ids: list[int] | None = None) -> GameLiveDataOut | GameLiveUpdateOut:
+    """Form the live data of the game with the given events.
+
+    :param deleted_event_ids: IDs of the deleted events, to form an update of the live data instead of the full data.
+    """
+    home_goalie_id, away_goalie_id = get_game_current_goalies(game)
+    home_faceoff_win = (round((game.home_faceoffs_won_count / game.faceoffs_count) * 100) if game.faceoffs_count > 0 else 0)
+    away_faceoff_win = ((100 - home_faceoff_win) if game.faceoffs_count > 0 else 0)
+    live_data = dict(game_period_id=game.game_period_id,
+                     home_goalie_id=home_goalie_id,
+                     away_goalie_id=away_goalie_id,
+                     home_goals=game.home_goals, away_goals=game.away_goals,
+                     home_faceoff_win=home_faceoff_win,
+                     away_faceoff_win=away_faceoff_win,
+                     home_defensive_zone_exit=game.home_defensive_zone_exit,
+                     away_defensive_zone_exit=game.away_defensive_zone_exit,
+                     home_offensive_zone_entry=game.home_offensive_zone_entry,
+                     away_offensive_zone_entry=game.away_offensive_zone_entry,
+                     home_shots=game.home_shots,
+                     away_shots=game.away_shots,
+                     home_turnovers=game.home_turnovers,
+                     away_turnovers=game.away_turnovers,
+                     events=list(events))
+    if deleted_event_ids is None:
+        return GameLiveDataOut(**live_data)
+    return GameLiveUpdateOut(deleted_event_ids=deleted_event_ids, **live_data)
+
+def annotate_game_result(game_stats: QuerySet) -> QuerySet:
+    """Annotates game goalie or player rows with the opposing team and the result of their team (W, L or T),
+    computed in the same query."""
+    is_home = Q(team_id=F('game__home_team_id'))
+    return game_stats.select_related('game__season', 'team').annotate(
+        team_vs_id=Case(When(is_home, then=F('game__away_team_id')), default=F('game__home_team_id')),
+        team_vs_name=Case(When(is_home, then=F('game__away_team__name')), default=F('game__home_team__name')),
+        result=Case(When(game__home_goals=F('game__away_goals'), then=Value("T")),
+                    When(is_home & Q(game__home_goals__gt=F('game__away_goals')), then=Value("W")),
+                    When(~is_home & Q(game__away_goals__gt=F('game__home_goals')), then=Value("W")),
+                    default=Value("L")))
+
 def form_game_goalie_out(game_goalie: GameGoalie) -> GameGoalieOut:
+    """Forms the game log row of a goalie from a row annotated by `annotate_game_result()`."""
     game = game_goalie.game
-    team = (game.home_team if game_goalie.goalie in game.home_goalies.all() else game.away_team)
-    team_vs = (game.away_team if team == game.home_team else game.home_team)
-    if (team == game.home_team and game.home_goals > game.away_goals) or (team == game.away_team and game.away_goals > game.home_goals):
-        result = "W"
-    elif (team == game.away_team and game.away_goals < game.home_goals) or (team == game.home_team and game.home_goals < game.away_goals):
-        result = "L"
-    else:
-        result = "T"
     return GameGoalieOut(
         id=game_goalie.goalie_id,
         season_name=game.season.name,
         date=game.date,
-        team_id=team.id,
-        team_name=team.name,
-        team_vs_id=team_vs.id,
-        team_vs_name=team_vs.name,
-        score=f"({result}) {game.home_goals} - {game.away_goals}",
+        team_id=game_goalie.team_id,
+        team_name=game_goalie.team.name,
+        team_vs_id=game_goalie.team_vs_id,
+        team_vs_name=game_goalie.team_vs_name,
+        score=f"({game_goalie.result}) {game.home_goals} - {game.away_goals}",
         first_name=game_goalie.goalie.player.first_name,
         last_name=game_goalie.goalie.player.last_name,
         goals_against=game_goalie.goals_against,
@@ -197,24 +379,17 @@ def form_game_goalie_out(game_goalie: GameGoalie) -> GameGoalieOut:
     )
 
 def form_game_player_out(game_player: GamePlayer) -> GamePlayerOut:
+    """Forms the game log row of a player from a row annotated by `annotate_game_result()`."""
     game = game_player.game
-    team = (game.home_team if game_player.player in game.home_players.all() else game.away_team)
-    team_vs = (game.away_team if team == game.home_team else game.home_team)
-    if (team == game.home_team and game.home_goals > game.away_goals) or (team == game.away_team and game.away_goals > game.home_goals):
-        result = "W"
-    elif (team == game.away_team and game.away_goals < game.home_goals) or (team == game.home_team and game.home_goals < game.away_goals):
-        result = "L"
-    else:
-        result = "T"
     return GamePlayerOut(
         id=game_player.player_id,
         season_name=game.season.name,
         date=game.date,
-        team_id=team.id,
-        team_name=team.name,
-        team_vs_id=team_vs.id,
-        team_vs_name=team_vs.name,
-        score=f"({result}) {game.home_goals} - {game.away_goals}",
+        team_id=game_player.team_id,
+        team_name=game_player.team.name,
+        team_vs_id=game_player.team_vs_id,
+        team_vs_name=game_player.team_vs_name,
+        score=f"({game_player.result}) {game.home_goals} - {game.away_goals}",
         first_name=game_player.player.first_name,
         last_name=game_player.player.last_name,
         goals=game_player.goals,
@@ -273,13 +448,20 @@ def form_analytics_out(analytics: Analytics) -> AnalyticsOut:
         analysis=analytics.analysis, date=analytics.date, time=analytics.time, team=team,
         player=player, game=game, user_id=analytics.user_id)
         
+def form_tryout_user_out(users: dict[int, UserInfo], user_id: int) -> PlayerTryoutUpdateUserOut:
+    """Returns the user from the users resolved by `get_users()`, with "?" as the name if the user does not exist."""
+    user = users.get(user_id)
+    if user is None:
+        return PlayerTryoutUpdateUserOut(id=user_id, first_name="?", last_name="")
+    return PlayerTryoutUpdateUserOut(id=user.id, first_name=user.first_name, last_name=user.last_name)
+
 # endregion Form outputs
 
 # region Game events updates
 
 def update_game_shots_from_event(game: Game, data: GameEventIn | None = None, event: GameEvents | None = None, is_deleted: bool = False) -> str | None:
     if data is not None:
-        shot_type = ShotType.objects.get(id=data.shot_type_id) if data.shot_type_id is not None else None
+        shot_type = get_shot_type_by_id(data.shot_type_id) if data.shot_type_id is not None else None
         goal_type = data.goal_type
     else:
         shot_type = event.shot_type
@@ -403,6 +585,34 @@ def update_game_faceoffs_from_event(game: Game, data: GameEventIn | None = None,
 
 # region Create complex items
 
+def add_game_delta_to_analysis_queue(old_game_data: dict, game: Game) -> None:
+    """Adds the statistics changes of a finished game to the analysis queue.
+
+    :param old_game_data: The game state before the changes, as returned by `game_to_dict()`.
+    :param game: The changed game.
+    """
+    game_delta = serialize_game_delta(old_game_data, game_to_dict(game))
+    if game_delta is not None:
+        GameEventsAnalysisQueue.objects.create(payload=game_delta, status=GameEventSystemStatus.NEW, game_id=game.id)
+
+def requeue_analysis_dead_letters(dead_letters: QuerySet[GameEventsAnalysisDeadLetter]) -> int:
+    """Moves dead letters back to the analysis queue with their attempts reset.
+
+    The entries keep their queue time, so they are analyzed before the later entries of their games.
+
+    :returns: The number of requeued entries.
+    """
+    with transaction.atomic(using='hockey'):
+        dead_letters = list(dead_letters.select_for_update())
+        GameEventsAnalysisQueue.objects.bulk_create([
+            GameEventsAnalysisQueue(id=dead_letter.id, payload=dead_letter.payload, status=dead_letter.status, game_id=dead_letter.game_id)
+            for dead_letter in dead_letters])
+        # The queue time is set on save, so it is restored with updates.
+        for dead_letter in dead_letters:
+            GameEventsAnalysisQueue.objects.filter(id=dead_letter.id).update(date_time=dead_letter.date_time)
+        GameEventsAnalysisDeadLetter.objects.filter(id__in=[dead_letter.id for dead_letter in dead_letters]).delete()
+    return len(dead_letters)
+
 def create_highlight(data: HighlightIn, highlight_reel: HighlightReel, user_id: int) -> Highlight:
     if data.order is None:
         raise ValueError("Order is required for highlights.")
@@ -3,6 +3,7 @@ from hockey.models import Game, GameEvents
 
 
 def game_to_dict(game: Game) -> dict:
+    events = game.gameevents_set.select_related("event_name", "period", "shot_type").order_by("period__order", "-time")
     return {
         "type": "game",
         "id": game.id,
@@ -12,28 +13,34 @@ def game_to_dict(game: Game) -> dict:
         "away_start_goalie_id": game.away_start_goalie_id,
         "home_goals": game.home_goals,
         "away_goals": game.away_goals,
-        "home_goalies": [goalie.player_id for goalie in game.home_goalies.all()],
-        "away_goalies": [goalie.player_id for goalie in game.away_goalies.all()],
-        "home_players": [player.id for player in game.home_players.all()],
-        "away_players": [player.id for player in game.away_players.all()],
+        "home_goalies": list(game.home_goalies.values_list("player_id", flat=True)),
+        "away_goalies": list(game.away_goalies.values_list("player_id", flat=True)),
+        "home_players": list(game.home_players.values_list("id", flat=True)),
+        "away_players": list(game.away_players.values_list("id", flat=True)),
         "season_id": game.season_id,
-        "events": [game_event_to_dict(event) for event in game.gameevents_set.order_by("period__order", "-time").all()],
+        "events": [game_event_to_dict(event, game) for event in events],
     }
 
-def game_event_to_dict(game_event: GameEvents) -> dict:
+def game_event_to_dict(game_event: GameEvents, game: Game | None = None) -> dict:
+    """Forms the analysis payload of a game event.
+
+    :param game: The game of the event, if it is already loaded.
+    """
+    if game is None:
+        game = game_event.game
     return {
         "type": "game_event",
         "id": game_event.id,
         "game_id": game_event.game_id,
-        "game_season_id": game_event.game.season_id,
+        "game_season_id": game.season_id,
         "event_name": game_event.event_name.name.lower(),
         "time": (game_event.time.strftime('%H:%M:%S') if game_event.time else None),
         "period": game_event.period.order,
         "team_id": game_event.team_id,
-        "team_2_id": (game_event.game.away_team_id if game_event.team_id == game_event.game.home_team_id else game_event.game.home_team_id),
-        "player_id": (game_event.player_id if game_event.player else None),
-        "player_2_id": (game_event.player_2_id if game_event.player_2 else None),
-        "goalie_id": (game_event.goalie_id if game_event.goalie else None),
+        "team_2_id": (game.away_team_id if game_event.team_id == game.home_team_id else game.home_team_id),
+        "player_id": game_event.player_id,
+        "player_2_id": game_event.player_2_id,
+        "goalie_id": game_event.goalie_id,
         "shot_type": (game_event.shot_type.name.lower() if game_event.shot_type else None),
         "goal_type": game_event.goal_type,
         "zone": game_event.zone,
@@ -46,3 +53,42 @@ def serialize_game(game: Game) -> str:
 
 def serialize_game_event(game_event: GameEvents) -> str:
     return json.dumps(game_event_to_dict(game_event))
+
+def game_header_to_dict(game_data: dict) -> dict:
+    """Returns the game-level part of `game_to_dict()` output: everything except the events
+    that do not affect the game-level statistics (only goalie changes do)."""
+    return game_data | {"events": [event for event in game_data["events"] if event["event_name"] == "goalie change"]}
+
+def game_delta_to_dict(old_game_data: dict, new_game_data: dict) -> dict | None:
+    """Forms the difference between two states of a game as returned by `game_to_dict()`.
+
+    Applying the delta gives the same statistics as removing the old state and adding the new one:
+    only the events that were removed, added or changed are re-analyzed, and the game-level statistics
+    are re-analyzed only if the game-level data has changed.
+
+    :returns: The delta or None if the statistics are not affected.
+    """
+    old_events = {event["id"]: event for event in old_game_data["events"]}
+    new_events = {event["id"]: event for event in new_game_data["events"]}
+    removed_events = [event for event in old_game_data["events"] if new_events.get(event["id"]) != event]
+    added_events = [event for event in new_game_data["events"] if old_events.get(event["id"]) != event]
+
+    old_game = game_header_to_dict(old_game_data)
+    new_game = game_header_to_dict(new_game_data)
+    is_game_changed = (old_game != new_game)
+
+    if not is_game_changed and len(removed_events) == 0 and len(added_events) == 0:
+        return None
+
+    return {
+        "type": "game_delta",
+        "id": new_game_data["id"],
+        "old_game": (old_game if is_game_changed else None),
+        "new_game": (new_game if is_game_changed else None),
+        "removed_events": removed_events,
+        "added_events": added_events,
+    }
+
+def serialize_game_delta(old_game_data: dict, new_game_data: dict) -> str | None:
+    game_delta = game_delta_to_dict(old_game_data, new_game_data)
+    return (json.dumps(game_delta) if game_delta is not None else None)
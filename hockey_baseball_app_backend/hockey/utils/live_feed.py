@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Iterable, Optional
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest
+from ninja.security import SessionAuth
+
+from hockey.models import Game, GameEvents
+from hockey.utils.constants import LIVE_FEED_CHANNEL
+from hockey.utils.db_utils import form_game_live_data_out
+
+# Live game feed pushed to spectators as server-sent events.
+#
+# Writers call `notify_game_live_feed()` in their transaction, which sends a Postgres notification on commit.
+# Each server process listens to the notifications with a single connection and, for games with subscribers
+# in the process, forms the update once and puts it into the queues of all of them.
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before listening again after the listener connection failed.
+LISTEN_RETRY_SECONDS = 5
+
+# Queue item telling the subscriber to send a new snapshot, after missed or dropped updates.
+RESYNC = object()
+
+class AsyncSessionAuth(SessionAuth):
+    """Session authentication for async operations, which cannot load the user synchronously."""
+
+    is_async = True
+
+    async def authenticate(self, request: HttpRequest, key: Optional[str]) -> Optional[Any]:
+        user = await request.auser()
+        if user.is_authenticated:
+            return user
+        return None
+
+# region Notifications
+
+def notify_game_live_feed(game_id: int, updated_event_ids: Iterable[int] = (), deleted_event_ids: Iterable[int] = ()) -> None:
+    """Notifies the live feed subscribers of the game about its change. Delivered when the transaction commits.
+
+    :param updated_event_ids: IDs of the added or updated events of the game.
+    :param deleted_event_ids: IDs of the deleted events of the game.
+    """
+    payload = json.dumps({"game_id": game_id, "updated_event_ids": list(updated_event_ids), "deleted_event_ids": list(deleted_event_ids)})
+    with connections['hockey'].cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [LIVE_FEED_CHANNEL, payload])
+
+# endregion Notifications
+
+# region Messages
+
+def render_live_feed_message(event: str, data: Any) -> str:
+    # Imported here, because the API module imports the routers using this module.
+    from hockey_baseball_app_backend.api import CustomJsonEncoder
+    return f"event: {event}\ndata: {json.dumps(data, cls=CustomJsonEncoder)}\n\n"
+
+def get_live_game(game_id: int) -> Game | None:
+    return Game.objects.select_related('home_start_goalie', 'away_start_goalie',
+        'home_defensive_zone_exit', 'away_defensive_zone_exit', 'home_offensive_zone_entry', 'away_offensive_zone_entry',
+        'home_shots', 'away_shots', 'home_turnovers', 'away_turnovers').filter(id=game_id).first()
+
+def form_live_feed_snapshot(game_id: int) -> str | None:
+    """Forms the message with the full live data of the game, or returns None if the game does not exist."""
+    game = get_live_game(game_id)
+    if game is None:
+        return None
+    live_data = form_game_live_data_out(game, game.gameevents_set.order_by("period__order", "-time").all())
+    return render_live_feed_message("snapshot", live_data.model_dump())
+
+def form_live_feed_update(change: dict[str, Any]) -> str | None:
+    """Forms the message with the live data update for a notification, or returns None if the game does not exist."""
+    game = get_live_game(change["game_id"])
+    if game is None:
+        return None
+    # Events deleted after the notification are sent as deleted.
+    events = list(GameEvents.objects.filter(game_id=game.id, id__in=change["updated_event_ids"]).order_by("period__order", "-time"))
+    deleted_event_ids = change["deleted_event_ids"] + sorted(set(change["updated_event_ids"]) - {event.id for event in events})
+    live_data = form_game_live_data_out(game, events, deleted_event_ids=deleted_event_ids)
+    return render_live_feed_message("update", live_data.model_dump())
+
+# endregion Messages
+
+# region Hub
+
+class GameLiveFeedHub:
+    """Fans out the live feed notifications received by this process to the subscribers of each game."""
+
+    def __init__(self):
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    def reset(self) -> None:
+        """Binds the hub to the running event loop."""
+        self.loop = asyncio.get_running_loop()
+        self.subscribers: dict[int, set[asyncio.Queue]] = {}
+        self.listening = asyncio.Event()
+        self.listener: asyncio.Task | None = None
+
+    async def subscribe(self, game_id: int) -> asyncio.Queue:
+        """Subscribes to the updates of the game. Returns once the notifications are listened to."""
+        if self.loop is not asyncio.get_running_loop():
+            self.reset()
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+        queue = asyncio.Queue(maxsize=settings.LIVE_FEED_QUEUE_SIZE)
+        self.subscribers.setdefault(game_id, set()).add(queue)
+        try:
+            await self.listening.wait()
+        except BaseException:
+            self.unsubscribe(game_id, queue)
+            raise
+        return queue
+
+    def unsubscribe(self, game_id: int, queue: asyncio.Queue) -> None:
+        queues = self.subscribers.get(game_id)
+        if queues is not None:
+            queues.discard(queue)
+            if len(queues) == 0:
+                del self.subscribers[game_id]
+
+    async def listen(self) -> None:
+        db = settings.DATABASES['hockey']
+        conninfo = make_conninfo(dbname=db['NAME'], user=db['USER'], password=db['PASSWORD'], host=db['HOST'], port=db['PORT'])
+        missed_notifications = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {LIVE_FEED_CHANNEL}")
+                    self.listening.set()
+                    if missed_notifications:
+                        # Notifications sent while the connection was down are lost.
+                        for queues in self.subscribers.values():
+                            for queue in queues:
+                                self.put(queue, RESYNC)
+                        missed_notifications = False
+                    async for notification in conn.notifies():
+                        await self.dispatch(notification.payload)
+            except Exception:
+                logger.exception("Live feed listener failed.")
+            self.listening.clear()
+            missed_notifications = True
+            await asyncio.sleep(LISTEN_RETRY_SECONDS)
+
+    async def dispatch(self, payload: str) -> None:
+        """Forms the update for a notification once and puts it into the queues of the game subscribers."""
+        change = json.loads(payload)
+        if len(self.subscribers.get(change["game_id"], ())) == 0:
+            return
+        message = await sync_to_async(form_live_feed_update)(change)
+        for queue in list(self.subscribers.get(change["game_id"], ())):
+            self.put(queue, message)
+
+    def put(self, queue: asyncio.Queue, message: str | object | None) -> None:
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The subscriber is too slow: replace its backlog with a new snapshot.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+
+hub = GameLiveFeedHub()
+
+async def stream_game_live_feed(game_id: int) -> AsyncIterator[str]:
+    """Yields the snapshot of the game live data, then its updates. Stops when the game is deleted."""
+    queue = await hub.subscribe(game_id)
+    try:
+        # Subscribed before the snapshot, so no update is missed. Updates are idempotent for the client.
+        message = await sync_to_async(form_live_feed_snapshot)(game_id)
+        while message is not None:
+            yield message
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=settings.LIVE_FEED_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                message = ": keepalive\n\n"
+                continue
+            if message is RESYNC:
+                message = await sync_to_async(form_live_feed_snapshot)(game_id)
+        yield render_live_feed_message("close", {"game_id": game_id})
+    finally:
+        hub.unsubscribe(game_id, queue)
+
+# endregion Hub
@@ -0,0 +1,68 @@
+import base64
+import binascii
+import json
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.http import HttpResponse
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+PAGINATION_DESCRIPTION = ("Pagination is optional: if `limit` or `cursor` is provided, at most `limit` items are returned "
+                          f"(default and maximum {settings.MAX_PAGE_SIZE}). If there are more items, "
+                          f"the `{NEXT_CURSOR_HEADER}` header contains the `cursor` for the next page.")
+
+def encode_cursor(values: list[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode()).decode()
+
+def decode_cursor(cursor: str, ordering: tuple[str, ...]) -> list[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != len(ordering) or not all(isinstance(value, (str, int)) for value in values):
+        raise ValueError("Invalid cursor.")
+    return values
+
+def get_keyset_filter(ordering: tuple[str, ...], values: list[Any]) -> Q:
+    """Returns the filter of the rows after the row with the given values of the ordering fields."""
+    keyset_filter = Q()
+    for i, field in enumerate(ordering):
+        field_filter = Q(**{f"{field.lstrip('-')}__{'lt' if field.startswith('-') else 'gt'}": values[i]})
+        for previous_field, value in zip(ordering[:i], values):
+            field_filter &= Q(**{previous_field.lstrip('-'): value})
+        keyset_filter |= field_filter
+    return keyset_filter
+
+def get_ordering_value(item: Any, field: str) -> Any:
+    value = item
+    for attr in field.lstrip('-').split('__'):
+        value = getattr(value, attr)
+    return value
+
+def paginate(queryset: QuerySet, ordering: tuple[str, ...], response: HttpResponse, cursor: str | None = None, limit: int | None = None) -> QuerySet | list[Any]:
+    """Orders the queryset and, if `cursor` or `limit` is provided, returns its page.
+
+    Pages are selected by the values of the ordering fields of the last returned item (keyset pagination),
+    so the ordering must end with a unique field. The cursor of the next page is set to the `X-Next-Cursor` header.
+
+    :raises ValueError: If the cursor is invalid.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor is None and limit is None:
+        return queryset
+    limit = max(1, min(limit if limit is not None else settings.MAX_PAGE_SIZE, settings.MAX_PAGE_SIZE))
+    if cursor is not None:
+        try:
+            queryset = queryset.filter(get_keyset_filter(ordering, decode_cursor(cursor, ordering)))
+        except ValidationError:
+            raise ValueError("Invalid cursor.")
+    items = list(queryset[:limit + 1])
+    if len(items) > limit:
+        items = items[:limit]
+        response[NEXT_CURSOR_HEADER] = encode_cursor([get_ordering_value(items[-1], field) for field in ordering])
+    return items
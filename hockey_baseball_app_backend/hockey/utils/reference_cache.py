@@ -0,0 +1,108 @@
+import datetime
+import threading
+import time
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db.models import Model, Prefetch
+from django.db.models.query import QuerySet
+from django.db.models.signals import post_delete, post_save
+
+from hockey.models import GameEventName, GamePeriod, GameType, GameTypeName, PlayerPosition, Season, ShotType
+
+# Per-process cache of reference data that is read on almost every request but rarely changes.
+# Tables are loaded whole on first use and reloaded after `REFERENCE_CACHE_TTL` seconds, or right away
+# when one of their models is saved or deleted in this process. The TTL bounds how long other processes
+# can serve stale data. Cached instances are shared between requests and must not be modified.
+
+class ReferenceTable:
+    """A lazily loaded, expiring list of the rows of a reference table."""
+
+    def __init__(self, get_queryset: Callable[[], QuerySet], dependencies: tuple[type[Model], ...]):
+        """
+        :param get_queryset: Function returning the query loading the table.
+        :param dependencies: Models whose changes invalidate the table.
+        """
+        self.get_queryset = get_queryset
+        self.dependencies = dependencies
+        self.rows: list[Any] | None = None
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+
+    def all(self) -> list[Any]:
+        rows, now = self.rows, time.monotonic()
+        if rows is not None and now < self.expires_at:
+            return rows
+        with self.lock:
+            if self.rows is None or time.monotonic() >= self.expires_at:
+                self.rows = list(self.get_queryset())
+                self.expires_at = time.monotonic() + settings.REFERENCE_CACHE_TTL
+            return self.rows
+
+    def get(self, **kwargs) -> Any | None:
+        """Returns the first row with the given attribute values, or None."""
+        for row in self.all():
+            if all(getattr(row, attr) == value for attr, value in kwargs.items()):
+                return row
+        return None
+
+    def clear(self) -> None:
+        self.rows = None
+
+seasons = ReferenceTable(lambda: Season.objects.order_by('-start_date'), (Season,))
+game_event_names = ReferenceTable(lambda: GameEventName.objects.order_by('id'), (GameEventName,))
+shot_types = ReferenceTable(lambda: ShotType.objects.order_by('name'), (ShotType,))
+game_periods = ReferenceTable(lambda: GamePeriod.objects.order_by('order'), (GamePeriod,))
+player_positions = ReferenceTable(lambda: PlayerPosition.objects.order_by('id'), (PlayerPosition,))
+game_types = ReferenceTable(lambda: GameType.objects.order_by('id').prefetch_related(
+    Prefetch('gametypename_set', queryset=GameTypeName.objects.filter(is_actual=True).order_by('id'), to_attr='actual_names')),
+    (GameType, GameTypeName))
+
+REFERENCE_TABLES = [seasons, game_event_names, shot_types, game_periods, player_positions, game_types]
+
+# region Getters
+
+def get_season_by_date(date: datetime.date) -> Season | None:
+    """Returns the latest season started on or before the date."""
+    for season in seasons.all():
+        if season.start_date <= date:
+            return season
+    return None
+
+def get_game_event_name(name: str) -> GameEventName | None:
+    return game_event_names.get(name=name)
+
+def get_game_event_name_by_id(game_event_name_id: int) -> GameEventName | None:
+    return game_event_names.get(id=game_event_name_id)
+
+def get_shot_type_by_id(shot_type_id: int) -> ShotType | None:
+    return shot_types.get(id=shot_type_id)
+
+def get_player_position(name: str) -> PlayerPosition | None:
+    return player_positions.get(name=name)
+
+def get_game_type_ids_with_names() -> list[int]:
+    """Returns IDs of game types that have actual game type names."""
+    return [game_type.id for game_type in game_types.all() if len(game_type.actual_names) > 0]
+
+# endregion Getters
+
+# region Invalidation
+
+def clear_reference_cache() -> None:
+    for table in REFERENCE_TABLES:
+        table.clear()
+
+def invalidate_reference_tables(sender: type[Model], **kwargs) -> None:
+    for table in REFERENCE_TABLES:
+        if sender in table.dependencies:
+            table.clear()
+
+def connect_reference_cache_signals() -> None:
+    """Connects invalidation of the cached tables to changes of their models. Called when the app is ready."""
+    for table in REFERENCE_TABLES:
+        for model in table.dependencies:
+            post_save.connect(invalidate_reference_tables, sender=model, dispatch_uid=f"reference_cache_save_{model.__name__}")
+            post_delete.connect(invalidate_reference_tables, sender=model, dispatch_uid=f"reference_cache_delete_{model.__name__}")
+
+# endregion Invalidation
@@ -0,0 +1,115 @@
+import datetime
+from functools import partial
+from typing import Callable
+
+from django.db import connections, transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpRequest
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from hockey.models import (Arena, ArenaRink, Division, Game, GameEventName, GamePeriod, GameType, GameTypeName, Goalie, Player, ResourceVersion,
+                           Season, ShotType, Team, TeamAgeGroup, TeamLevel, TeamSeason)
+from hockey.utils.constants import ResourceName
+from hockey.utils.reference_cache import get_season_by_date
+
+# Models whose changes invalidate the responses of each resource.
+# Team season statistics are also updated by the data analyzer, which bumps the version itself.
+RESOURCE_DEPENDENCIES: dict[str, tuple[type[Model], ...]] = {
+    ResourceName.GAMES: (Game, Team, Arena, ArenaRink, GameType, GameTypeName, GamePeriod, Goalie, Player),
+    ResourceName.TEAMS: (Team, TeamAgeGroup, TeamLevel, Division, TeamSeason, Season),
+    ResourceName.SEASONS: (Season,),
+    ResourceName.GAME_EVENT_NAMES: (GameEventName,),
+    ResourceName.SHOT_TYPES: (ShotType,),
+    ResourceName.GAME_PERIODS: (GamePeriod,),
+}
+
+BUMP_RESOURCE_VERSIONS_SQL = """
+INSERT INTO resource_versions (name, version, last_modified)
+SELECT name, 1, now() FROM unnest(%s::varchar[]) AS name ORDER BY name
+ON CONFLICT (name) DO UPDATE SET version = resource_versions.version + 1, last_modified = now()
+"""
+
+# region Versions
+
+def bump_resource_versions(names: list[str], using: str = 'hockey') -> None:
+    """Increments the versions of the resources, creating the missing ones."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(BUMP_RESOURCE_VERSIONS_SQL, [sorted(set(names))])
+
+def get_resource_versions(request: HttpRequest, names: tuple[str, ...]) -> dict[str, tuple[int, datetime.datetime | None]]:
+    """Returns the versions and modification times of the resources, loaded once per request."""
+    versions = getattr(request, 'resource_versions', None)
+    if versions is None:
+        versions = {name: (0, None) for name in names}
+        for name, version, last_modified in ResourceVersion.objects.filter(name__in=names).values_list('name', 'version', 'last_modified'):
+            versions[name] = (version, last_modified)
+        request.resource_versions = versions
+    return versions
+
+def get_today() -> datetime.date:
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+# endregion Versions
+
+# region Conditional GET
+
+def versioned_resource(*names: str, daily: bool = False, current_season: bool = False) -> list[Callable]:
+    """View decorators answering conditional GET requests with 304 if none of the resources changed.
+
+    Apply them with `@decorate_view(*versioned_resource(...))`.
+    Unauthenticated requests skip the check, so they are rejected by the router authentication as before.
+
+    :param daily: The response depends on the current date.
+    :param current_season: The response depends on the current season.
+    """
+
+    def get_etag(request: HttpRequest, *args, **kwargs) -> str | None:
+        if not request.user.is_authenticated:
+            return None
+        versions = get_resource_versions(request, names)
+        parts = [f"{name}.{versions[name][0]}" for name in names]
+        if daily:
+            parts.append(get_today().isoformat())
+        if current_season:
+            season = get_season_by_date(get_today())
+            parts.append(f"season.{season.id if season is not None else 0}")
+        return "-".join(parts)
+
+    def get_last_modified(request: HttpRequest, *args, **kwargs) -> datetime.datetime | None:
+        if not request.user.is_authenticated:
+            return None
+        last_modified_values = [last_modified for _, last_modified in get_resource_versions(request, names).values() if last_modified is not None]
+        if len(last_modified_values) == 0:
+            return None
+        last_modified = max(last_modified_values)
+        if daily or current_season:
+            # Seasons start at midnight, so the start of the day also covers the current season change.
+            last_modified = max(last_modified, datetime.datetime.combine(get_today(), datetime.time(), datetime.timezone.utc))
+        return last_modified
+
+    # Clients must revalidate, otherwise browsers may reuse the response heuristically from Last-Modified.
+    return [cache_control(private=True, no_cache=True), condition(etag_func=get_etag, last_modified_func=get_last_modified)]
+
+# endregion Conditional GET
+
+# region Invalidation
+
+def bump_on_change(names: list[str], sender: type[Model], using: str = 'hockey', **kwargs) -> None:
+    # Bump after commit: a request reading between the commit and the bump caches the new data
+    # under the old version and refetches it on the next request, which is harmless.
+    transaction.on_commit(partial(bump_resource_versions, names, using), using=using)
+
+def connect_resource_version_signals() -> None:
+    """Connects version bumps to changes of the resource models. Called when the app is ready."""
+    models: dict[type[Model], list[str]] = {}
+    for name, dependencies in RESOURCE_DEPENDENCIES.items():
+        for model in dependencies:
+            models.setdefault(model, []).append(name)
+    for model, names in models.items():
+        receiver = partial(bump_on_change, names)
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=f"resource_versions_save_{model.__name__}")
+        post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=f"resource_versions_delete_{model.__name__}")
+
+# endregion Invalidation
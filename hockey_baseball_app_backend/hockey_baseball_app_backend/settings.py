@@ -76,6 +76,9 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Allow the frontend to read the cursor of the next page of paginated lists
+CORS_EXPOSE_HEADERS = ['x-next-cursor']
+
 CSRF_COOKIE_SECURE = True
 CSRF_COOKIE_HTTPONLY = False
 CSRF_COOKIE_SAMESITE = None
@@ -246,4 +249,10 @@ PASSWORD_RESET_TIMEOUT = 1800
 
 FRONTEND_URL = env('FRONTEND_URL')
 
-INVITATION_EXPIRATION_DAYS = 7
\ No newline at end of file
+INVITATION_EXPIRATION_DAYS = 7
+PROCESS_LOG_MAX_PAGE_SIZE = 1000
+REFERENCE_CACHE_TTL = 300  # Seconds before cached reference data (seasons, event names, shot types, etc.) is reloaded.
+LIVE_FEED_KEEPALIVE_SECONDS = 15  # Seconds between keepalive comments of idle live feed streams.
+LIVE_FEED_QUEUE_SIZE = 100  # Updates queued per live feed subscriber before its backlog is replaced with a new snapshot.
+MAX_PAGE_SIZE = 200  # Maximum number of items in a page of paginated lists.
+USER_DIRECTORY_CACHE_TTL = 60  # Seconds before cached user names shown with hockey data are reloaded.
@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from users.utils import user_directory
+from users.utils.user_directory import clear_user_directory, get_users
 
 class UsersManagersTests(TestCase):
 
@@ -37,3 +40,39 @@ class UsersManagersTests(TestCase):
         with self.assertRaises(ValueError):
             User.objects.create_superuser(
                 email="testadmin@test.com", password="testpassword", is_superuser=False)
+
+class UserDirectoryTests(TestCase):
+
+    def setUp(self):
+        clear_user_directory()
+
+    def test_get_users(self):
+        User = get_user_model()
+        users = [User.objects.create_user(email=f"user{i}@test.com", password="testpassword", first_name=f"First{i}", last_name=f"Last{i}")
+                 for i in range(3)]
+        # Missing and None IDs are skipped.
+        with self.assertNumQueries(1):
+            resolved = get_users([user.id for user in users] + [None, users[-1].id + 100])
+        self.assertEqual(sorted(resolved), [user.id for user in users])
+        self.assertEqual(resolved[users[0].id].full_name, "First0 Last0")
+        # Cached users are not loaded again.
+        with self.assertNumQueries(0):
+            get_users([users[0].id, users[1].id])
+        users[0].first_name = "Renamed"
+        users[0].save()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_users([users[0].id, users[1].id])[users[0].id].first_name, "Renamed")
+
+    @override_settings(USER_DIRECTORY_CACHE_TTL=0)
+    def test_expired_users_removed(self):
+        User = get_user_model()
+        users = [User.objects.create_user(email=f"user{i}@test.com", password="testpassword") for i in range(2)]
+        get_users([users[0].id])
+        self.assertEqual(list(user_directory.entries), [users[0].id])
+        # Loading another user removes the expired ones.
+        get_users([users[1].id])
+        self.assertEqual(list(user_directory.entries), [users[1].id])
+        # An expired user found on lookup is removed before it is loaded again.
+        with self.assertNumQueries(1):
+            self.assertEqual(get_users([users[1].id])[users[1].id].email, "user1@test.com")
+        self.assertEqual(list(user_directory.entries), [users[1].id])
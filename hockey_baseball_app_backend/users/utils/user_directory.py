@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import Iterable, NamedTuple
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from users.models import CustomUser
+
+# Per-process cache of user names and emails shown next to hockey data.
+# Users are stored in the default database, so hockey endpoints collect the user IDs of the whole response
+# and resolve them with `get_users()` in one query for the users not cached yet. Entries expire after
+# `USER_DIRECTORY_CACHE_TTL` seconds, or right away when the user is saved or deleted in this process.
+
+class UserInfo(NamedTuple):
+    id: int
+    email: str
+    first_name: str
+    last_name: str
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+entries: dict[int, tuple[UserInfo, float]] = {}
+"""Cached users with their expiration times, by ID."""
+lock = threading.Lock()
+
+def get_users(user_ids: Iterable[int | None]) -> dict[int, UserInfo]:
+    """Returns the existing users with the given IDs, by ID. None IDs are ignored."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    users, now = {}, time.monotonic()
+    with lock:
+        for user_id in user_ids:
+            entry = entries.get(user_id)
+            if entry is not None and now < entry[1]:
+                users[user_id] = entry[0]
+            elif entry is not None:
+                del entries[user_id]
+    missing_ids = user_ids - users.keys()
+    if len(missing_ids) > 0:
+        loaded = [UserInfo(*values) for values in
+                  CustomUser.objects.using('default').filter(id__in=missing_ids).values_list('id', 'email', 'first_name', 'last_name')]
+        expires_at = time.monotonic() + settings.USER_DIRECTORY_CACHE_TTL
+        with lock:
+            # Expired users that are not looked up again are removed here, so the cache does not keep every user ever loaded.
+            for user_id in [user_id for user_id, entry in entries.items() if entry[1] <= now]:
+                del entries[user_id]
+            for user in loaded:
+                entries[user.id] = (user, expires_at)
+                users[user.id] = user
+    return users
+
+def get_user(user_id: int | None) -> UserInfo | None:
+    return get_users([user_id]).get(user_id)
+
+# region Invalidation
+
+def clear_user_directory() -> None:
+    with lock:
+        entries.clear()
+
+def invalidate_user(sender: type[CustomUser], instance: CustomUser, **kwargs) -> None:
+    with lock:
+        entries.pop(instance.id, None)
+
+def connect_user_directory_signals() -> None:
+    """Connects invalidation of the cached users to their changes. Called when the app is ready."""
+    post_save.connect(invalidate_user, sender=CustomUser, dispatch_uid="user_directory_save")
+    post_delete.connect(invalidate_user, sender=CustomUser, dispatch_uid="user_directory_delete")
+
+# endregion Invalidation